@@ -4,4 +4,42 @@ __author__ = 'Michel Mansour'
 __license__ = 'MIT'
 __copyright__ = 'Copyright 2015 Michel Mansour'
 
-from .power_rankings import SeasonRankings, WeeklyRankings
+import importlib
+
+# public name -> module it is defined in; each module is only imported when
+# one of its names is first used, so that importing the package stays cheap
+_EXPORTS = {
+    'SeasonRankings': 'power_rankings',
+    'WeeklyRankings': 'power_rankings',
+    'SeasonHistory': 'power_rankings',
+    'ResponseCache': 'http_cache',
+    'ESPNSession': 'http_session',
+    'PowerMatrix': 'power_matrix',
+    'SeasonSimulation': 'simulation',
+    'LiveRankings': 'live',
+    'CategoryAnalysis': 'category_analysis',
+    'Captures': 'replay',
+    'RecordingSession': 'replay',
+    'ReplaySession': 'replay',
+    'RankingsStore': 'rankings_store',
+    'writeJsonLines': 'export',
+    'writeCsv': 'export',
+    'writeMatrix': 'export',
+    'readMatrix': 'export',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError('module %r has no attribute %r' %
+                             (__name__, name))
+    value = getattr(importlib.import_module('.' + _EXPORTS[name], __name__),
+                    name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# The MIT License (MIT)
+#
+# Copyright (c) 2015 Michel Mansour
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""\
+Compute power rankings for many ESPN fantasy baseball leagues at once.
+
+Each league is described by its own configuration file, in the same format
+as the one used by rankings_cli.py. Leagues are computed in parallel worker
+processes, each league's HTML is written to its own file in the output
+directory, and a JSON summary of timings and failures is written alongside.
+A league that fails or is slow does not hold up the others.
+"""
+
+from rankings_cli import readConfig, currentWeek, createRankings, \
+    createSession, loadTemplate, renderOutput
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import traceback
+
+
+def configFiles(paths):
+    """Expand a list of config files and directories of *.conf files."""
+    configs = []
+    for path in paths:
+        if os.path.isdir(path):
+            configs.extend(sorted(glob.glob(os.path.join(path, '*.conf'))))
+        else:
+            configs.append(path)
+    return configs
+
+
+def workerCount(value):
+    """Parse the number of worker processes, which must be at least 1."""
+    try:
+        workers = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError('invalid worker count: %s' % value)
+    if workers < 1:
+        raise argparse.ArgumentTypeError('need at least 1 worker, not %s' %
+                                         value)
+    return workers
+
+
+def runLeague(configFile, doSeason, week, outputDir, rate):
+    """Compute and render the rankings for one league config, sending at
+       most rate requests per second to each host (0 for no limit).
+
+       Return a summary dict with the keys 'config', 'output', 'seconds',
+       'requests', 'session' (the session's counters) and 'error' (None if
+       the league succeeded).
+    """
+    start = time.time()
+    outPath = os.path.join(outputDir, os.path.splitext(
+        os.path.basename(configFile))[0] + '.html')
+    summary = {'config': configFile, 'output': outPath, 'requests': 0,
+               'session': {}, 'error': None}
+    pr = None
+    try:
+        properties = readConfig(configFile)
+        thisWeek = 0
+        if not doSeason:
+            thisWeek = week if week > 0 else currentWeek(properties)
+        pr = createRankings(properties, doSeason, thisWeek,
+                            session=createSession(properties, rate))
+        pr.loginESPN(properties['username'], properties['password'])
+        teamAbbrMap = pr.teamAbbreviations()
+        rankings = pr.powerRankings()
+        template = loadTemplate(os.path.join(os.path.dirname(
+            os.path.abspath(__file__)), 'templates'))
+        with open(outPath, 'w') as outFile:
+            renderOutput(properties['leagueName'], teamAbbrMap, rankings,
+                         properties['seasonId'], thisWeek, template, outFile)
+    except Exception:
+        summary['output'] = None
+        summary['error'] = traceback.format_exc()
+    if pr is not None:
+        summary['requests'] = pr.requestCount()
+        summary['session'] = pr.sessionCounters()
+    summary['seconds'] = time.time() - start
+    return summary
+
+
+def main(args):
+    configs = configFiles(args.configs)
+    os.makedirs(args.outputDir, exist_ok=True)
+    # every worker process gets its share of the overall request rate
+    rate = args.rate / args.workers
+
+    start = time.time()
+    summaries = []
+    with ProcessPoolExecutor(args.workers) as executor:
+        futures = dict((executor.submit(runLeague, config, args.season,
+                                        args.week, args.outputDir, rate),
+                        config) for config in configs)
+        for future in as_completed(futures):
+            try:
+                summary = future.result()
+            except Exception:
+                # the worker process died or the league could not be sent
+                # to it: record the failure and carry on with the others
+                summary = {'config': futures[future], 'output': None,
+                           'requests': 0, 'session': {}, 'seconds': 0,
+                           'error': traceback.format_exc()}
+            if summary['error'] is not None:
+                sys.stderr.write('%s failed:\n%s' % (summary['config'],
+                                                     summary['error']))
+            summaries.append(summary)
+
+    summaries.sort(key=lambda x: x['config'])
+    report = {'seconds': time.time() - start, 'leagues': summaries,
+              'failed': [x['config'] for x in summaries
+                         if x['error'] is not None]}
+    with open(os.path.join(args.outputDir, 'summary.json'), 'w') as f:
+        json.dump(report, f, indent=2)
+    return 1 if report['failed'] else 0
+
+if __name__ == '__main__':
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('configs', nargs='+',
+                        help='league configuration files, or directories of \
+                        *.conf files')
+    matchupPeriodGroup = parser.add_mutually_exclusive_group()
+    matchupPeriodGroup.add_argument('-w', '--week', type=int, default=-1,
+                                    help='compute rankings for WEEK')
+    matchupPeriodGroup.add_argument('-s', '--season', action='store_true',
+                                    help='compute rankings for the season \
+                                    so far')
+    parser.add_argument('-o', '--output-dir', dest='outputDir', default='.',
+                        help='directory to write each league\'s page and \
+                        summary.json to')
+    parser.add_argument('-j', '--workers', type=workerCount, default=4,
+                        help='number of leagues to compute at the same time')
+    parser.add_argument('-r', '--rate', type=float, default=5,
+                        help='maximum requests per second to each host, \
+                        across all workers (0 for no limit)')
+
+    args = parser.parse_args()
+    sys.exit(main(args))
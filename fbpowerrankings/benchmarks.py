@@ -0,0 +1,377 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# The MIT License (MIT)
+#
+# Copyright (c) 2015 Michel Mansour
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""\
+Benchmark each stage of computing power rankings against a local fake ESPN
+server, printing the time, peak memory allocated, memory still held
+afterwards, HTTP requests and kilobytes downloaded of every stage for
+synthetic leagues of the given sizes. With --source json, the league is
+read from the JSON API instead of the HTML pages, to compare the two.
+
+Stages:
+    run -- a complete WeeklyRankings run, as rankings_cli.py does it
+    fetch -- downloading every page the run needs
+    parse -- extracting the data from those pages
+    powerMatrix -- comparing every team against every other team
+    strengthOfSchedule -- computing each team's opponent AWP
+    render -- rendering the HTML page
+    packedMatrix -- the power matrix as a PowerMatrix of packed arrays
+    dictMatrix -- the same matrix as the dict-of-dicts it replaced; the
+                  kept KB of these two compare their sizes
+    categoryAnalysis -- downloading the season totals and schedules once
+                        and precomputing the category bitmasks
+    dropOneVariants -- the season rankings without each category in turn,
+                       computed from the bitmasks alone
+
+With --compare, run every stage twice, once with the baseline and once
+with the variant of one option, and print the two side by side:
+    workers -- fetching one team schedule at a time, or -j of them (4
+               unless -j is greater than 1); give the server some
+               --latency, since the gain comes from overlapping waits
+    engine -- the python power matrix engine, or the numpy one
+    parser -- parsing the HTML pages with Beautiful Soup, or with lxml
+
+With --startup-budget, instead check that importing rankings_cli, and
+importing the fbpowerrankings package, each stay within the budget
+(STARTUP_BUDGET milliseconds unless another is given, as measured by
+python -X importtime) and do not import any of the heavy third-party
+modules, exiting with status 1 if they do not.
+"""
+
+from power_rankings import WeeklyRankings, SeasonRankings
+from category_analysis import CategoryAnalysis
+from fake_espn import SyntheticLeague, FakeESPNServer, LocalSession
+from replay import Captures, ReplaySession
+from rankings_cli import loadTemplate, renderOutput
+import argparse
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+
+def _stages(server, seasonId, week, options, capturesDir):
+    """Generate (stage name, function) pairs; each function returns the
+       number of HTTP requests it made and the bytes it downloaded."""
+    state = {}
+
+    def run():
+        pr = WeeklyRankings('1', seasonId, [], week,
+                            session=LocalSession(server.url()), **options)
+        pr.loginESPN('user', 'password')
+        state['teamAbbrMap'] = pr.teamAbbreviations()
+        pr.powerRankings()
+        state['pages'] = list(pr._snapshot._pages.keys())
+        return (pr.requestCount(), pr._snapshot.bytesDownloaded())
+
+    def fetch():
+        session = LocalSession(server.url())
+        captures = Captures(capturesDir)
+        downloaded = 0
+        for (url, params) in state['pages']:
+            params = dict(params)
+            r = session.get(url, params=params)
+            captures.save(Captures.key('GET', url, params), r.status_code,
+                          r.text)
+            downloaded += len(r.content)
+        return (len(state['pages']), downloaded)
+
+    def parse():
+        pr = WeeklyRankings('1', seasonId, [], week,
+                            session=ReplaySession(Captures(capturesDir)),
+                            **options)
+        pr.teamAbbreviations()
+        state['totals'] = pr._totals()
+        pr._allSchedules()
+        state['pr'] = pr
+        return (0, 0)
+
+    def powerMatrix():
+        state['records'] = state['pr']._powerMatrix()
+        return (0, 0)
+
+    def strengthOfSchedule():
+        pr = state['pr']
+        state['rankings'] = pr._rankings(
+            state['records'], pr._strengthOfSchedule(state['records']))
+        return (0, 0)
+
+    def render():
+        renderOutput('Benchmark League', state['teamAbbrMap'],
+                     state['rankings'], seasonId, week,
+                     loadTemplate(os.path.join(os.path.dirname(
+                         os.path.abspath(__file__)), 'templates')),
+                     io.StringIO())
+        return (0, 0)
+
+    def packedMatrix():
+        state['packed'] = state['pr'].powerMatrix()
+        return (0, 0)
+
+    def dictMatrix():
+        state['dicts'] = state['packed'].records()
+        return (0, 0)
+
+    def categoryAnalysis():
+        season = SeasonRankings('1', seasonId, [],
+                                session=LocalSession(server.url()),
+                                **options)
+        season.loginESPN('user', 'password')
+        state['analysis'] = CategoryAnalysis.fromRankings(season)
+        return (season.requestCount(), season._snapshot.bytesDownloaded())
+
+    def dropOneVariants():
+        state['analysis'].dropOneVariants()
+        return (0, 0)
+
+    return [('run', run), ('fetch', fetch), ('parse', parse),
+            ('powerMatrix', powerMatrix),
+            ('strengthOfSchedule', strengthOfSchedule), ('render', render),
+            ('packedMatrix', packedMatrix), ('dictMatrix', dictMatrix),
+            ('categoryAnalysis', categoryAnalysis),
+            ('dropOneVariants', dropOneVariants)]
+
+
+def benchmark(teams, categories, week=1, latency=0, **options):
+    """Benchmark every stage for one synthetic league.
+
+       Return a list of dicts with the keys 'stage', 'seconds', 'peakKB',
+       'keptKB' (memory the stage allocated and still holds once it is
+       done, negative if it freed more than it kept), 'requests' and
+       'downloadedKB', in stage order. Timings come
+       from a pass without memory tracing and allocations from a second,
+       traced pass.
+
+       Required arguments:
+       teams -- the number of teams in the league
+       categories -- the number of scoring categories
+
+       Keyword arguments:
+       week -- the week to compute the rankings for (default 1)
+       latency -- seconds the server waits before each response (default 0)
+       Other keyword arguments are passed on to WeeklyRankings.
+    """
+    league = SyntheticLeague(teams, categories)
+    results = []
+    with FakeESPNServer(league, latency=latency) as server:
+        with tempfile.TemporaryDirectory() as tmpDir:
+            for (name, stage) in _stages(server, league.seasonId(), week,
+                                         options,
+                                         os.path.join(tmpDir, 'timed')):
+                start = time.perf_counter()
+                (requests, downloaded) = stage()
+                results.append({'stage': name, 'requests': requests,
+                                'downloadedKB': downloaded / 1024.0,
+                                'seconds': time.perf_counter() - start})
+            tracemalloc.start()
+            try:
+                for ((name, stage), result) in zip(
+                        _stages(server, league.seasonId(), week, options,
+                                os.path.join(tmpDir, 'traced')), results):
+                    tracemalloc.reset_peak()
+                    before = tracemalloc.get_traced_memory()[0]
+                    stage()
+                    (after, peak) = tracemalloc.get_traced_memory()
+                    result['peakKB'] = (peak - before) / 1024.0
+                    result['keptKB'] = (after - before) / 1024.0
+            finally:
+                tracemalloc.stop()
+    return results
+
+
+# modules that only the stages needing them should import
+HEAVY_MODULES = ('requests', 'bs4', 'lxml', 'jinja2', 'numpy')
+
+# milliseconds that importing the command line script, or the package, may
+# take in a fresh interpreter
+STARTUP_BUDGET = 60.0
+
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# the modules checked at startup, with the directory to import each from
+STARTUP_MODULES = (('rankings_cli', _SCRIPT_DIR),
+                   ('fbpowerrankings', os.path.dirname(_SCRIPT_DIR)))
+
+
+def importTime(module='rankings_cli', runs=5, cwd=_SCRIPT_DIR):
+    """Import module in fresh interpreters with -X importtime.
+
+       Return (best cumulative import time in milliseconds over the runs,
+       sorted list of the HEAVY_MODULES that the import loaded).
+    """
+    best = None
+    heavy = set()
+    for _ in range(runs):
+        report = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+            cwd=cwd, capture_output=True, text=True, check=True).stderr
+        for line in report.splitlines():
+            # import time: <self us> | <cumulative us> | <indented name>
+            fields = line.split('|')
+            if len(fields) != 3 or not fields[1].strip().isdigit():
+                continue
+            name = fields[2].strip()
+            if name.split('.')[0] in HEAVY_MODULES:
+                heavy.add(name.split('.')[0])
+            if name == module:
+                millis = int(fields[1]) / 1000.0
+                best = millis if best is None else min(best, millis)
+    return (best, sorted(heavy))
+
+
+def checkStartup(budget=STARTUP_BUDGET):
+    """Print the import times of the STARTUP_MODULES; return whether each is
+       within budget milliseconds and imports none of the HEAVY_MODULES."""
+    ok = True
+    for (module, cwd) in STARTUP_MODULES:
+        (millis, heavy) = importTime(module, cwd=cwd)
+        print('import %s: %.1f ms (budget %.1f ms)' % (module, millis,
+                                                       budget))
+        if heavy:
+            print('heavy modules imported by %s: %s' %
+                  (module, ', '.join(heavy)))
+        ok = ok and millis <= budget and not heavy
+    return ok
+
+
+# option compared -> (WeeklyRankings keyword, baseline value, variant value)
+COMPARISONS = {
+    'workers': ('scheduleWorkers', 1, 4),
+    'engine': ('engine', 'python', 'numpy'),
+    'parser': ('parser', 'soup', 'lxml'),
+}
+
+
+def compare(teams, categories, comparison, week=1, latency=0,
+            variant=None, **options):
+    """Benchmark every stage for one synthetic league with the baseline and
+       the variant of an option.
+
+       Return a list of (baseline result, variant result) pairs, as
+       returned by benchmark, in stage order.
+
+       Required arguments:
+       teams -- the number of teams in the league
+       categories -- the number of scoring categories
+       comparison -- the option to compare, one of COMPARISONS
+
+       Keyword arguments:
+       week, latency -- as for benchmark
+       variant -- the variant value (default the one in COMPARISONS)
+       Other keyword arguments are passed on to WeeklyRankings.
+    """
+    (keyword, baselineValue, variantValue) = COMPARISONS[comparison]
+    if variant is None:
+        variant = variantValue
+    # compile the template first, so that the baseline alone does not pay
+    # for it
+    loadTemplate(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              'templates'))
+    runs = []
+    for value in (baselineValue, variant):
+        options[keyword] = value
+        runs.append(benchmark(teams, categories, week, latency, **options))
+    return list(zip(*runs))
+
+
+def printComparison(args, options):
+    (keyword, baselineValue, variantValue) = COMPARISONS[args.compare]
+    variant = variantValue
+    if args.compare == 'workers' and args.workers > 1:
+        variant = args.workers
+    print('%s: %s against %s' % (keyword, baselineValue, variant))
+    print('%6s %4s  %-20s %10s %10s %8s %12s %12s' %
+          ('teams', 'cats', 'stage', 'baseline s', 'variant s', 'speedup',
+           'baseline KB', 'variant KB'))
+    for teams in args.teams:
+        for categories in args.categories:
+            for (base, other) in compare(teams, categories, args.compare,
+                                         args.week, args.latency, variant,
+                                         **options):
+                print('%6d %4d  %-20s %10.4f %10.4f %7.2fx %12.1f %12.1f' %
+                      (teams, categories, base['stage'], base['seconds'],
+                       other['seconds'],
+                       base['seconds'] / max(other['seconds'], 1e-9),
+                       base['peakKB'], other['peakKB']))
+
+
+def main(args):
+    if args.startupBudget is not None:
+        sys.exit(0 if checkStartup(args.startupBudget) else 1)
+    options = {'parser': args.parser, 'engine': args.engine,
+               'scheduleWorkers': args.workers, 'source': args.source}
+    if args.compare:
+        printComparison(args, options)
+        return
+    print('%6s %4s  %-20s %10s %12s %12s %8s %12s' %
+          ('teams', 'cats', 'stage', 'seconds', 'peak KB', 'kept KB',
+           'requests', 'download KB'))
+    for teams in args.teams:
+        for categories in args.categories:
+            for result in benchmark(teams, categories, args.week,
+                                    args.latency, **options):
+                print('%6d %4d  %-20s %10.4f %12.1f %12.1f %8d %12.1f' %
+                      (teams, categories, result['stage'], result['seconds'],
+                       result['peakKB'], result['keptKB'], result['requests'],
+                       result['downloadedKB']))
+
+if __name__ == '__main__':
+    # Parse command line arguments
+    def sizes(value):
+        return [int(x) for x in value.split(',')]
+
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('-t', '--teams', type=sizes, default=[10, 20],
+                        help='comma-separated league sizes (even numbers)')
+    parser.add_argument('-n', '--categories', type=sizes, default=[10],
+                        help='comma-separated numbers of categories')
+    parser.add_argument('-w', '--week', type=int, default=1,
+                        help='week to compute the rankings for')
+    parser.add_argument('--parser', default='soup', choices=['soup', 'lxml'],
+                        help='page parser')
+    parser.add_argument('--source', default='html', choices=['html', 'json'],
+                        help='read the HTML pages or the JSON API')
+    parser.add_argument('--engine', default='python',
+                        choices=['python', 'numpy'],
+                        help='power matrix engine')
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help='team schedules to fetch at the same time')
+    parser.add_argument('--latency', type=float, default=0,
+                        help='seconds the fake server waits per response')
+    parser.add_argument('--compare', choices=sorted(COMPARISONS),
+                        help='run the baseline and the variant of an option \
+                        and print them side by side')
+    parser.add_argument('--startup-budget', dest='startupBudget', type=float,
+                        metavar='MS', nargs='?', const=STARTUP_BUDGET,
+                        help='only check the import time of rankings_cli and \
+                        of the package against this many milliseconds \
+                        (default %.0f)' % STARTUP_BUDGET)
+
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# The MIT License (MIT)
+#
+# Copyright (c) 2015 Michel Mansour
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""\
+Ask what the power rankings would have been with different scoring
+categories: any subset of the league's categories, with any of them scored
+the other way around.
+
+The category totals are downloaded once. For every pair of teams, the
+categories that the first team's total is higher in, and those it is lower
+in, are packed into the bits of two integers, so the record of any pair
+under any choice of categories is a couple of bitwise operations and bit
+counts, without comparing any totals again.
+
+Classes provided:
+CategoryAnalysis -- Power rankings for any subset of the categories
+"""
+
+try:
+    from .power_rankings import PowerRankings, SeasonRankings
+    from .power_matrix import PowerMatrix
+except ImportError:
+    from power_rankings import PowerRankings, SeasonRankings
+    from power_matrix import PowerMatrix
+import argparse
+
+try:
+    _popcount = int.bit_count
+except AttributeError:
+    # int.bit_count is new in Python 3.10
+    def _popcount(x):
+        return bin(x).count('1')
+
+
+class CategoryAnalysis:
+    """
+    Power rankings for any subset of a league's scoring categories.
+
+    Public methods:
+        fromRankings -- Create an analysis from a PowerRankings instance
+        categories -- The category names, in ESPN's order
+        mask -- The bitmask of a list of categories
+        powerMatrix -- The power matrix for some of the categories
+        rankings -- The power rankings for some of the categories
+        dropOneVariants -- The rankings with each category left out in turn
+
+    Public instance variables:
+        None
+    """
+
+    def __init__(self, categories, totals, pairings, lowerBetterCategories,
+                 schedules):
+        """Create a CategoryAnalysis.
+
+           Required arguments:
+           categories -- the category names, in the order of the totals
+           totals -- a dict of team name to its list of category totals, as
+                     they appear on ESPN (see PowerRankings.categoryTotals)
+           pairings -- a dict of team name to its actual opponent
+           lowerBetterCategories -- the category names where a lower total
+                                    is better
+           schedules -- a dict of team name to the list of its opponents to
+                        date, to compute opponent AWPs with
+        """
+        self._categories = list(categories)
+        self._bits = dict((category, 1 << c)
+                          for (c, category) in enumerate(self._categories))
+        self._teams = list(totals.keys())
+        self._pairings = pairings
+        self._lowerBetter = self.mask(
+            [category for category in lowerBetterCategories
+             if category in self._bits])
+        self._schedules = schedules
+
+        # bit c of _higher[i * n + j] is set if team i's total in category c
+        # is higher than team j's, and of _lower[i * n + j] if it is lower
+        n = len(self._teams)
+        self._higher = [0] * (n * n)
+        self._lower = [0] * (n * n)
+        for (i, team) in enumerate(self._teams):
+            for (j, opp) in enumerate(self._teams[i + 1:], i + 1):
+                higher = lower = 0
+                for (c, (x, y)) in enumerate(zip(totals[team], totals[opp])):
+                    if x > y:
+                        higher |= 1 << c
+                    elif x < y:
+                        lower |= 1 << c
+                self._higher[i * n + j] = self._lower[j * n + i] = higher
+                self._lower[i * n + j] = self._higher[j * n + i] = lower
+
+    @classmethod
+    def fromRankings(cls, powerRankings):
+        """Create a CategoryAnalysis from the category totals and schedules
+           of a (logged-in) PowerRankings instance. This is the only step
+           that talks to ESPN."""
+        (categories, totals, pairings) = powerRankings.categoryTotals()
+        return cls(categories, totals, pairings,
+                   powerRankings._lowerBetterCategories,
+                   powerRankings._allSchedules())
+
+    def categories(self):
+        """Return the list of category names, in ESPN's order."""
+        return list(self._categories)
+
+    def mask(self, categories):
+        """Return the bitmask of a list of category names.
+
+           Raise ValueError if one of them is not a category of the league.
+        """
+        mask = 0
+        for category in categories:
+            if category not in self._bits:
+                raise ValueError('unknown category %r, expected one of %s' %
+                                 (category, ', '.join(self._categories)))
+            mask |= self._bits[category]
+        return mask
+
+    def powerMatrix(self, categories=None, flipped=()):
+        """Return the PowerMatrix for some of the categories.
+
+           Keyword arguments:
+           categories -- the category names to score (default None, ie,
+                         all of them)
+           flipped -- category names to score the other way around from
+                      the league, ie, higher is better instead of lower or
+                      the reverse (default none)
+        """
+        used = self.mask(self._categories if categories is None
+                         else categories)
+        if not used:
+            raise ValueError('no categories to score')
+        lowerBetter = self._lowerBetter ^ self.mask(flipped)
+        higherBetter = used & ~lowerBetter
+        lowerBetter &= used
+        count = _popcount(used)
+        n = len(self._teams)
+        wins, losses, ties = [0] * (n * n), [0] * (n * n), [0] * (n * n)
+        for (k, (higher, lower)) in enumerate(zip(self._higher,
+                                                  self._lower)):
+            if k % (n + 1) == 0:
+                # a team against itself
+                continue
+            w = _popcount((higher & higherBetter) | (lower & lowerBetter))
+            l = _popcount((lower & higherBetter) | (higher & lowerBetter))
+            wins[k] = w
+            losses[k] = l
+            ties[k] = count - w - l
+        return PowerMatrix(self._teams, wins, losses, ties, self._pairings)
+
+    def rankings(self, categories=None, flipped=()):
+        """Return the power rankings for some of the categories, in the
+           shape of PowerRankings.powerRankings.
+
+           Keyword arguments are the same as for powerMatrix. With the
+           defaults, the result is the same as the rankings the analysis was
+           created from.
+        """
+        records = self.powerMatrix(categories, flipped).records()
+        return PowerRankings._rankings(
+            records, PowerRankings._oppAwps(records, self._schedules))
+
+    def dropOneVariants(self):
+        """Return a dict of category name to the power rankings computed
+           without that category (and with every other one)."""
+        return dict((category,
+                     self.rankings([other for other in self._categories
+                                    if other != category]))
+                    for category in self._categories)
+
+
+def main(args):
+    from rankings_cli import readConfig, rankingsOptions
+
+    properties = readConfig(args.config)
+    season = SeasonRankings(properties['leagueId'], properties['seasonId'],
+                            properties['lowerBetter'].split(','),
+                            **rankingsOptions(properties))
+    season.loginESPN(properties['username'], properties['password'])
+    analysis = CategoryAnalysis.fromRankings(season)
+    ranks = dict((row['team'], row['rank']) for row in analysis.rankings())
+    categories = analysis.categories()
+    # the rank each team would have had without each category
+    print('%-30s %4s  %s' % ('team', 'rank',
+                             ' '.join('%6s' % ('-' + category)
+                                      for category in categories)))
+    variants = analysis.dropOneVariants()
+    for team in sorted(ranks, key=ranks.get):
+        print('%-30s %4d  %s' % (team, ranks[team], ' '.join(
+            '%6d' % next(row['rank'] for row in variants[category]
+                         if row['team'] == team)
+            for category in categories)))
+
+if __name__ == '__main__':
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('-c', '--config', default='pr.conf',
+                        help='league configuration file')
+
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,378 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2015 Michel Mansour
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+"""
+Where the league data comes from.
+
+PowerRankings reads every team, schedule and category total through a data
+source, which fetches them through a LeagueSnapshot (so each page or
+response is downloaded and parsed at most once per run) and returns them as
+plain Python values. The source decides how many requests that takes.
+
+Classes provided:
+DataSource -- The methods every data source provides
+HtmlSource -- Scrape ESPN's league pages, one page per team schedule
+JsonSource -- Read ESPN's JSON API, two requests for the whole league
+"""
+
+import abc
+import datetime
+import json
+import re
+import threading
+
+
+class DataSource(abc.ABC):
+    """
+    The league data a PowerRankings instance needs.
+
+    Public methods:
+        teamAbbreviations -- A dict of team name to abbreviation
+        teamIds -- The list of team IDs
+        fetchSchedule -- Download a team's schedule without parsing it
+        teamMatchups -- A team's name and (end date, opponent) matchups
+        standings -- The season's category totals for every team
+        scoreboard -- A week's category totals for every matchup
+        pollScoreboard -- The same, downloaded again only if it changed
+
+    Category totals are returned as a tuple (categories, rows) for the
+    standings and as a list of (categories, ((team, totals), (opponent,
+    totals))) matchups for a scoreboard, where categories is the list of
+    category names and each team's totals are in that order, as numbers or
+    numeric strings.
+
+    Public instance variables:
+        None
+    """
+
+    def __init__(self, snapshot, leagueId, seasonId):
+        """Create a DataSource.
+
+           Required arguments:
+           snapshot -- the LeagueSnapshot to fetch through
+           leagueId -- the ESPN league ID
+           seasonId -- the season ID (the year)
+        """
+        self._snapshot = snapshot
+        self._leagueId = leagueId
+        self._seasonId = seasonId
+
+    @abc.abstractmethod
+    def teamAbbreviations(self):
+        """Return a dict of team name to its abbreviation."""
+
+    @abc.abstractmethod
+    def teamIds(self):
+        """Return the list of team IDs, as strings."""
+
+    @abc.abstractmethod
+    def fetchSchedule(self, teamId):
+        """Download what teamMatchups needs for a team, and return the text
+           for it to parse, or None if there is nothing left to parse. This
+           may be called from several threads at once."""
+
+    @abc.abstractmethod
+    def teamMatchups(self, teamId, text=None):
+        """Return a tuple of the team's name and its list of (end date,
+           opponent) regular season matchups, in schedule order.
+
+           Keyword arguments:
+           text -- the text returned by fetchSchedule (default None, ie,
+                   fetch it)
+        """
+
+    @abc.abstractmethod
+    def standings(self):
+        """Return the season's category totals, as (categories, rows),
+           where each row is a tuple (team, totals)."""
+
+    @abc.abstractmethod
+    def scoreboard(self, week, immutableAfter=None):
+        """Return the category totals of a week's matchups.
+
+           Required arguments:
+           week -- the week (matchup period)
+
+           Keyword arguments:
+           immutableAfter -- a date after which the week no longer changes
+                             (default None)
+        """
+
+    @abc.abstractmethod
+    def pollScoreboard(self, week):
+        """Return a tuple of whether the week's scoreboard changed since the
+           last poll (always True for the first) and its matchups, as
+           returned by scoreboard. An unchanged scoreboard is not parsed
+           again."""
+
+
+class HtmlSource(DataSource):
+    """
+    Scrape the league's pages on games.espn.go.com.
+
+    This takes one request for the team abbreviations, one for the team
+    IDs, one per team schedule, and one for the standings or each
+    scoreboard.
+    """
+
+    _URL = 'http://games.espn.go.com/flb/'
+
+    def __init__(self, snapshot, leagueId, seasonId, parser):
+        """Create an HtmlSource.
+
+           Required arguments are the same as for DataSource, plus:
+           parser -- the page parser, one of the page_parsers classes
+        """
+        DataSource.__init__(self, snapshot, leagueId, seasonId)
+        self._parser = parser
+
+    def _params(self, **extra):
+        params = {'leagueId': self._leagueId, 'seasonId': self._seasonId}
+        params.update(extra)
+        return params
+
+    def teamAbbreviations(self):
+        return dict(self._snapshot.page(
+            HtmlSource._URL + 'leaguesetup/ownerinfo', self._params(),
+            self._parser.ownerInfo))
+
+    def teamIds(self):
+        return self._snapshot.page(HtmlSource._URL + 'schedule',
+                                   self._params(), self._parser.teamIds)
+
+    def fetchSchedule(self, teamId):
+        return self._snapshot.fetch(HtmlSource._URL + 'schedule',
+                                    self._params(teamId=teamId))
+
+    def _extractMatchup(self, matchupRow):
+        (matchupDate, opponent) = matchupRow
+        # first get the date
+        startIndex = matchupDate.find('(')
+        endIndex = matchupDate.find(')')
+        dateRange = matchupDate[startIndex + 1:endIndex]
+        # if the start and end of the matchup are in the same month
+        # then the date looks like (MON x - y)
+        # but if they are in different months
+        # then the date looks like (MON x - MON y)
+        if re.compile(r'\w{3}\s\d+ - \w{3}\s\d+').match(dateRange):
+            endDateStr = dateRange.split('-')[1].strip()
+        else:
+            endDateStr = dateRange[:3] + ' ' + dateRange[-2:].strip()
+        endDate = datetime.datetime.strptime(self._seasonId + ' ' + endDateStr,
+                                             '%Y %b %d').date()
+
+        # then the opponent
+        # there is no way to tell that we've looked at the whole season except
+        # that the number of columns has changed, in which case the parser
+        # finds no opponent
+        if opponent is None:
+            endDate = None
+
+        return (endDate, opponent)
+
+    def teamMatchups(self, teamId, text=None):
+        (teamName, teamMatchupRows) = self._snapshot.page(
+            HtmlSource._URL + 'schedule', self._params(teamId=teamId),
+            self._parser.teamSchedule, text=text)
+        # the schedule ends at the first row without an opponent
+        matchups = []
+        for matchupRow in teamMatchupRows:
+            (endDate, opponent) = self._extractMatchup(matchupRow)
+            if endDate is None:
+                break
+            matchups.append((endDate, opponent))
+        return (teamName, matchups)
+
+    def standings(self):
+        return self._snapshot.page(HtmlSource._URL + 'standings',
+                                   self._params(), self._parser.standings)
+
+    def scoreboard(self, week, immutableAfter=None):
+        return self._snapshot.page(HtmlSource._URL + 'scoreboard',
+                                   self._params(matchupPeriodId=week),
+                                   self._parser.scoreboard,
+                                   immutableAfter=immutableAfter)
+
+    def pollScoreboard(self, week):
+        return self._snapshot.poll(HtmlSource._URL + 'scoreboard',
+                                   self._params(matchupPeriodId=week),
+                                   self._parser.scoreboard)
+
+
+class JsonSource(DataSource):
+    """
+    Read the league from ESPN's JSON API.
+
+    One request (the mTeam view) returns the teams, the scoring categories,
+    the matchup periods and the season totals, and another (the
+    mMatchupScore view) returns every matchup of the season with its
+    category totals, so a run takes two requests whatever the size of the
+    league, and parsing them is a json.loads each.
+    """
+
+    _URL = ('https://fantasy.espn.com/apis/v3/games/flb/seasons/%s/'
+            'segments/0/leagues/%s')
+
+    # ESPN's baseball stat IDs and the abbreviations its league pages show
+    # for them; where batters and pitchers share an abbreviation, the less
+    # common one is prefixed with B_ or P_
+    STAT_ABBREVIATIONS = {
+        0: 'AB', 1: 'H', 2: 'AVG', 3: '2B', 4: '3B', 5: 'HR', 6: 'XBH',
+        7: '1B', 8: 'TB', 9: 'SLG', 10: 'BB', 11: 'IBB', 12: 'HBP', 13: 'SF',
+        14: 'SH', 15: 'SAC', 16: 'PA', 17: 'OBP', 18: 'OPS', 19: 'RC',
+        20: 'R', 21: 'RBI', 23: 'SB', 24: 'CS', 25: 'NSB', 26: 'GIDP',
+        27: 'B_K', 28: 'PS', 29: 'PPA', 31: 'CYC', 32: 'GP', 33: 'GS',
+        34: 'IP', 35: 'BF', 36: 'PC', 37: 'P_H', 38: 'OBA', 39: 'P_BB',
+        40: 'P_IBB', 41: 'WHIP', 42: 'P_HBP', 43: 'OOBP', 44: 'P_R',
+        45: 'ER', 46: 'P_HR', 47: 'ERA', 48: 'K', 49: 'K/9', 50: 'WP',
+        51: 'BLK', 52: 'PK', 53: 'W', 54: 'L', 55: 'WPCT', 56: 'SOP',
+        57: 'SV', 58: 'BS', 59: 'SV%', 60: 'HD', 62: 'CG', 63: 'QS',
+        65: 'NH', 66: 'PG', 67: 'TC', 68: 'PO', 69: 'A', 70: 'OFA',
+        71: 'FPCT', 72: 'E', 73: 'DP', 81: 'G', 82: 'K/BB', 83: 'SVHD',
+    }
+
+    def __init__(self, snapshot, leagueId, seasonId):
+        """Create a JsonSource.
+
+           Required arguments are the same as for DataSource.
+        """
+        DataSource.__init__(self, snapshot, leagueId, seasonId)
+        self._url = JsonSource._URL % (seasonId, leagueId)
+        self._scheduleLock = threading.Lock()
+
+    @staticmethod
+    def _readLeague(text):
+        league = json.loads(text)
+        items = league['settings']['scoringSettings']['scoringItems']
+        statIds = [str(item['statId']) for item in items]
+        periods = dict(
+            (period['id'],
+             datetime.datetime.strptime(period['endDate'], '%Y-%m-%d').date())
+            for period in league['settings']['scheduleSettings'][
+                'matchupPeriods'])
+        teams = [(str(team['id']), team['name'], team['abbrev'],
+                  [team['valuesByStat'].get(statId, 0) for statId in statIds])
+                 for team in league['teams']]
+        return {'categories': [JsonSource._category(item['statId'])
+                               for item in items],
+                'statIds': statIds, 'periods': periods, 'teams': teams}
+
+    @staticmethod
+    def _category(statId):
+        try:
+            return JsonSource.STAT_ABBREVIATIONS[int(statId)]
+        except KeyError:
+            # a made-up name would never match the lower-is-better
+            # categories in the configuration, so refuse to guess
+            raise ValueError('unknown ESPN stat ID %s: add it to '
+                             'JsonSource.STAT_ABBREVIATIONS' % statId)
+
+    def _league(self):
+        return self._snapshot.page(self._url, {'view': 'mTeam'},
+                                   JsonSource._readLeague)
+
+    def _teamNames(self):
+        return dict((teamId, name) for (teamId, name, abbr, totals)
+                    in self._league()['teams'])
+
+    def _matchups(self):
+        return self._snapshot.page(self._url, {'view': 'mMatchupScore'},
+                                   json.loads)
+
+    def _buildSchedules(self):
+        periods = self._league()['periods']
+        names = self._teamNames()
+        schedules = dict((teamId, []) for teamId in names)
+        for matchup in self._matchups()['schedule']:
+            if 'away' not in matchup:
+                # a bye
+                continue
+            week = matchup['matchupPeriodId']
+            if week not in periods:
+                # a playoff round, which is not part of the regular season
+                # (the HTML schedule ends at its rows without an opponent)
+                continue
+            home = str(matchup['home']['teamId'])
+            away = str(matchup['away']['teamId'])
+            schedules[home].append((week, names[away]))
+            schedules[away].append((week, names[home]))
+        return dict((teamId, (names[teamId],
+                              [(periods[week], opponent) for (week, opponent)
+                               in sorted(schedules[teamId])]))
+                    for teamId in names)
+
+    def _schedules(self):
+        return self._snapshot.derived(('jsonSchedules', self._url),
+                                      self._buildSchedules)
+
+    def _weekMatchups(self, matchups, week):
+        league = self._league()
+        names = self._teamNames()
+        result = []
+        for matchup in matchups['schedule']:
+            if matchup['matchupPeriodId'] != int(week) or \
+                    'away' not in matchup:
+                continue
+            teams = []
+            for side in (matchup['home'], matchup['away']):
+                scores = side.get('cumulativeScore', {}).get('scoreByStat',
+                                                             {})
+                teams.append((names[str(side['teamId'])],
+                              [scores.get(statId, {}).get('score', 0)
+                               for statId in league['statIds']]))
+            result.append((league['categories'], tuple(teams)))
+        return result
+
+    def teamAbbreviations(self):
+        return dict((name, abbr) for (teamId, name, abbr, totals)
+                    in self._league()['teams'])
+
+    def teamIds(self):
+        return [teamId for (teamId, name, abbr, totals)
+                in self._league()['teams']]
+
+    def fetchSchedule(self, teamId):
+        # every schedule comes in the same response: the first caller
+        # downloads it while the others wait for it
+        with self._scheduleLock:
+            self._schedules()
+        return None
+
+    def teamMatchups(self, teamId, text=None):
+        return self._schedules()[str(teamId)]
+
+    def standings(self):
+        league = self._league()
+        return (league['categories'],
+                [(name, totals) for (teamId, name, abbr, totals)
+                 in league['teams']])
+
+    def scoreboard(self, week, immutableAfter=None):
+        # the response covers the whole season, so it is never immutable
+        # before the season is over
+        return self._weekMatchups(self._matchups(), week)
+
+    def pollScoreboard(self, week):
+        (changed, matchups) = self._snapshot.poll(
+            self._url, {'view': 'mMatchupScore'}, json.loads)
+        return (changed, self._weekMatchups(matchups, week))
@@ -0,0 +1,182 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2015 Michel Mansour
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""
+Write power rankings in machine-readable formats.
+
+Functions provided:
+writeJsonLines -- One JSON object per team
+writeCsv -- One CSV row per team
+writeMatrix -- The power matrix in a compact binary layout
+readMatrix -- Memory-map a matrix written by writeMatrix
+
+Classes provided:
+MappedMatrix -- A power matrix read from a file without parsing
+
+The matrix layout is, in little-endian byte order:
+    magic        4 bytes   b'FBPM'
+    version      uint32    1
+    n            uint32    number of teams
+    namesLength  uint32    length of the names block in bytes
+    names        namesLength bytes of UTF-8 team names, each followed by a
+                 NUL byte, padded with NUL bytes to a multiple of 8
+    wins         n * n uint16, row-major: [i * n + j] is the number of
+                 categories team i won against team j
+    losses       n * n uint16, the same for losses
+    ties         n * n uint16, the same for ties (0 on the diagonal)
+Teams are sorted by name. The arrays start at an 8-byte aligned offset, so
+they can be used in place from a memory map.
+"""
+
+import csv
+import json
+import mmap
+import struct
+import sys
+from array import array
+
+_MAGIC = b'FBPM'
+_VERSION = 1
+_HEADER = struct.Struct('<4sIII')
+_CSV_FIELDS = ['rank', 'team', 'wins', 'losses', 'ties', 'awp', 'oppAwp',
+               'matchupOpp']
+
+
+def writeJsonLines(rankings, out):
+    """Write one JSON object per team to the text stream out.
+
+       Each line holds a row of the rankings as returned by
+       PowerRankings.powerRankings, including its 'powerRow'. Rows are
+       written one at a time, so the output can be consumed as a stream.
+    """
+    for row in rankings:
+        out.write(json.dumps(row, sort_keys=True))
+        out.write('\n')
+
+
+def writeCsv(rankings, out):
+    """Write the standings, one row per team, as CSV to the text stream out.
+
+       The columns are rank, team, wins, losses, ties, awp, oppAwp and
+       matchupOpp; use writeMatrix for the team-against-team records.
+    """
+    writer = csv.DictWriter(out, _CSV_FIELDS, extrasaction='ignore',
+                            lineterminator='\n')
+    writer.writeheader()
+    for row in rankings:
+        writer.writerow(row)
+
+
+def _littleEndian(values):
+    cells = array('H', values)
+    if sys.byteorder != 'little':
+        cells.byteswap()
+    return cells
+
+
+def writeMatrix(rankings, out):
+    """Write the power matrix of the rankings to the binary stream out.
+
+       See the module documentation for the layout.
+    """
+    teams = sorted(row['team'] for row in rankings)
+    rows = dict((row['team'], row['powerRow']) for row in rankings)
+    names = b''.join(team.encode('utf-8') + b'\0' for team in teams)
+    names += b'\0' * (-(_HEADER.size + len(names)) % 8)
+    out.write(_HEADER.pack(_MAGIC, _VERSION, len(teams), len(names)))
+    out.write(names)
+    for field in ('wins', 'losses', 'ties'):
+        out.write(_littleEndian(rows[team][opp][field] if team != opp else 0
+                                for team in teams
+                                for opp in teams).tobytes())
+
+
+class MappedMatrix:
+    """
+    A power matrix file mapped into memory.
+
+    Opening one reads only the header and team names; the records are read
+    from the map as they are used.
+
+    Public methods:
+        teams -- The team names, in file order
+        record -- One team's (wins, losses, ties) against another
+        close -- Release the map
+
+    Public instance variables:
+        wins, losses, ties -- flat sequences of n * n counts, indexed by
+                              i * n + j in the order of teams()
+    """
+
+    def __init__(self, path):
+        """Map the matrix file at path. Raise ValueError if it is not one."""
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, n, namesLength) = _HEADER.unpack_from(self._map)
+        if magic != _MAGIC or version != _VERSION:
+            self._map.close()
+            raise ValueError('%s is not a power matrix file' % path)
+        start = _HEADER.size
+        names = self._map[start:start + namesLength].rstrip(b'\0')
+        self._teams = [name.decode('utf-8') for name in names.split(b'\0')] \
+            if n else []
+        self._index = dict((team, i) for (i, team) in enumerate(self._teams))
+        offset = start + namesLength
+        size = n * n * 2
+        arrays = []
+        for k in range(3):
+            view = memoryview(self._map)[offset + k * size:
+                                         offset + (k + 1) * size]
+            if sys.byteorder == 'little':
+                arrays.append(view.cast('H'))
+            else:
+                cells = array('H', view.tobytes())
+                cells.byteswap()
+                arrays.append(cells)
+        (self.wins, self.losses, self.ties) = arrays
+
+    def teams(self):
+        """Return the list of team names, in file order."""
+        return list(self._teams)
+
+    def record(self, team, opp):
+        """Return the (wins, losses, ties) of team against opp."""
+        cell = self._index[team] * len(self._teams) + self._index[opp]
+        return (self.wins[cell], self.losses[cell], self.ties[cell])
+
+    def close(self):
+        """Release the memory map."""
+        for view in (self.wins, self.losses, self.ties):
+            if isinstance(view, memoryview):
+                view.release()
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excInfo):
+        self.close()
+
+
+def readMatrix(path):
+    """Return a MappedMatrix for the matrix file at path."""
+    return MappedMatrix(path)
@@ -0,0 +1,505 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# The MIT License (MIT)
+#
+# Copyright (c) 2015 Michel Mansour
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""\
+Serve ESPN-like league pages from a local HTTP server.
+
+The server answers with either a synthetic league of any size or with
+responses recorded by replay.RecordingSession, so the rankings can be
+computed, benchmarked and tested without games.espn.go.com.
+"""
+
+try:
+    from .data_sources import JsonSource
+    from .replay import Captures
+except ImportError:
+    from data_sources import JsonSource
+    from replay import Captures
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import collections
+import datetime
+import hashlib
+import json
+import random
+import threading
+import urllib.parse
+import requests
+
+
+# the stat IDs that a synthetic league scores, the usual 5x5 categories
+# first and then the rest of the stats ESPN offers
+_USUAL_STAT_IDS = [20, 5, 21, 23, 2, 48, 53, 57, 47, 41]
+_STAT_IDS = _USUAL_STAT_IDS + sorted(
+    set(JsonSource.STAT_ABBREVIATIONS) - set(_USUAL_STAT_IDS))
+
+
+class SyntheticLeague:
+    """
+    A randomly generated league that renders the pages the scrapers read,
+    and the JSON API responses that data_sources.JsonSource reads.
+
+    Every team plays one opponent per week, following a round-robin
+    schedule, and each team's weekly totals are random integers. Category
+    and season totals are deterministic for a given seed.
+
+    Public methods:
+        respond -- The (status, body) for a request path and query
+        teamNames -- The names of the teams
+        seasonId -- The season of the league
+        score -- Add to a team's total in a category, as if games were played
+    """
+
+    def __init__(self, teams=10, categories=10, weeks=22, seasonId=None,
+                 seed=0):
+        """Create a SyntheticLeague.
+
+           Keyword arguments:
+           teams -- the number of teams, which must be even (default 10)
+           categories -- the number of scoring categories, at most the
+                         number of ESPN stats (default 10)
+           weeks -- the number of matchup periods (default 22)
+           seasonId -- the season, ie the year (default last year, so that
+                       every matchup period has ended)
+           seed -- the random seed for the generated totals (default 0)
+        """
+        if teams < 2 or teams % 2:
+            raise ValueError('a synthetic league needs an even number of '
+                             'teams, not %d' % teams)
+        if categories > len(_STAT_IDS):
+            raise ValueError('a synthetic league has at most %d categories, '
+                             'not %d' % (len(_STAT_IDS), categories))
+        if seasonId is None:
+            seasonId = datetime.date.today().year - 1
+        rand = random.Random(seed)
+        self._seasonId = int(seasonId)
+        self._names = ['Team %03d' % i for i in range(teams)]
+        self._abbrs = ['T%03d' % i for i in range(teams)]
+        self._statIds = _STAT_IDS[:categories]
+        self._categories = [JsonSource.STAT_ABBREVIATIONS[statId]
+                            for statId in self._statIds]
+        openingDay = datetime.date(self._seasonId, 4, 6)
+        self._periods = [(openingDay + datetime.timedelta(days=7 * w),
+                          openingDay + datetime.timedelta(days=7 * w + 6))
+                         for w in range(weeks)]
+        # the circle method: team 0 stays put and the others rotate
+        self._pairings = []
+        for w in range(weeks):
+            others = list(range(1, teams))
+            shift = w % (teams - 1)
+            order = [0] + others[shift:] + others[:shift]
+            self._pairings.append([(order[i], order[teams - 1 - i])
+                                   for i in range(teams // 2)])
+        self._stats = [[[rand.randint(0, 50) for c in self._categories]
+                        for t in self._names] for w in self._periods]
+
+    def score(self, week, team, category, amount=1):
+        """Add amount to a team's total in a category for a week.
+
+           Required arguments:
+           week -- the week (matchup period), starting at 1
+           team -- the team's ordinal, starting at 0
+           category -- the category's ordinal, starting at 0
+
+           Keyword arguments:
+           amount -- how much to add (default 1)
+        """
+        self._stats[int(week) - 1][team][category] += amount
+
+    def teamNames(self):
+        """Return the list of team names."""
+        return list(self._names)
+
+    def seasonId(self):
+        """Return the season ID (the year) as a string."""
+        return str(self._seasonId)
+
+    def _opponent(self, week, team):
+        for (a, b) in self._pairings[week]:
+            if a == team:
+                return b
+            if b == team:
+                return a
+
+    @staticmethod
+    def _dateRange(start, end):
+        if start.month == end.month:
+            return '%s %d - %d' % (start.strftime('%b'), start.day, end.day)
+        return '%s %d - %s %d' % (start.strftime('%b'), start.day,
+                                  end.strftime('%b'), end.day)
+
+    def _ownerInfo(self):
+        rows = ''.join('<tr class="ownerRow"><td>%d</td><td>%s</td>'
+                       '<td><a href="#">%s</a></td><td>Owner</td></tr>' %
+                       (i + 1, abbr, name) for (i, (abbr, name)) in
+                       enumerate(zip(self._abbrs, self._names)))
+        return '<html><body><table>%s</table></body></html>' % rows
+
+    def _schedule(self, teamId):
+        options = '<option value="-1">All</option>' + ''.join(
+            '<option value="%d">%s</option>' % (i + 1, name)
+            for (i, name) in enumerate(self._names))
+        page = ['<html><body><h1>Schedule</h1>']
+        if teamId is not None:
+            team = int(teamId) - 1
+            page.append('<h1>%s Schedule </h1>' % self._names[team])
+        page.append('<div class="bodyCopy"><select>%s</select></div>' %
+                    options)
+        if teamId is not None:
+            page.append('<table><tr><td>Schedule</td></tr>'
+                        '<tr><td>Regular Season</td></tr>'
+                        '<tr><td>PERIOD</td><td>OPPONENT</td></tr>')
+            for (w, (start, end)) in enumerate(self._periods):
+                opponent = self._names[self._opponent(w, team)]
+                page.append('<tr><td>Matchup %d (%s)</td><td>Away</td>'
+                            '<td><a href="#">%s</a></td><td>Owner</td></tr>' %
+                            (w + 1, SyntheticLeague._dateRange(start, end),
+                             opponent))
+            (start, end) = self._periods[-1]
+            playoffs = (start + datetime.timedelta(days=7),
+                        end + datetime.timedelta(days=14))
+            page.append('<tr><td>Matchup %d (%s)</td><td>TBD</td></tr>'
+                        '</table>' % (len(self._periods) + 1,
+                                      SyntheticLeague._dateRange(*playoffs)))
+        page.append('</body></html>')
+        return ''.join(page)
+
+    def _scoreboard(self, week):
+        w = int(week) - 1
+        header = '<tr><th>NAME</th>%s<th>SCORE</th></tr>' % ''.join(
+            '<th>%s</th>' % category for category in self._categories)
+        page = ['<html><body><div id="scoreboardMatchups">']
+        for pairing in self._pairings[w]:
+            page.append('<table><tr class="tableHead"><th>Matchup</th></tr>')
+            page.append(header)
+            for team in pairing:
+                page.append('<tr><td class="teamName"><a href="#">%s</a></td>'
+                            % self._names[team])
+                page.append(''.join('<td id="total_%d_%d">%d</td>' %
+                                    (team, c, total) for (c, total) in
+                                    enumerate(self._stats[w][team])))
+                page.append('<td>0</td></tr>')
+            page.append('</table>')
+        page.append('</div></body></html>')
+        return ''.join(page)
+
+    def _standings(self):
+        page = ['<html><body><table id="statsTable">',
+                '<tr class="tableSubHead"><td>SEASON STATS</td></tr>',
+                '<tr class="tableSubHead"><td>TEAM</td>%s</tr>' % ''.join(
+                    '<td style="width:50px;"><a href="#">%s</a></td>' %
+                    category for category in self._categories)]
+        for (team, name) in enumerate(self._names):
+            page.append('<tr class="tableBody sortableRow">'
+                        '<td class="sortableTeamName"><a href="#">%s</a></td>'
+                        % name)
+            for c in range(len(self._categories)):
+                total = sum(week[team][c] for week in self._stats)
+                page.append('<td id="tmTotalStat_%d_%d">%d</td>' %
+                            (team, c, total))
+            page.append('</tr>')
+        page.append('</table></body></html>')
+        return ''.join(page)
+
+    def _leagueJson(self, view):
+        # the two views of the JSON API that data_sources.JsonSource reads
+        if view == 'mTeam':
+            return json.dumps({
+                'settings': {
+                    'scoringSettings': {'scoringItems': [
+                        {'statId': statId} for statId in self._statIds]},
+                    'scheduleSettings': {'matchupPeriods': [
+                        {'id': w + 1, 'startDate': start.isoformat(),
+                         'endDate': end.isoformat()}
+                        for (w, (start, end)) in enumerate(self._periods)]}},
+                'teams': [
+                    {'id': team + 1, 'abbrev': abbr, 'name': name,
+                     'valuesByStat': dict(
+                         (str(statId), sum(week[team][c]
+                                           for week in self._stats))
+                         for (c, statId) in enumerate(self._statIds))}
+                    for (team, (abbr, name)) in enumerate(zip(self._abbrs,
+                                                              self._names))]},
+                separators=(',', ':'))
+        elif view == 'mMatchupScore':
+            def side(w, team):
+                return {'teamId': team + 1, 'cumulativeScore': {
+                    'scoreByStat': dict(
+                        (str(statId), {'score': total})
+                        for (statId, total) in zip(self._statIds,
+                                                   self._stats[w][team]))}}
+            schedule = [{'matchupPeriodId': w + 1, 'home': side(w, home),
+                         'away': side(w, away)}
+                        for (w, pairings) in enumerate(self._pairings)
+                        for (home, away) in pairings]
+            # like ESPN, the schedule goes on into the playoffs, whose
+            # matchup periods are not among the regular season's
+            schedule.append({'matchupPeriodId': len(self._periods) + 1,
+                             'home': {'teamId': 1}, 'away': {'teamId': 2}})
+            return json.dumps({'schedule': schedule}, separators=(',', ':'))
+        return None
+
+    def respond(self, method, path, query):
+        """Return (status, body) for a request.
+
+           Required arguments:
+           method -- the HTTP method
+           path -- the URL path
+           query -- a dict of query parameters
+        """
+        if method != 'GET':
+            # logins and message posts simply succeed
+            return (200, '')
+        if '/apis/' in path:
+            body = self._leagueJson(query.get('view'))
+            return (200, body) if body is not None else (404, '')
+        endpoint = path.rstrip('/').rsplit('/', 1)[-1]
+        if endpoint == 'ownerinfo':
+            return (200, self._ownerInfo())
+        elif endpoint == 'schedule':
+            return (200, self._schedule(query.get('teamId')))
+        elif endpoint == 'scoreboard':
+            return (200, self._scoreboard(query['matchupPeriodId']))
+        elif endpoint == 'standings':
+            return (200, self._standings())
+        return (404, '')
+
+
+class CaptureLeague:
+    """Answer requests with the responses stored in a replay.Captures."""
+
+    def __init__(self, captures):
+        """Create a CaptureLeague.
+
+           Required arguments:
+           captures -- the replay.Captures to serve
+        """
+        self._captures = captures
+        # requests are matched on path and query, whatever host they were
+        # recorded from
+        self._byPath = {}
+        for key in captures.keys():
+            (method, url) = key.split(' ', 1)
+            parts = urllib.parse.urlsplit(url)
+            self._byPath[(method, parts.path, parts.query)] = key
+
+    def respond(self, method, path, query):
+        """Return (status, body) for a request, or a 404."""
+        key = self._byPath.get((method, path,
+                                Captures.query(query.items())))
+        if key is None:
+            return (404, '')
+        return self._captures.load(key)
+
+
+class FakeESPNServer:
+    """
+    A local HTTP server for a SyntheticLeague or CaptureLeague.
+
+    Use it as a context manager, or call start and stop. It counts the
+    requests it has served.
+
+    Public methods:
+        start -- Start serving in a background thread
+        stop -- Stop serving
+        url -- The base URL of the server
+        requestCount -- Number of requests served
+        fail -- Answer the next requests with errors
+    """
+
+    def __init__(self, league, port=0, latency=0):
+        """Create a FakeESPNServer.
+
+           Required arguments:
+           league -- the SyntheticLeague or CaptureLeague to serve
+
+           Keyword arguments:
+           port -- the port to listen on (default 0, ie, any free port)
+           latency -- seconds to wait before answering each request, to
+                      imitate a remote server (default 0)
+        """
+        self._league = league
+        self._latency = latency
+        self._requestCount = 0
+        self._failures = collections.deque()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', port),
+                                           self._handlerClass())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    def _handlerClass(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _respond(self):
+                with fake._lock:
+                    fake._requestCount += 1
+                    failure = fake._failures.popleft() \
+                        if fake._failures else None
+                if fake._latency:
+                    threading.Event().wait(fake._latency)
+                if failure is not None:
+                    (status, retryAfter) = failure
+                    self.send_response(status)
+                    self.send_header('Content-Length', '0')
+                    if retryAfter is not None:
+                        self.send_header('Retry-After', str(retryAfter))
+                    self.end_headers()
+                    return
+                parts = urllib.parse.urlsplit(self.path)
+                query = dict(urllib.parse.parse_qsl(parts.query,
+                                                    keep_blank_values=True))
+                (status, text) = fake._league.respond(self.command,
+                                                      parts.path, query)
+                body = text.encode('utf-8')
+                # like ESPN, answer a request for an unchanged page with 304
+                etag = '"%s"' % hashlib.sha1(body).hexdigest()
+                if status == 200 and \
+                        self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                self.send_response(status)
+                self.send_header('Content-Type', '%s; charset=utf-8' % (
+                    'application/json' if '/apis/' in parts.path
+                    else 'text/html'))
+                self.send_header('Content-Length', str(len(body)))
+                if status == 200:
+                    self.send_header('ETag', etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = _respond
+            do_POST = _respond
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def url(self):
+        """Return the base URL of the server, eg http://127.0.0.1:8000"""
+        return 'http://%s:%d' % self._server.server_address
+
+    def requestCount(self):
+        """Return the number of requests served so far."""
+        with self._lock:
+            return self._requestCount
+
+    def fail(self, *statuses, retryAfter=None):
+        """Answer the next requests, one for each of statuses, with that
+           status (eg 503, or 429 for a throttled request) and no body.
+
+           Keyword arguments:
+           retryAfter -- the seconds to send in a Retry-After header
+                         (default None, ie, no header)
+        """
+        with self._lock:
+            self._failures.extend((status, retryAfter)
+                                  for status in statuses)
+
+    def start(self):
+        """Start serving in a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and close the socket."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *excInfo):
+        self.stop()
+
+
+class LocalSession(requests.Session):
+    """
+    A requests.Session that sends every request to a local server.
+
+    The scheme and host of each URL are replaced with those of baseUrl,
+    so PowerRankings can talk to a FakeESPNServer unchanged.
+    """
+
+    def __init__(self, baseUrl):
+        """Create a LocalSession.
+
+           Required arguments:
+           baseUrl -- the server to send requests to, eg FakeESPNServer.url()
+        """
+        requests.Session.__init__(self)
+        self._base = urllib.parse.urlsplit(baseUrl)
+
+    def request(self, method, url, *args, **kwargs):
+        parts = urllib.parse.urlsplit(url)
+        url = urllib.parse.urlunsplit((self._base.scheme, self._base.netloc,
+                                       parts.path, parts.query,
+                                       parts.fragment))
+        return requests.Session.request(self, method, url, *args, **kwargs)
+
+
+def main(args):
+    if args.captures:
+        league = CaptureLeague(Captures(args.captures))
+    else:
+        league = SyntheticLeague(args.teams, args.categories, args.weeks,
+                                 args.seasonId, args.seed)
+    server = FakeESPNServer(league, args.port, args.latency)
+    print('Serving on %s' % server.url())
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server._server.server_close()
+
+if __name__ == '__main__':
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-p', '--port', type=int, default=8000,
+                        help='port to listen on')
+    parser.add_argument('--captures',
+                        help='serve the responses recorded in CAPTURES \
+                        instead of a synthetic league')
+    parser.add_argument('-t', '--teams', type=int, default=10,
+                        help='number of teams in the synthetic league')
+    parser.add_argument('-n', '--categories', type=int, default=10,
+                        help='number of scoring categories')
+    parser.add_argument('--weeks', type=int, default=22,
+                        help='number of matchup periods')
+    parser.add_argument('--season', dest='seasonId', type=int,
+                        help='season of the synthetic league')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='random seed for the synthetic league')
+    parser.add_argument('--latency', type=float, default=0,
+                        help='seconds to wait before each response')
+
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,283 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2015 Michel Mansour
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""
+Persistent on-disk cache for the pages downloaded from ESPN.
+
+Classes provided:
+ResponseCache -- Store page bodies by URL and query parameters
+"""
+
+import datetime
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    fetched REAL NOT NULL,
+    accessed REAL NOT NULL,
+    expires REAL NOT NULL,
+    etag TEXT,
+    lastModified TEXT,
+    immutable INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_eviction ON entries (immutable, accessed);
+'''
+
+
+class ResponseCache:
+    """
+    A size-bounded, least-recently-used cache of HTTP response bodies.
+
+    Entries are keyed by URL and query parameters and expire after a
+    time-to-live chosen per endpoint (the last component of the URL path,
+    eg 'scoreboard'). Expired entries that carry an ETag or Last-Modified
+    header are revalidated with a conditional request instead of being
+    downloaded again. Entries can also be marked immutable, which is used
+    for the scoreboards of matchup periods that have already ended; those
+    never expire and are the last to be evicted.
+
+    Each body is kept in its own file, and the entries are indexed in a
+    SQLite database in the same directory, so several processes can share
+    a cache directory: every change to the index is a transaction of its
+    own, and a body is only written or removed while the index is locked.
+    Body files left without an entry (by an interrupted run, or by an older
+    version of the cache) are removed when the cache is opened.
+
+    Public methods:
+        lookup -- Find the cached entry for a request
+        store -- Save a response body
+        refresh -- Extend the life of an entry after a 304 response
+        conditionalHeaders -- Headers to revalidate an expired entry
+        close -- Close the index
+
+    Public instance variables:
+        None
+    """
+    DEFAULT_TTLS = {
+        'ownerinfo': 24 * 60 * 60,
+        'schedule': 24 * 60 * 60,
+        'standings': 60 * 60,
+        'scoreboard': 10 * 60,
+    }
+    DEFAULT_TTL = 10 * 60
+    _INDEX = 'index.sqlite'
+
+    def __init__(self, directory, maxBytes=50 * 1024 * 1024, ttls=None):
+        """Create a ResponseCache instance.
+
+           Required arguments:
+           directory -- the directory to keep cached pages in; it is created
+                        if it does not exist
+
+           Keyword arguments:
+           maxBytes -- the total size of the cached bodies above which the
+                       least recently used entries are evicted (default 50MB)
+           ttls -- a dict of endpoint name to time-to-live in seconds,
+                   overriding ResponseCache.DEFAULT_TTLS
+        """
+        self._directory = directory
+        self._maxBytes = maxBytes
+        self._ttls = dict(ResponseCache.DEFAULT_TTLS)
+        if ttls:
+            self._ttls.update(ttls)
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        # the connection is shared by this process's threads, which take
+        # turns through self._lock; transactions are begun explicitly
+        self._db = sqlite3.connect(
+            os.path.join(directory, ResponseCache._INDEX), timeout=60,
+            isolation_level=None, check_same_thread=False)
+        with self._lock:
+            self._db.executescript(_SCHEMA)
+            with self._transaction():
+                self._sweep()
+
+    def close(self):
+        """Close the index."""
+        with self._lock:
+            self._db.close()
+
+    def _transaction(self):
+        return _Transaction(self._db)
+
+    def _sweep(self):
+        keys = set(row[0] for row in
+                   self._db.execute('SELECT key FROM entries'))
+        for name in os.listdir(self._directory):
+            (key, ext) = os.path.splitext(name)
+            if name.endswith('.html.tmp') or \
+                    (ext == '.html' and key not in keys):
+                try:
+                    os.remove(os.path.join(self._directory, name))
+                except OSError:
+                    pass
+
+    @staticmethod
+    def _key(url, params):
+        query = '&'.join('%s=%s' % kv for kv in
+                         sorted((str(k), str(v)) for k, v in params.items()))
+        return hashlib.sha1(('%s?%s' % (url, query)).encode('utf-8')).\
+            hexdigest()
+
+    def _ttl(self, url):
+        endpoint = url.rstrip('/').rsplit('/', 1)[-1]
+        return self._ttls.get(endpoint, ResponseCache.DEFAULT_TTL)
+
+    def _bodyPath(self, key):
+        return os.path.join(self._directory, key + '.html')
+
+    def _entry(self, key):
+        row = self._db.execute('SELECT fetched, expires, etag, lastModified, '
+                               'immutable FROM entries WHERE key = ?',
+                               (key,)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(('fetched', 'expires', 'etag', 'lastModified',
+                         'immutable'), row))
+
+    def lookup(self, url, params, immutableAfter=None):
+        """Return the cached entry for a request, or None.
+
+           The entry is a dict with the keys 'text' (the response body) and
+           'fresh' (True if it can be used without asking ESPN).
+
+           Required arguments:
+           url -- the page URL
+           params -- a dict of query parameters
+
+           Keyword arguments:
+           immutableAfter -- a date after which the page no longer changes;
+                             an entry downloaded after that date is marked
+                             immutable (default None)
+        """
+        key = ResponseCache._key(url, params)
+        with self._lock:
+            meta = self._entry(key)
+            if meta is None:
+                return None
+            try:
+                with open(self._bodyPath(key), 'r', encoding='utf-8') as f:
+                    text = f.read()
+            except OSError:
+                self._db.execute('DELETE FROM entries WHERE key = ?', (key,))
+                return None
+            now = time.time()
+            immutable = bool(meta['immutable']) or (
+                immutableAfter is not None and
+                datetime.date.fromtimestamp(meta['fetched']) >
+                immutableAfter)
+            # only this entry's row is updated
+            self._db.execute('UPDATE entries SET accessed = ?, immutable = ? '
+                             'WHERE key = ?', (now, int(immutable), key))
+            return {'text': text,
+                    'fresh': immutable or now < meta['expires']}
+
+    def conditionalHeaders(self, url, params):
+        """Return the headers to revalidate the cached copy of a request."""
+        with self._lock:
+            meta = self._entry(ResponseCache._key(url, params)) or {}
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('lastModified'):
+            headers['If-Modified-Since'] = meta['lastModified']
+        return headers
+
+    def store(self, url, params, text, headers, immutableAfter=None):
+        """Save a response body.
+
+           Required arguments:
+           url -- the page URL
+           params -- a dict of query parameters
+           text -- the response body
+           headers -- the response headers
+
+           Keyword arguments:
+           immutableAfter -- a date after which the page no longer changes;
+                             the entry is immutable if that date has passed
+                             (default None)
+        """
+        key = ResponseCache._key(url, params)
+        now = time.time()
+        immutable = (immutableAfter is not None and
+                     datetime.date.today() > immutableAfter)
+        body = text.encode('utf-8')
+        with self._lock, self._transaction():
+            tmpPath = self._bodyPath(key) + '.tmp'
+            with open(tmpPath, 'wb') as f:
+                f.write(body)
+            os.replace(tmpPath, self._bodyPath(key))
+            self._db.execute('INSERT OR REPLACE INTO entries VALUES '
+                             '(?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                             (key, url, len(body), now, now,
+                              now + self._ttl(url), headers.get('ETag'),
+                              headers.get('Last-Modified'), int(immutable)))
+            self._evict()
+
+    def refresh(self, url, params, headers):
+        """Restart the time-to-live of an entry that ESPN said is unchanged."""
+        key = ResponseCache._key(url, params)
+        now = time.time()
+        with self._lock:
+            self._db.execute('UPDATE entries SET expires = ?, accessed = ?, '
+                             'etag = COALESCE(?, etag) WHERE key = ?',
+                             (now + self._ttl(url), now, headers.get('ETag'),
+                              key))
+
+    def _evict(self):
+        # the total covers the entries of every process sharing the cache
+        (total,) = self._db.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()
+        if total <= self._maxBytes:
+            return
+        # mutable entries go first, oldest access first within each group
+        victims = self._db.execute('SELECT key, size FROM entries '
+                                   'ORDER BY immutable, accessed').fetchall()
+        for (key, size) in victims:
+            if total <= self._maxBytes:
+                break
+            try:
+                os.remove(self._bodyPath(key))
+            except OSError:
+                pass
+            self._db.execute('DELETE FROM entries WHERE key = ?', (key,))
+            total -= size
+
+
+class _Transaction:
+    # BEGIN IMMEDIATE takes the index's write lock at once, so no other
+    # process can change the index (or sweep bodies) until the commit
+    def __init__(self, db):
+        self._db = db
+
+    def __enter__(self):
+        self._db.execute('BEGIN IMMEDIATE')
+
+    def __exit__(self, excType, *excInfo):
+        self._db.execute('COMMIT' if excType is None else 'ROLLBACK')
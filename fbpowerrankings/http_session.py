@@ -0,0 +1,200 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2015 Michel Mansour
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""
+Talk to ESPN without hammering it, and without hanging on it.
+
+Classes provided:
+TokenBucket -- Limit the rate of events while allowing short bursts
+ESPNSession -- A requests.Session with rate limits, timeouts and retries
+"""
+
+import random
+import threading
+import time
+import urllib.parse
+import requests
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket.
+
+    Tokens are added at a steady rate up to a maximum of burst tokens, and
+    every event takes one. An event that finds the bucket empty waits for
+    the next token; waiting events are served in the order they arrived.
+    """
+
+    def __init__(self, rate, burst=1):
+        """Create a TokenBucket, initially full.
+
+           Required arguments:
+           rate -- the number of tokens added per second
+
+           Keyword arguments:
+           burst -- the most tokens the bucket holds (default 1)
+        """
+        self._rate = float(rate)
+        self._burst = max(1, int(burst))
+        self._tokens = float(self._burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token, sleeping until one is available. Return the number
+           of seconds spent waiting."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._burst, self._tokens +
+                               (now - self._last) * self._rate)
+            self._last = now
+            # reserve the token now, even if it has not been added yet, so
+            # that the next caller queues up behind this one
+            self._tokens -= 1
+            wait = -self._tokens / self._rate if self._tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class ESPNSession(requests.Session):
+    """
+    A requests.Session for talking to ESPN.
+
+    Requests to each host are rate limited by their own TokenBucket, every
+    request gets a timeout unless it sets one itself, and connections are
+    pooled so that parallel requests reuse them. A request that fails with
+    a server error (5xx) or is throttled (429), or that cannot connect or
+    times out, is retried after an exponentially growing, randomly
+    jittered delay (or the server's Retry-After, if longer). Only requests
+    that are safe to repeat are retried after a server error or a network
+    failure; a POST is only retried when it was throttled, so a message is
+    never posted twice. A server error or throttled response that is not
+    retried, or still fails after the last retry, raises
+    requests.HTTPError.
+
+    Public methods, in addition to those of requests.Session:
+        counters -- What the session has done so far
+    """
+
+    _IDEMPOTENT = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, rate=0, burst=1, timeout=30, retries=3, backoff=0.5,
+                 maxBackoff=30, poolSize=10):
+        """Create an ESPNSession.
+
+           Keyword arguments:
+           rate -- the most requests per second to send to any one host, or
+                   0 for no limit (default 0)
+           burst -- how many requests to a host may be sent at once before
+                    the rate limit applies (default 1)
+           timeout -- seconds to wait for a connection or a response before
+                      giving up (default 30)
+           retries -- the number of times to retry a failed request
+                      (default 3)
+           backoff -- the delay before the first retry, in seconds; each
+                      retry may wait up to twice as long as the previous one
+                      (default 0.5)
+           maxBackoff -- the longest delay before a retry (default 30)
+           poolSize -- the number of connections to keep open to each host
+                       (default 10)
+        """
+        requests.Session.__init__(self)
+        self._rate = float(rate)
+        self._burst = burst
+        self._timeout = timeout
+        self._retries = int(retries)
+        self._backoff = float(backoff)
+        self._maxBackoff = float(maxBackoff)
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=int(poolSize))
+        self.mount('http://', adapter)
+        self.mount('https://', adapter)
+        self._buckets = {}
+        self._counters = {'requests': 0, 'retries': 0, 'failures': 0,
+                          'throttled': 0, 'serverErrors': 0,
+                          'networkErrors': 0, 'rateLimitSeconds': 0.0}
+        self._lock = threading.Lock()
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def counters(self):
+        """Return a dict of counters: the 'requests' sent (retries
+           included), 'retries', 'failures' (requests given up on), the
+           'throttled' (429) and 'serverErrors' (5xx) responses, the
+           'networkErrors' (failed connections and timeouts), and the
+           'rateLimitSeconds' spent waiting for the rate limit."""
+        with self._lock:
+            return dict(self._counters)
+
+    def _bucket(self, url):
+        if self._rate <= 0:
+            return None
+        host = urllib.parse.urlsplit(url).netloc
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(self._rate, self._burst)
+            return self._buckets[host]
+
+    def _delay(self, attempt, retryAfter=None):
+        # "full jitter": anywhere between no wait and the exponential cap,
+        # so that clients that failed together do not retry together
+        delay = random.uniform(0, min(self._maxBackoff,
+                                      self._backoff * 2 ** attempt))
+        if retryAfter is not None and retryAfter.strip().isdigit():
+            delay = max(delay, min(self._maxBackoff, int(retryAfter)))
+        return delay
+
+    def request(self, method, url, *args, **kwargs):
+        kwargs.setdefault('timeout', self._timeout)
+        idempotent = method.upper() in ESPNSession._IDEMPOTENT
+        bucket = self._bucket(url)
+        attempt = 0
+        while True:
+            if bucket is not None:
+                self._count('rateLimitSeconds', bucket.acquire())
+            self._count('requests')
+            retryAfter = None
+            try:
+                r = super().request(method, url, *args, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                self._count('networkErrors')
+                if not idempotent or attempt >= self._retries:
+                    self._count('failures')
+                    raise
+            else:
+                if r.status_code == 429:
+                    self._count('throttled')
+                    retry = True
+                    retryAfter = r.headers.get('Retry-After')
+                elif r.status_code >= 500:
+                    self._count('serverErrors')
+                    retry = idempotent
+                else:
+                    return r
+                if not retry or attempt >= self._retries:
+                    self._count('failures')
+                    r.raise_for_status()
+            self._count('retries')
+            time.sleep(self._delay(attempt, retryAfter))
+            attempt += 1
@@ -0,0 +1,192 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2015 Michel Mansour
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""
+Measure where the time of a rankings run goes.
+
+Classes provided:
+Profiler -- Collect per-stage timings, request counts and memory use
+
+Functions provided:
+instrumented -- Decorate a PowerRankings method to be timed as a stage
+"""
+
+import cProfile
+import functools
+import json
+import threading
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+class Profiler:
+    """
+    Per-stage instrumentation for a rankings run.
+
+    Each stage records how many times it ran, its total wall time, the HTTP
+    requests made and bytes downloaded while it ran, and the process's peak
+    memory (maximum resident set size) when it last finished. Stages nest:
+    a stage includes the time and requests of the stages it calls on the
+    same thread. Stages named in cprofileStages also run under cProfile.
+
+    Public methods:
+        stage -- Context manager that times a stage
+        recordRequest -- Attribute an HTTP request to the running stages
+        report -- The collected measurements as a dict
+        writeReport -- Write the report as JSON
+        writeCProfile -- Write the cProfile statistics
+
+    Public instance variables:
+        None
+    """
+
+    def __init__(self, cprofileStages=()):
+        """Create a Profiler.
+
+           Keyword arguments:
+           cprofileStages -- names of the stages to run under cProfile
+                             (default none)
+        """
+        self._stages = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._start = time.perf_counter()
+        self._cprofileStages = frozenset(cprofileStages)
+        self._cprofile = cProfile.Profile() if cprofileStages else None
+        self._cprofileDepth = 0
+
+    def _running(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def _record(self, name):
+        if name not in self._stages:
+            self._stages[name] = {'calls': 0, 'seconds': 0.0, 'requests': 0,
+                                  'bytes': 0, 'peakRssKB': None}
+        return self._stages[name]
+
+    def recordRequest(self, nbytes):
+        """Count a request of nbytes against every stage running on this
+           thread, and against the run as a whole."""
+        with self._lock:
+            for name in set(self._running()) | {None}:
+                record = self._record(name)
+                record['requests'] += 1
+                record['bytes'] += nbytes
+
+    def _cprofileEnable(self, name):
+        # cProfile only follows the thread that enabled it
+        if name not in self._cprofileStages or \
+                threading.current_thread() is not threading.main_thread():
+            return False
+        if self._cprofileDepth == 0:
+            self._cprofile.enable()
+        self._cprofileDepth += 1
+        return True
+
+    def _cprofileDisable(self):
+        self._cprofileDepth -= 1
+        if self._cprofileDepth == 0:
+            self._cprofile.disable()
+
+    def stage(self, name):
+        """Return a context manager that times the stage called name."""
+        return _Stage(self, name)
+
+    def _enter(self, name):
+        self._running().append(name)
+        return (time.perf_counter(), self._cprofileEnable(name))
+
+    def _exit(self, name, token):
+        (start, profiled) = token
+        elapsed = time.perf_counter() - start
+        if profiled:
+            self._cprofileDisable()
+        self._running().pop()
+        peak = None
+        if resource is not None:
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        with self._lock:
+            record = self._record(name)
+            record['calls'] += 1
+            record['seconds'] += elapsed
+            record['peakRssKB'] = peak
+
+    def report(self):
+        """Return the measurements as a dict with the keys 'seconds',
+           'requests', 'bytes' (for the whole run) and 'stages' (a dict of
+           stage name to that stage's measurements)."""
+        with self._lock:
+            total = self._record(None)
+            stages = dict((name, dict(record))
+                          for (name, record) in self._stages.items()
+                          if name is not None)
+            return {'seconds': time.perf_counter() - self._start,
+                    'requests': total['requests'], 'bytes': total['bytes'],
+                    'stages': stages}
+
+    def writeReport(self, path, extra=None):
+        """Write the report to path as JSON, along with the entries of the
+           dict extra, if given."""
+        report = self.report()
+        report.update(extra or {})
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    def writeCProfile(self, path):
+        """Write the cProfile statistics of the profiled stages to path, in
+           the format read by the pstats module."""
+        if self._cprofile is not None:
+            self._cprofile.dump_stats(path)
+
+
+class _Stage:
+    def __init__(self, profiler, name):
+        self._profiler = profiler
+        self._name = name
+
+    def __enter__(self):
+        self._token = self._profiler._enter(self._name)
+        return self
+
+    def __exit__(self, *excInfo):
+        self._profiler._exit(self._name, self._token)
+
+
+def instrumented(name):
+    """Decorate a method so that it is timed as the stage called name by the
+       Profiler in the instance's _profiler attribute, if there is one."""
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            profiler = self._profiler
+            if profiler is None:
+                return method(self, *args, **kwargs)
+            with profiler.stage(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorate
@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# The MIT License (MIT)
+#
+# Copyright (c) 2015 Michel Mansour
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""\
+Keep a week's power rankings up to date while its matchups are played.
+
+The scoreboard is polled with conditional requests, so an unchanged
+scoreboard costs a 304 response and nothing else. When it has changed, only
+the teams whose category totals changed are compared against the rest of
+the league again, and the updated rankings are written to the output file
+(replaced atomically, so it can be served while it is being updated).
+Polling stops once the week's matchup period is over.
+
+Classes provided:
+LiveRankings -- Weekly rankings that follow the scoreboard as it changes
+"""
+
+try:
+    from .power_rankings import PowerRankings, WeeklyRankings
+except ImportError:
+    from power_rankings import PowerRankings, WeeklyRankings
+import argparse
+import os
+import sys
+import time
+
+
+class LiveRankings(WeeklyRankings):
+    """
+    Weekly rankings that follow the scoreboard as the week is played.
+
+    The power matrix is built in full on the first poll. After that, a
+    team whose totals changed has only its own row and column of the matrix
+    compared again, n - 1 team pairs instead of all n * n, and every team's
+    totals are adjusted as each cell changes. AWP and opponent AWP are then
+    read off the updated totals.
+
+    Public methods, in addition to those of WeeklyRankings:
+        poll -- Fetch the scoreboard and update the teams that changed
+        run -- Poll until the week is over, passing each update to a sink
+    """
+
+    def __init__(self, leagueId, seasonId, lowerBetterCategories, week,
+                 **kwargs):
+        """Create a LiveRankings instance.
+
+           Arguments are the same as for WeeklyRankings.
+        """
+        WeeklyRankings.__init__(self, leagueId, seasonId,
+                                lowerBetterCategories, week, **kwargs)
+        self._matrix = None
+        self._liveTotals = {}
+
+    def poll(self):
+        """Fetch the scoreboard if it changed and update the power matrix.
+
+           Return the sorted list of teams whose totals changed since the
+           last poll: every team on the first poll, and none if the
+           scoreboard is unchanged.
+        """
+        (changed, matchups) = self._source.pollScoreboard(self._week)
+        if not changed and self._matrix is not None:
+            return []
+        (totals, pairings) = self._matchupTotals(matchups)
+        if self._matrix is None or set(totals) != set(self._liveTotals):
+            if self._engine == 'numpy':
+                self._matrix = PowerRankings._numpyPowerMatrix(totals,
+                                                               pairings)
+            else:
+                self._matrix = PowerRankings._pythonPowerMatrix(totals,
+                                                                pairings)
+            self._liveTotals = totals
+            return sorted(totals)
+
+        changedTeams = sorted(team for team in totals
+                              if totals[team] != self._liveTotals[team])
+        for team in changedTeams:
+            self._liveTotals[team] = totals[team]
+            for opp in self._matrix.teams():
+                if opp == team:
+                    continue
+                w, l, t = 0, 0, 0
+                for cat in zip(totals[team], self._liveTotals[opp]):
+                    if cat[0] > cat[1]:
+                        w += 1
+                    elif cat[0] < cat[1]:
+                        l += 1
+                    else:
+                        t += 1
+                self._matrix.setRecord(team, opp, w, l, t)
+        return changedTeams
+
+    def powerMatrix(self):
+        """Return the live PowerMatrix, polling once if it is not built yet.
+
+           Override PowerRankings.powerMatrix
+           The matrix is updated in place by later polls.
+        """
+        if self._matrix is None:
+            self.poll()
+        return self._matrix
+
+    def run(self, sink, interval=300, maxPolls=None):
+        """Poll every interval seconds until the week is over.
+
+           After every poll that changed something, sink is called with the
+           updated rankings (as returned by powerRankings) and the sorted
+           list of teams whose totals changed.
+
+           Required arguments:
+           sink -- a function of (rankings, changedTeams)
+
+           Keyword arguments:
+           interval -- seconds between polls (default 300)
+           maxPolls -- stop after this many polls (default None, ie, only
+                       stop when the week is over)
+        """
+        polls = 0
+        while True:
+            changedTeams = self.poll()
+            polls += 1
+            if changedTeams:
+                sink(self.powerRankings(), changedTeams)
+            if self.isComplete() or \
+                    (maxPolls is not None and polls >= maxPolls):
+                return
+            time.sleep(interval)
+
+
+def main(args):
+    from rankings_cli import readConfig, currentWeek, rankingsOptions, \
+        writeOutput, OUTPUT_FORMATS
+
+    properties = readConfig(args.config)
+    week = args.week if args.week > 0 else currentWeek(properties)
+    live = LiveRankings(properties['leagueId'], properties['seasonId'],
+                        properties['lowerBetter'].split(','), week,
+                        **rankingsOptions(properties))
+    live.loginESPN(properties['username'], properties['password'])
+    teamAbbrMap = live.teamAbbreviations()
+    binary = OUTPUT_FORMATS[args.format][1]
+
+    def sink(rankings, changedTeams):
+        # write next to the output and rename it into place, so readers
+        # never see a half-written page
+        partial = args.output + '.partial'
+        with open(partial, 'wb' if binary else 'w') as outFile:
+            writeOutput(args.format, properties['leagueName'], teamAbbrMap,
+                        rankings, properties['seasonId'], week, outFile)
+        os.replace(partial, args.output)
+        sys.stderr.write('%s: updated %s\n' % (time.strftime('%X'),
+                                               ', '.join(changedTeams)))
+
+    live.run(sink, args.interval, args.maxPolls)
+
+if __name__ == '__main__':
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('-c', '--config', default='pr.conf',
+                        help='league configuration file')
+    parser.add_argument('-w', '--week', type=int, default=-1,
+                        help='week to follow (default the current week)')
+    parser.add_argument('-i', '--interval', type=float, default=300,
+                        help='seconds between polls of the scoreboard')
+    parser.add_argument('-n', '--max-polls', dest='maxPolls', type=int,
+                        help='stop after this many polls')
+    parser.add_argument('-o', '--output', default='live.html',
+                        help='file to keep up to date')
+    parser.add_argument('-f', '--format', default='html',
+                        choices=['html', 'jsonl', 'csv', 'matrix'],
+                        help='output format, as for rankings_cli.py')
+
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,288 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2015 Michel Mansour
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""
+Extract the data used for power rankings from ESPN league pages.
+
+Each parser turns the text of a page into plain Python values, so the rest
+of the code does not depend on how the page was parsed. Both parsers return
+exactly the same values for the same page.
+
+Classes provided:
+SoupParser -- Build a Beautiful Soup tree of the whole page
+LxmlParser -- Stream the page with lxml, keeping only the needed rows
+"""
+
+import io
+import re
+
+
+class SoupParser:
+    """
+    Extract league data by building a full Beautiful Soup tree.
+
+    Every parser provides the same methods:
+        ownerInfo -- Map team names to abbreviations (ownerinfo page)
+        teamIds -- List the team IDs (schedule page without a team)
+        teamSchedule -- A team's name and matchup rows (schedule page)
+        scoreboard -- Category totals for each matchup (scoreboard page)
+        standings -- Cumulative category totals (standings page)
+
+    A matchup row is a tuple (dateText, opponent), where dateText is the
+    text of the first cell, eg 'Matchup 1 (Apr 6 - 12)', and opponent is
+    None for rows that do not name an opponent. Stat totals are returned as
+    strings, in the order of the category names returned with them.
+    """
+
+    def __init__(self, features='lxml'):
+        """Create a SoupParser.
+
+           Keyword arguments:
+           features -- the Beautiful Soup tree builder (default 'lxml')
+        """
+        self._features = features
+
+    def _soup(self, text):
+        from bs4 import BeautifulSoup
+
+        return BeautifulSoup(text, self._features)
+
+    def ownerInfo(self, text):
+        teamAbbrMap = {}
+        ownerRows = self._soup(text).find_all("tr", "ownerRow")
+        for row in ownerRows:
+            cells = row.find_all("td")
+            if re.compile(r"[0-9]+").match(str(cells[0].contents[0])):
+                abbr = cells[1].contents[0]
+                teamName = cells[2].find_all('a')[0].contents[0]
+                teamAbbrMap[str(teamName.strip())] = str(abbr.strip())
+        return teamAbbrMap
+
+    def teamIds(self, text):
+        teamOptions = self._soup(text).find('div', class_='bodyCopy').\
+            find('select').find_all('option')
+        # remove the first option, which is for "All" teams
+        return [option.attrs['value'] for option in teamOptions][1:]
+
+    def teamSchedule(self, text):
+        soup = self._soup(text)
+        # team name appears as <h1>Team Name Schedule</h1>
+        teamName = soup.find_all('h1')[1].contents[0][:-1 *
+                                                      len('Schedule ')].strip()
+        matchupRows = []
+        for tr in soup.find_all('tr')[3:]:
+            if (len(tr.find('td').contents) > 0 and
+                    str(tr.find('td').contents[0]).startswith('Matchup')):
+                tds = tr.find_all('td')
+                # in some years, a column is added indicating the team's
+                # record to that point, but the opponent is always the
+                # second-to-last column; short rows have no opponent
+                opponent = None
+                if len(tds) >= 4:
+                    opponent = tds[-2].find('a').contents[0].strip()
+                matchupRows.append((str(tds[0].contents[0]), opponent))
+        return (str(teamName), matchupRows)
+
+    def scoreboard(self, text):
+        matchups = []
+        for score in self._soup(text).find_all(id='scoreboardMatchups'):
+            for m in score.find_all('tr', 'tableHead'):
+                catRow = m.next_sibling
+                # first column is NAME and last is SCORE, so ignore them
+                categories = [str(x.contents[0]).strip()
+                              for x in catRow.find_all('th')[1:-1]]
+                team1Stats = catRow.next_sibling
+                team2Stats = team1Stats.next_sibling
+                matchups.append((categories,
+                                 [SoupParser._scoreboardTeam(team1Stats),
+                                  SoupParser._scoreboardTeam(team2Stats)]))
+        return matchups
+
+    @staticmethod
+    def _scoreboardTeam(statsSoup):
+        teamName = str(statsSoup.find('td', 'teamName').find('a').
+                       contents[0]).strip()
+        stats = [str(td.contents[0]) for td in
+                 statsSoup.find_all('td', id=re.compile(r'^total_(\d+)_*'))]
+        return (teamName, stats)
+
+    def standings(self, text):
+        standingsSoup = self._soup(text).find(id='statsTable')
+        categories = [str(x.find('a').contents[0]) for x in
+                      standingsSoup.find_all('tr', class_='tableSubHead')[1].
+                      find_all('td', style='width:50px;')]
+        statRows = standingsSoup.find_all('tr', class_='tableBody sortableRow')
+        teams = []
+        for team in statRows:
+            teamName = team.find('td', class_='sortableTeamName').find('a').\
+                contents[0].strip()
+            stats = [str(td.contents[0]) for td in
+                     team.find_all('td', id=re.compile(r'tmTotalStat*'))]
+            teams.append((str(teamName), stats))
+        return (categories, teams)
+
+
+class LxmlParser:
+    """
+    Extract league data by streaming the page through lxml.
+
+    The large scoreboard and standings pages are read with iterparse: each
+    table row is inspected as soon as it is complete, the few cells that
+    matter are copied out, and the row is then discarded, so the document
+    is never held in memory as a whole. The small pages are read with
+    XPath. Provides the same methods, with the same results, as SoupParser.
+    """
+
+    _TOTAL_ID = re.compile(r'^total_(\d+)_*')
+
+    @staticmethod
+    def _classes(element):
+        return (element.get('class') or '').split()
+
+    @staticmethod
+    def _firstText(element):
+        # the equivalent of Beautiful Soup's str(element.contents[0]) for the
+        # cells we read, which always start with text
+        return element.text or ''
+
+    @staticmethod
+    def _rows(text, within):
+        """Generate the completed <tr> elements inside elements for which
+           within(element) is true, discarding each row after it is used."""
+        from lxml import etree
+
+        inside = 0
+        for (event, element) in etree.iterparse(
+                io.BytesIO(text.encode('utf-8')), events=('start', 'end'),
+                html=True, encoding='utf-8'):
+            if within(element):
+                inside += 1 if event == 'start' else -1
+            elif event == 'end' and element.tag == 'tr':
+                if inside > 0:
+                    yield element
+                element.clear()
+                # drop the rows already seen so memory stays flat
+                parent = element.getparent()
+                while parent is not None and element.getprevious() is not None:
+                    del parent[0]
+
+    @staticmethod
+    def _tree(text):
+        from lxml import html
+
+        return html.fromstring(text)
+
+    def ownerInfo(self, text):
+        teamAbbrMap = {}
+        for row in self._tree(text).xpath('//tr'):
+            if 'ownerRow' not in LxmlParser._classes(row):
+                continue
+            cells = row.xpath('.//td')
+            if re.compile(r"[0-9]+").match(LxmlParser._firstText(cells[0])):
+                abbr = LxmlParser._firstText(cells[1])
+                teamName = cells[2].xpath('.//a')[0].text
+                teamAbbrMap[teamName.strip()] = abbr.strip()
+        return teamAbbrMap
+
+    def teamIds(self, text):
+        for div in self._tree(text).xpath('//div'):
+            if 'bodyCopy' in LxmlParser._classes(div):
+                select = div.xpath('.//select')[0]
+                # remove the first option, which is for "All" teams
+                return [option.get('value')
+                        for option in select.xpath('.//option')][1:]
+        return []
+
+    def teamSchedule(self, text):
+        tree = self._tree(text)
+        # team name appears as <h1>Team Name Schedule</h1>
+        teamName = LxmlParser._firstText(tree.xpath('//h1')[1])[
+            :-1 * len('Schedule ')].strip()
+        matchupRows = []
+        for tr in tree.xpath('//tr')[3:]:
+            tds = tr.xpath('.//td')
+            if not tds or not LxmlParser._firstText(tds[0]).startswith(
+                    'Matchup'):
+                continue
+            opponent = None
+            if len(tds) >= 4:
+                opponent = tds[-2].xpath('.//a')[0].text.strip()
+            matchupRows.append((LxmlParser._firstText(tds[0]), opponent))
+        return (teamName, matchupRows)
+
+    @staticmethod
+    def _scoreboardTeam(tr):
+        teamName = None
+        stats = []
+        for td in tr.iter('td'):
+            if teamName is None and 'teamName' in LxmlParser._classes(td):
+                teamName = td.find('.//a').text.strip()
+            elif LxmlParser._TOTAL_ID.search(td.get('id') or ''):
+                stats.append(LxmlParser._firstText(td))
+        return (teamName, stats)
+
+    def scoreboard(self, text):
+        matchups = []
+        # a matchup is a tableHead row followed by the category row and then
+        # one row for each team
+        expect = None
+        for tr in LxmlParser._rows(text, lambda x: x.get('id') ==
+                                   'scoreboardMatchups'):
+            if 'tableHead' in LxmlParser._classes(tr):
+                expect = 'categories'
+            elif expect == 'categories':
+                # first column is NAME and last is SCORE, so ignore them
+                categories = [LxmlParser._firstText(th).strip()
+                              for th in tr.findall('th')[1:-1]]
+                teams = []
+                expect = 'team'
+            elif expect == 'team':
+                teams.append(LxmlParser._scoreboardTeam(tr))
+                if len(teams) == 2:
+                    matchups.append((categories, teams))
+                    expect = None
+        return matchups
+
+    def standings(self, text):
+        categories = []
+        teams = []
+        subHeads = 0
+        for tr in LxmlParser._rows(text,
+                                   lambda x: x.get('id') == 'statsTable'):
+            classes = tr.get('class')
+            if classes is not None and 'tableSubHead' in classes.split():
+                subHeads += 1
+                if subHeads == 2:
+                    categories = [td.find('.//a').text
+                                  for td in tr.iter('td')
+                                  if td.get('style') == 'width:50px;']
+            elif classes == 'tableBody sortableRow':
+                teamName = None
+                stats = []
+                for td in tr.iter('td'):
+                    if (teamName is None and
+                            'sortableTeamName' in LxmlParser._classes(td)):
+                        teamName = td.find('.//a').text.strip()
+                    elif 'tmTotalSta' in (td.get('id') or ''):
+                        stats.append(LxmlParser._firstText(td))
+                teams.append((teamName, stats))
+        return (categories, teams)
@@ -0,0 +1,136 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2015 Michel Mansour
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+"""
+Stream work through stages of worker threads connected by bounded queues.
+
+Each stage is a generator: it applies a function to the items of its input
+in worker threads and yields the results as they are done. Chaining stages
+lets a later stage work on the first results while an earlier one is still
+waiting on the network. The queues between stages are bounded, so a fast
+stage waits for a slow one instead of piling up results in memory.
+
+Functions provided:
+stage -- Apply a function to a stream of items in worker threads
+"""
+
+import queue
+import threading
+
+# how often a blocked thread checks whether the consumer went away
+_POLL_SECONDS = 0.1
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error):
+        self.error = error
+
+
+def stage(function, items, workers=1, maxsize=None):
+    """Apply function to every item of items in worker threads, yielding
+       the results in the order they finish.
+
+       Items are read from items on a thread of their own, only as fast as
+       the workers take them, so items may itself be a stage. If function
+       raises, the exception is raised by the generator and the stage stops.
+       Closing the generator early also stops the stage (and, if items is a
+       generator, closes it too).
+
+       Required arguments:
+       function -- a function of one item
+       items -- an iterable of items
+
+       Keyword arguments:
+       workers -- the number of worker threads (default 1)
+       maxsize -- the most items waiting for a worker, and the most results
+                  waiting to be consumed (default twice the workers)
+    """
+    workers = max(1, int(workers))
+    maxsize = maxsize or 2 * workers
+    inbox = queue.Queue(maxsize)
+    outbox = queue.Queue(maxsize)
+    stopped = threading.Event()
+
+    def put(q, item):
+        while not stopped.is_set():
+            try:
+                q.put(item, timeout=_POLL_SECONDS)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def get(q):
+        while not stopped.is_set():
+            try:
+                return q.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                pass
+        return _DONE
+
+    def feed():
+        try:
+            for item in items:
+                if not put(inbox, item):
+                    break
+        except BaseException as e:
+            put(outbox, _Failure(e))
+        finally:
+            if hasattr(items, 'close'):
+                items.close()
+            for _ in range(workers):
+                put(inbox, _DONE)
+
+    def work():
+        while True:
+            item = get(inbox)
+            if item is _DONE:
+                put(outbox, _DONE)
+                return
+            try:
+                result = function(item)
+            except BaseException as e:
+                result = _Failure(e)
+            if not put(outbox, result):
+                return
+
+    threads = [threading.Thread(target=feed, daemon=True)]
+    threads.extend(threading.Thread(target=work, daemon=True)
+                   for _ in range(workers))
+    for thread in threads:
+        thread.start()
+    try:
+        finished = 0
+        while finished < workers:
+            result = outbox.get()
+            if result is _DONE:
+                finished += 1
+            elif isinstance(result, _Failure):
+                raise result.error
+            else:
+                yield result
+    finally:
+        # unblock any thread still waiting on a queue; a worker in the middle
+        # of a call finishes it and then exits
+        stopped.set()
@@ -0,0 +1,184 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2015 Michel Mansour
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""
+A compact representation of a power matrix.
+
+Classes provided:
+PowerMatrix -- Pairwise category records stored in packed integer arrays
+PowerRow -- A lightweight view of one team's row of a PowerMatrix
+"""
+
+from array import array
+
+
+class PowerMatrix:
+    """
+    Every team's category record against every other team.
+
+    Teams are numbered by their position in the list given to the
+    constructor, and the wins, losses and ties of team i against team j are
+    stored at index i * n + j of three packed integer arrays, so a matrix of
+    n teams costs a few bytes per cell rather than a dict per cell.
+
+    Public methods:
+        teams -- The team names, in ordinal order
+        index -- A team's ordinal
+        record -- One team's (wins, losses, ties) against another
+        setRecord -- Change one team's record against another
+        row -- A PowerRow view of one team
+        rows -- PowerRow views of every team, in ordinal order
+        records -- The same data in the dict-of-dicts shape used by
+                   PowerRankings._powerMatrix
+
+    Public instance variables:
+        None
+    """
+    __slots__ = ('_teams', '_index', '_wins', '_losses', '_ties',
+                 '_totals', '_opps')
+
+    def __init__(self, teams, wins, losses, ties, pairings):
+        """Create a PowerMatrix.
+
+           Required arguments:
+           teams -- the team names
+           wins -- a flat sequence of n * n counts, where element i * n + j
+                   is the number of categories team i won against team j
+           losses -- the same for losses
+           ties -- the same for ties (the diagonal is ignored)
+           pairings -- a dict of team name to its actual opponent
+        """
+        n = len(teams)
+        self._teams = tuple(teams)
+        self._index = dict((team, i) for (i, team) in enumerate(teams))
+        self._wins = array('H', wins)
+        self._losses = array('H', losses)
+        self._ties = array('H', ties)
+        self._totals = array('I')
+        for cells in (self._wins, self._losses, self._ties):
+            for i in range(n):
+                self._totals.append(sum(cells[i * n:(i + 1) * n]) -
+                                    cells[i * n + i])
+        self._opps = array('i', [self._index.get(pairings.get(team), -1)
+                                 for team in teams])
+
+    def __len__(self):
+        return len(self._teams)
+
+    def teams(self):
+        """Return the list of team names, in ordinal order."""
+        return list(self._teams)
+
+    def index(self, team):
+        """Return the ordinal of a team."""
+        return self._index[team]
+
+    def record(self, team, opp):
+        """Return the (wins, losses, ties) of team against opp."""
+        cell = self._index[team] * len(self._teams) + self._index[opp]
+        return (self._wins[cell], self._losses[cell], self._ties[cell])
+
+    def setRecord(self, team, opp, wins, losses, ties):
+        """Set the record of team against opp, and with it the mirrored
+           record of opp against team, keeping both teams' totals in step."""
+        n = len(self._teams)
+        (i, j) = (self._index[team], self._index[opp])
+        for (a, b, values) in ((i, j, (wins, losses, ties)),
+                               (j, i, (losses, wins, ties))):
+            cell = a * n + b
+            for (k, cells) in enumerate((self._wins, self._losses,
+                                         self._ties)):
+                self._totals[k * n + a] += values[k] - cells[cell]
+                cells[cell] = values[k]
+
+    def row(self, team):
+        """Return a PowerRow view of a team."""
+        return PowerRow(self, self._index[team])
+
+    def rows(self):
+        """Return PowerRow views of every team, in ordinal order."""
+        return [PowerRow(self, i) for i in range(len(self._teams))]
+
+    def records(self):
+        """Return the matrix as a dict of team name to a dict with keys
+           'wins', 'losses', 'ties', 'opp' and 'oppRecords', as built by
+           PowerRankings._powerMatrix.
+        """
+        return dict((row.team, {'wins': row.wins, 'losses': row.losses,
+                                'ties': row.ties, 'opp': row.opp,
+                                'oppRecords': row.powerRow()})
+                    for row in self.rows())
+
+
+class PowerRow:
+    """
+    One team's row of a PowerMatrix.
+
+    A row holds nothing but a reference to its matrix and the team's
+    ordinal, so it is cheap to create and discard.
+    """
+    __slots__ = ('_matrix', '_i')
+
+    def __init__(self, matrix, i):
+        self._matrix = matrix
+        self._i = i
+
+    @property
+    def team(self):
+        return self._matrix._teams[self._i]
+
+    @property
+    def wins(self):
+        return self._matrix._totals[self._i]
+
+    @property
+    def losses(self):
+        return self._matrix._totals[len(self._matrix._teams) + self._i]
+
+    @property
+    def ties(self):
+        return self._matrix._totals[2 * len(self._matrix._teams) + self._i]
+
+    @property
+    def opp(self):
+        """The team's actual opponent, or None."""
+        opp = self._matrix._opps[self._i]
+        return self._matrix._teams[opp] if opp >= 0 else None
+
+    def against(self, opp):
+        """Return the (wins, losses, ties) of this team against opp."""
+        return self._matrix.record(self.team, opp)
+
+    def powerRow(self):
+        """Return the row as a dict of opponent name to a dict with keys
+           'wins', 'losses' and 'ties', as in PowerRankings.powerRankings.
+        """
+        matrix = self._matrix
+        n = len(matrix._teams)
+        powerRow = {}
+        for j in range(n):
+            if j != self._i:
+                cell = self._i * n + j
+                powerRow[matrix._teams[j]] = {'wins': matrix._wins[cell],
+                                              'losses': matrix._losses[cell],
+                                              'ties': matrix._ties[cell]}
+        return powerRow
@@ -23,15 +23,315 @@
 Compute power rankings for an ESPN head-to-head fantasy baseball league.
 
 Classes provided:
+LeagueSnapshot -- Fetch and parse each league page once
+ScheduleIndex -- Look up every team's opponents to date by binary search
 PowerRankings -- Perform common operations
 WeeklyRankings -- Perform operations specific to weekly rankings
 SeasonRankings -- Perform operations specific to season rankings
+SeasonHistory -- Compute weekly rankings for a range of weeks in one pass
+SeasonTally -- Accumulate weekly power records into season records
+IncrementalSeasonRankings -- Keep season rankings up to date week by week
 """
 
-import requests
-from bs4 import BeautifulSoup
-import re
+import bisect
 import datetime
+import json
+import os
+import queue
+import threading
+
+try:
+    from .page_parsers import SoupParser, LxmlParser
+    from .power_matrix import PowerMatrix
+    from .instrumentation import instrumented
+    from .pipeline import stage
+    from .data_sources import HtmlSource, JsonSource
+except ImportError:
+    from page_parsers import SoupParser, LxmlParser
+    from power_matrix import PowerMatrix
+    from instrumentation import instrumented
+    from pipeline import stage
+    from data_sources import HtmlSource, JsonSource
+
+
+class LeagueSnapshot:
+    """
+    Fetch and parse each page of an ESPN league at most once.
+
+    Computing a set of rankings touches the same pages several times (the
+    totals are needed for both the power matrix and the strength of
+    schedule, for example). A snapshot memoizes the data extracted from the
+    page for every URL and parameter combination, so all of those consumers
+    share a single download and parse, and counts the requests actually
+    sent to ESPN.
+
+    Public methods:
+        page -- Fetch and parse a page, or return the already parsed copy
+        fetch -- Download a page to be parsed later by page
+        poll -- Fetch a page again if it has changed since the last poll
+        post -- Send a POST request (never memoized)
+        derived -- Compute a value from several pages, or return it
+        hasDerived -- Whether a derived value has been computed
+        cached -- Whether a persistent response cache is in use
+        requestCount -- Number of HTTP requests issued so far
+        bytesDownloaded -- Total size of the responses downloaded so far
+        clear -- Forget all parsed pages
+
+    Public instance variables:
+        None
+    """
+
+    def __init__(self, session, cache=None, profiler=None):
+        """Create a LeagueSnapshot instance.
+
+           Required arguments:
+           session -- the requests.Session used to talk to ESPN
+
+           Keyword arguments:
+           cache -- a ResponseCache to read pages from before asking ESPN
+                    (default None)
+           profiler -- a Profiler to report each request to (default None)
+        """
+        self._session = session
+        self._cache = cache
+        self._profiler = profiler
+        self._bytesDownloaded = 0
+        self._pages = {}
+        self._derived = {}
+        self._downloading = {}
+        self._fetched = {}
+        self._validators = {}
+        self._requestCount = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(url, params):
+        return (url, tuple(sorted((str(k), str(v))
+                                  for k, v in params.items())))
+
+    def page(self, url, params, extract, immutableAfter=None, text=None):
+        """Return the data extracted from the page at url.
+
+           The page is downloaded and extracted only the first time it is
+           requested; later calls return the same object.
+
+           Required arguments:
+           url -- the page URL
+           params -- a dict of query parameters
+           extract -- a function from the page text to the data wanted,
+                      usually a method of one of the page_parsers classes
+
+           Keyword arguments:
+           immutableAfter -- a date after which the page no longer changes,
+                             so the response cache may keep it forever
+                             (default None)
+           text -- the page text, if it was already downloaded with fetch
+                   (default None, ie, download it)
+        """
+        key = LeagueSnapshot._key(url, params)
+        with self._lock:
+            if key in self._pages:
+                return self._pages[key]
+            pageLock = self._downloading.setdefault(key, threading.Lock())
+        # fetch and parse outside the snapshot's lock so that worker threads
+        # can download different pages at the same time, but only once for
+        # each page: threads asking for a page that is on its way wait for it
+        with pageLock:
+            with self._lock:
+                if key in self._pages:
+                    return self._pages[key]
+                if text is None:
+                    # downloaded by fetch but not parsed yet
+                    text = self._fetched.get(key)
+            if text is None:
+                text = self._fetch(url, params, immutableAfter)
+            data = extract(text)
+            with self._lock:
+                self._downloading.pop(key, None)
+                self._fetched.pop(key, None)
+                return self._pages.setdefault(key, data)
+
+    def fetch(self, url, params, immutableAfter=None):
+        """Download the page at url and return its text, without parsing
+           it, or return None if the page has already been parsed.
+
+           This splits page in two, so that pages can be downloaded on one
+           thread and parsed on another: pass the text on to page. A page
+           that page is already downloading is not downloaded again, and
+           page parses the fetched text instead of downloading it if it is
+           asked for the page first.
+        """
+        key = LeagueSnapshot._key(url, params)
+        with self._lock:
+            if key in self._pages:
+                return None
+            pageLock = self._downloading.setdefault(key, threading.Lock())
+        with pageLock:
+            with self._lock:
+                if key in self._pages:
+                    return None
+                if key in self._fetched:
+                    return self._fetched[key]
+            text = self._fetch(url, params, immutableAfter)
+            with self._lock:
+                self._fetched[key] = text
+            return text
+
+    def poll(self, url, params, extract):
+        """Fetch a page again, asking ESPN to only send it if it changed.
+
+           The request carries the ETag and Last-Modified of the previous
+           poll, so an unchanged page costs a 304 response and no parsing.
+           The persistent response cache is bypassed. Return a tuple of
+           whether the page changed (always True for the first poll) and
+           the extracted data, which also replaces the memoized copy that
+           page returns.
+
+           Required arguments are the same as for page.
+        """
+        key = LeagueSnapshot._key(url, params)
+        with self._lock:
+            (validators, data) = self._validators.get(key, ({}, None))
+        headers = {}
+        if 'ETag' in validators:
+            headers['If-None-Match'] = validators['ETag']
+        if 'Last-Modified' in validators:
+            headers['If-Modified-Since'] = validators['Last-Modified']
+        r = self._get(url, params, headers or None)
+        if r.status_code == 304 and data is not None:
+            return (False, data)
+        data = extract(r.text)
+        validators = dict((name, r.headers[name])
+                          for name in ('ETag', 'Last-Modified')
+                          if name in r.headers)
+        with self._lock:
+            self._validators[key] = (validators, data)
+            self._pages[key] = data
+        return (True, data)
+
+    def derived(self, key, compute):
+        """Return the value computed by compute(), which is only called the
+           first time a key is asked for.
+
+           This is for data built from several pages, such as the schedule
+           index, which should be shared as widely as the pages are.
+        """
+        with self._lock:
+            if key in self._derived:
+                return self._derived[key]
+        value = compute()
+        with self._lock:
+            return self._derived.setdefault(key, value)
+
+    def hasDerived(self, key):
+        """Return True if the value for key has already been computed."""
+        with self._lock:
+            return key in self._derived
+
+    def _counted(self, r):
+        with self._lock:
+            self._requestCount += 1
+            self._bytesDownloaded += len(r.content)
+        if self._profiler is not None:
+            self._profiler.recordRequest(len(r.content))
+        return r
+
+    def _get(self, url, params, headers=None):
+        return self._counted(self._session.get(url, params=params,
+                                               headers=headers))
+
+    def _fetch(self, url, params, immutableAfter):
+        if self._cache is None:
+            return self._get(url, params).text
+
+        cached = self._cache.lookup(url, params, immutableAfter)
+        if cached is not None and cached['fresh']:
+            return cached['text']
+        headers = None
+        if cached is not None:
+            headers = self._cache.conditionalHeaders(url, params)
+        r = self._get(url, params, headers)
+        if r.status_code == 304 and cached is not None:
+            self._cache.refresh(url, params, r.headers)
+            return cached['text']
+        if r.status_code == 200:
+            self._cache.store(url, params, r.text, r.headers, immutableAfter)
+        return r.text
+
+    def post(self, url, params):
+        """Send a POST request with the given parameters and return it."""
+        return self._counted(self._session.post(url, params=params))
+
+    def cached(self):
+        """Return True if pages are kept in a persistent response cache."""
+        return self._cache is not None
+
+    def requestCount(self):
+        """Return the number of HTTP requests issued through this snapshot."""
+        with self._lock:
+            return self._requestCount
+
+    def bytesDownloaded(self):
+        """Return the total size of the response bodies downloaded."""
+        with self._lock:
+            return self._bytesDownloaded
+
+    def clear(self):
+        """Forget every parsed page so the next access fetches it again."""
+        with self._lock:
+            self._pages = {}
+            self._downloading = {}
+            self._fetched = {}
+            self._derived = {}
+
+
+class ScheduleIndex:
+    """
+    Every team's schedule, parsed once into (end date, opponent) matchups.
+
+    A team's matchups are kept in the order of the schedule, which is the
+    order of their end dates, so the matchups played before any date are
+    found by binary search instead of by scanning the season.
+
+    Public methods:
+        teams -- The team names
+        matchups -- A team's (end date, opponent) matchups
+        playedBefore -- The number of matchups a team finished before a date
+        opponentsBefore -- The opponents of those matchups
+
+    Public instance variables:
+        None
+    """
+
+    def __init__(self, schedules):
+        """Create a ScheduleIndex.
+
+           Required arguments:
+           schedules -- a dict of team name to its list of (end date,
+                        opponent) matchups, in schedule order
+        """
+        self._endDates = {}
+        self._opponents = {}
+        for (team, matchups) in schedules.items():
+            self._endDates[team] = [endDate for (endDate, opp) in matchups]
+            self._opponents[team] = [opp for (endDate, opp) in matchups]
+
+    def teams(self):
+        """Return the list of team names, in the order they were given."""
+        return list(self._endDates)
+
+    def matchups(self, team):
+        """Return a team's list of (end date, opponent) matchups."""
+        return list(zip(self._endDates[team], self._opponents[team]))
+
+    def playedBefore(self, team, date):
+        """Return the number of a team's matchups that ended before date."""
+        return bisect.bisect_left(self._endDates[team], date)
+
+    def opponentsBefore(self, team, date):
+        """Return the opponents of a team's matchups that ended before
+           date, in schedule order."""
+        return self._opponents[team][:self.playedBefore(team, date)]
 
 
 class PowerRankings:
@@ -47,13 +347,29 @@ class PowerRankings:
         powerRankings -- Compute power rankings for a time period
         teamAbbreviations -- Retrieve team name abbreviations
         postMessage -- Post a message the league's message board
+        powerMatrix -- Compute the power matrix in compact form
+        requestCount -- Number of HTTP requests issued so far
+        sessionCounters -- Retries, failures and waits of the session
+        completedWeeks -- Number of matchup periods that have ended
+        scheduledWeeks -- Number of matchup periods in the regular season
+        categoryTotals -- The unadjusted category totals of every team
 
     Public instance variables:
         None
     """
     _BS_PARSER = "lxml"
+    _ENGINES = ('python', 'numpy')
+    _PARSERS = {'soup': lambda: SoupParser(PowerRankings._BS_PARSER),
+                'lxml': LxmlParser}
+    _SOURCES = {'html': lambda pr: HtmlSource(pr._snapshot, pr._leagueId,
+                                              pr._seasonId, pr._parser),
+                'json': lambda pr: JsonSource(pr._snapshot, pr._leagueId,
+                                              pr._seasonId)}
 
-    def __init__(self, leagueId, seasonId, lowerBetterCategories):
+    def __init__(self, leagueId, seasonId, lowerBetterCategories,
+                 scheduleWorkers=1, cache=None, engine='python',
+                 session=None, parser='soup', profiler=None, source='html',
+                 snapshot=None):
         """Create a PowerRankings instance.
 
            Required arguments:
@@ -61,12 +377,72 @@ class PowerRankings:
            seasonID -- the season ID (the year)
            lowerBetterCategories -- a list of scoring category names where a
                                     lower total is better
+
+           Keyword arguments:
+           scheduleWorkers -- the number of team schedules to fetch at the
+                              same time (default 1, ie, one after another)
+           cache -- a ResponseCache that persists downloaded pages between
+                    runs (default None, ie, always download)
+           engine -- how to compare category totals: 'python' for plain
+                     loops, or 'numpy' for a vectorized comparison of all
+                     teams at once, which requires NumPy (default 'python')
+           session -- the requests.Session to talk to ESPN with (default
+                      None, ie, a new ESPNSession with its default timeout
+                      and retries, and no rate limit)
+           parser -- how to read ESPN's pages: 'soup' to build a Beautiful
+                     Soup tree, or 'lxml' to stream them and keep only the
+                     rows needed (default 'soup')
+           profiler -- a Profiler that times each stage of the run (default
+                       None)
+           source -- where to read the league from: 'html' to scrape ESPN's
+                     pages with the parser, or 'json' to read ESPN's JSON
+                     API, which takes two requests for the whole league
+                     (default 'html')
+           snapshot -- a LeagueSnapshot to share with another instance for
+                       the same league and session, so that pages are only
+                       fetched once between them; cache is then ignored
+                       (default None, ie, a new one)
         """
+        if engine not in PowerRankings._ENGINES:
+            raise ValueError('unknown engine %r, expected one of %s' %
+                             (engine, ', '.join(PowerRankings._ENGINES)))
+        if parser not in PowerRankings._PARSERS:
+            raise ValueError('unknown parser %r, expected one of %s' %
+                             (parser,
+                              ', '.join(sorted(PowerRankings._PARSERS))))
+        if source not in PowerRankings._SOURCES:
+            raise ValueError('unknown source %r, expected one of %s' %
+                             (source,
+                              ', '.join(sorted(PowerRankings._SOURCES))))
+        self._engine = engine
+        self._parserName = parser
+        self._sourceName = source
+        self._parser = PowerRankings._PARSERS[parser]()
         self._leagueId = leagueId
         self._seasonId = seasonId
         self._lowerBetterCategories = lowerBetterCategories
-        self._session = requests.Session()
+        self._scheduleWorkers = max(1, int(scheduleWorkers))
+        if session is not None:
+            self._session = session
+        else:
+            # requests is only imported once a session is actually needed,
+            # which keeps importing this module cheap for short runs
+            try:
+                from .http_session import ESPNSession
+            except ImportError:
+                from http_session import ESPNSession
+            # keep at least one pooled connection per worker so parallel
+            # schedule requests do not discard each other's connections
+            self._session = ESPNSession(
+                poolSize=max(10, self._scheduleWorkers))
+        self._profiler = profiler
+        if snapshot is not None:
+            self._snapshot = snapshot
+        else:
+            self._snapshot = LeagueSnapshot(self._session, cache, profiler)
+        self._source = PowerRankings._SOURCES[source](self)
 
+    @instrumented('loginESPN')
     def loginESPN(self, username, password):
         """Log in to the ESPN fantasy sports system.
 
@@ -95,8 +471,8 @@ class PowerRankings:
             'username': username,
             'failedAttempts': '2'
         }
-        self._session.post("https://r.espn.go.com/espn/fantasy/login",
-                           params=postData)
+        self._snapshot.post("https://r.espn.go.com/espn/fantasy/login",
+                            postData)
 
     def postMessage(self, message, subject='Power Rankings'):
         """Post a message to the league message board.
@@ -118,9 +494,26 @@ class PowerRankings:
             'redir': '/flb/leagueoffice?leagueId=%s' % self._leagueId,
             'incoming': '1'
         }
-        self._session.post('http://games.espn.go.com/flb/tools/postmessage',
-                           params=params)
+        self._snapshot.post('http://games.espn.go.com/flb/tools/postmessage',
+                            params)
 
+    def requestCount(self):
+        """Return the number of HTTP requests this instance has issued.
+
+           Every page is fetched at most once per instance, so after a full
+           run this is one login, one ownerinfo, one schedule index, one
+           schedule per team and one totals page.
+        """
+        return self._snapshot.requestCount()
+
+    def sessionCounters(self):
+        """Return the counters of the session, as described in
+           ESPNSession.counters, or an empty dict if the session does not
+           keep any."""
+        counters = getattr(self._session, 'counters', None)
+        return counters() if counters is not None else {}
+
+    @instrumented('teamAbbreviations')
     def teamAbbreviations(self):
         """Get a dictionary of team names to their abbreviated versions.
 
@@ -128,97 +521,85 @@ class PowerRankings:
            values of the 'team' key in the dictionary produced by the
            powerRankings method.
         """
-        teamAbbrMap = {}
-
-        r = self._session.get(
-            'http://games.espn.go.com/flb/leaguesetup/ownerinfo',
-            params={'leagueId': self._leagueId,
-                    'seasonId': self._seasonId})
-        soup = BeautifulSoup(r.text, PowerRankings._BS_PARSER)
-        ownerRows = soup.findAll("tr", "ownerRow")
-        for row in ownerRows:
-            cells = row.findAll("td")
-            if re.compile("[0-9]+").match(str(cells[0].contents[0])):
-                abbr = cells[1].contents[0]
-                teamName = cells[2].findAll('a')[0].contents[0]
-                teamAbbrMap[str(teamName.strip())] = str(abbr.strip())
-
-        return teamAbbrMap
-
-    def _extractMatchup(self, matchupSoup):
-        tds = matchupSoup.find_all('td')
-        # first get the date
-        matchupDate = tds[0].contents[0]
-        startIndex = matchupDate.find('(')
-        endIndex = matchupDate.find(')')
-        dateRange = matchupDate[startIndex + 1:endIndex]
-        # if the start and end of the matchup are in the same month
-        # then the date looks like (MON x - y)
-        # but if they are in different months
-        # then the date looks like (MON x - MON y)
-        if re.compile('\w{3}\s\d+ - \w{3}\s\d+').match(dateRange):
-            endDateStr = dateRange.split('-')[1].strip()
-        else:
-            endDateStr = dateRange[:3] + ' ' + dateRange[-2:].strip()
-        endDate = datetime.datetime.strptime(self._seasonId + ' ' + endDateStr,
-                                             '%Y %b %d').date()
-
-        # then the opponent
-        # there is no way to tell that we've looked at the whole season except
-        # that the number of columns has changed
-        # also, in some years, a column is added indicating the team's record
-        # to that point, but the opponent is always the second-to-last column
-        if len(tds) >= 4:
-            opponent = tds[-2].find('a').contents[0].strip()
-        else:
-            endDate = None
-
-        return (endDate, opponent)
-
-    def _teamSchedule(self, teamId):
-        r = self._session.get('http://games.espn.go.com/flb/schedule',
-                              params={'leagueId': self._leagueId,
-                                      'seasonId': self._seasonId,
-                                      'teamId': teamId})
-        soup = BeautifulSoup(r.text, PowerRankings._BS_PARSER)
-        # team name appears as <h1>Team Name Schedule</h1>
-        teamName = soup.find_all('h1')[1].contents[0][:-1 *
-                                                      len('Schedule ')].strip()
-        schedSoup = soup.find_all('tr')
-        matchupRows = [tr for tr in schedSoup[3:]
-                       if len(tr.find('td').contents) > 0 and
-                       str(tr.find('td').contents[0]).startswith('Matchup')]
-        return (teamName, matchupRows)
+        return self._source.teamAbbreviations()
 
+    @instrumented('fetchSchedule')
+    def _fetchSchedule(self, teamId):
+        return (teamId, self._source.fetchSchedule(teamId))
+
+    @instrumented('teamIds')
     def _teamIds(self):
-        r = self._session.get('http://games.espn.go.com/flb/schedule',
-                              params={'leagueId': self._leagueId,
-                                      'seasonId': self._seasonId})
-        soup = BeautifulSoup(r.text, PowerRankings._BS_PARSER)
-        teamOptions = soup.find('div', class_='bodyCopy').\
-            find('select').find_all('option')
-        # remove the first option, which is for "All" teams
-        return [option.attrs['value'] for option in teamOptions][1:]
+        return self._source.teamIds()
+
+    @instrumented('teamSchedule')
+    def _teamMatchups(self, teamId, text=None):
+        return self._source.teamMatchups(teamId, text)
+
+    def completedWeeks(self):
+        """Return the number of matchup periods that have ended."""
+        # every team plays in every matchup period, so the first team's
+        # schedule is enough to know which periods have ended
+        teamIds = self._teamIds()
+        if not teamIds:
+            return 0
+        (teamName, matchups) = self._teamMatchups(teamIds[0])
+        return ScheduleIndex({teamName: matchups}).playedBefore(
+            teamName, datetime.date.today())
+
+    def scheduledWeeks(self):
+        """Return the number of matchup periods in the regular season; once
+           that many have ended, the season's rankings no longer change."""
+        teamIds = self._teamIds()
+        if not teamIds:
+            return 0
+        return len(self._teamMatchups(teamIds[0])[1])
+
+    def _buildScheduleIndex(self):
+        teamIds = self._teamIds()
+        schedules = dict(self._streamSchedules(teamIds))
+        # keep the teams in teamIds order, whatever order they arrived in
+        return ScheduleIndex(dict(schedules[teamId] for teamId in teamIds))
+
+    def _scheduleIndexKey(self):
+        return ('scheduleIndex', self._leagueId, self._seasonId)
+
+    def _scheduleIndex(self):
+        # built once per snapshot, so weekly instances share it too
+        return self._snapshot.derived(self._scheduleIndexKey(),
+                                      self._buildScheduleIndex)
+
+    def _streamSchedules(self, teamIds):
+        # schedules are downloaded by scheduleWorkers threads, which share
+        # the session and with it the login cookies, and parsed on another
+        # thread as they arrive, yielding (teamId, (teamName, matchups)) in
+        # the order they finish
+        fetched = stage(self._fetchSchedule, teamIds, self._scheduleWorkers)
+        return stage(lambda job: (job[0], self._teamMatchups(*job)),
+                     fetched)
 
     def _allSchedules(self):
+        index = self._scheduleIndex()
+        today = datetime.date.today()
         schedules = {}
-        for teamId in self._teamIds():
-            opponents = []
-            (teamName, teamMatchupRows) = self._teamSchedule(teamId)
-            for matchupRow in teamMatchupRows[:3]:
-                (endDate, opponent) = self._extractMatchup(matchupRow)
-                if endDate is not None and datetime.date.today() > endDate:
-                    opponents.append(opponent)
-                else:
-                    break
-            schedules[teamName] = opponents
+        for teamName in index.teams():
+            schedules[teamName] = index.opponentsBefore(teamName, today)
         return schedules
 
+    def _weeklyRankings(self, week):
+        # reuse the logged-in session and every page fetched so far
+        return WeeklyRankings(self._leagueId, self._seasonId,
+                              self._lowerBetterCategories, week,
+                              scheduleWorkers=self._scheduleWorkers,
+                              engine=self._engine, parser=self._parserName,
+                              source=self._sourceName, session=self._session,
+                              profiler=self._profiler,
+                              snapshot=self._snapshot)
+
     def _teamTotals(self, teamStats, categories):
         totals = []
 
         for t in zip(teamStats, categories):
-            total = float(t[0].contents[0])
+            total = float(t[0])
             if t[1] in self._lowerBetterCategories:
                 total *= -1
             totals.append(total)
@@ -228,59 +609,97 @@ class PowerRankings:
     def _totals():
         pass
 
-    def _powerMatrix(self):
-        records = {}
+    def powerMatrix(self):
+        """Compute and return the power matrix as a compact PowerMatrix.
+
+           This holds the same records as the 'powerRow' entries of
+           powerRankings, packed into integer arrays, which is much smaller
+           when many matrices are kept in memory.
+        """
         (totals, pairings) = self._totals()
-        for team in totals.keys():
-            records[team] = {'wins': 0, 'losses': 0, 'ties': 0,
-                             'opp': None, 'oppRecords': {}}
-            if team in pairings:
-                records[team]['opp'] = pairings[team]
-            for opp in totals.keys():
+        if self._engine == 'numpy':
+            return PowerRankings._numpyPowerMatrix(totals, pairings)
+        return PowerRankings._pythonPowerMatrix(totals, pairings)
+
+    @instrumented('powerMatrix')
+    def _powerMatrix(self):
+        return self.powerMatrix().records()
+
+    @staticmethod
+    def _numpyPowerMatrix(totals, pairings):
+        import numpy
+
+        teams = list(totals.keys())
+        stats = numpy.array([totals[team] for team in teams], dtype=float)
+        # compare every team against every other team in every category in
+        # one go: element [i, j] counts the categories team i beat team j in
+        winsMatrix = (stats[:, None, :] > stats[None, :, :]).sum(axis=2)
+        tiesMatrix = (stats[:, None, :] == stats[None, :, :]).sum(axis=2)
+        return PowerMatrix(teams, winsMatrix.ravel().tolist(),
+                           winsMatrix.T.ravel().tolist(),
+                           tiesMatrix.ravel().tolist(), pairings)
+
+    @staticmethod
+    def _pythonPowerMatrix(totals, pairings):
+        teams = list(totals.keys())
+        wins, losses, ties = [], [], []
+        for team in teams:
+            for opp in teams:
+                w, l, t = 0, 0, 0
                 if not team == opp:
-                    wins, losses, ties = 0, 0, 0
                     for cat in zip(totals[team], totals[opp]):
                         if cat[0] > cat[1]:
-                            wins += 1
+                            w += 1
                         elif cat[0] < cat[1]:
-                            losses += 1
+                            l += 1
                         else:
-                            ties += 1
-                    records[team]['oppRecords'][opp] = {'wins': wins,
-                                                        'losses': losses,
-                                                        'ties': ties}
-                    records[team]['wins'] += wins
-                    records[team]['losses'] += losses
-                    records[team]['ties'] += ties
-        return records
-
-    def _standingsSoup(self):
-        r = self._session.get('http://games.espn.go.com/flb/standings',
-                              params={'leagueId': self._leagueId,
-                                      'seasonId': self._seasonId})
-        soup = BeautifulSoup(r.text, PowerRankings._BS_PARSER)
-        return soup.find(id='statsTable')
+                            t += 1
+                wins.append(w)
+                losses.append(l)
+                ties.append(t)
+        return PowerMatrix(teams, wins, losses, ties, pairings)
+
+    @instrumented('standings')
+    def _standings(self):
+        return self._source.standings()
 
     def _cumulativeTotals(self):
-        standingsSoup = self._standingsSoup()
-        categories = [x.find('a').contents[0] for x in
-                      standingsSoup.find_all('tr', class_='tableSubHead')[1].
-                      find_all('td', style='width:50px;')]
-        statRows = standingsSoup.find_all('tr', class_='tableBody sortableRow')
+        (categories, statRows) = self._standings()
         totals = {}
-        for team in statRows:
-            teamName = team.find('td', class_='sortableTeamName').find('a').\
-                contents[0].strip()
-            totals[teamName] = self._teamTotals(team.
-                                                find_all('td',
-                                                         id=re.compile(
-                                                             'tmTotalStat*')),
-                                                categories)
+        for (teamName, stats) in statRows:
+            totals[teamName] = self._teamTotals(stats, categories)
         return (totals, {})
 
-    def _strengthOfSchedule(self):
-        records = self._powerMatrix()
-        schedule = self._allSchedules()
+    def categoryTotals(self):
+        """Return the category totals the rankings are computed from, as
+           they appear on ESPN, ie, without flipping the sign of the lower-
+           is-better categories.
+
+           The result is a tuple of the list of category names, a dict of
+           team name to its list of totals (floats, in category order), and
+           a dict of team name to its actual opponent (empty for season
+           rankings).
+        """
+        return self._categoryTotals()
+
+    def _categoryTotals(self):
+        (categories, statRows) = self._standings()
+        totals = dict((teamName, [float(stat) for stat in stats])
+                      for (teamName, stats) in statRows)
+        return (list(categories), totals, {})
+
+    @instrumented('strengthOfSchedule')
+    def _strengthOfSchedule(self, records=None):
+        if records is None:
+            records = self._powerMatrix()
+        return PowerRankings._oppAwps(records, self._allSchedules())
+
+    @instrumented('strengthOfSchedule')
+    def _opponentAwps(self, records, schedule):
+        return PowerRankings._oppAwps(records, schedule)
+
+    @staticmethod
+    def _oppAwps(records, schedule):
         oppAwps = {}
         for team in schedule.keys():
             oppWins = oppLosses = oppTies = 0
@@ -324,8 +743,66 @@ class PowerRankings:
                    print("Record against %s: %d-%d-%d" %
                           opp, opp['wins'], opp['losses'], opp['ties'])
         """
-        oppAwps = self._strengthOfSchedule()
+        if not self._snapshot.hasDerived(self._scheduleIndexKey()):
+            return self._pipelinedRankings()
         powerMatrix = self._powerMatrix()
+        return self._rankings(powerMatrix,
+                              self._strengthOfSchedule(powerMatrix))
+
+    def _pipelinedRankings(self):
+        # the schedules are fetched and parsed on worker threads while the
+        # power matrix is computed here, on the calling thread (which is the
+        # one --cprofile follows); each team's opponent AWP is worked out as
+        # soon as both its schedule and the matrix are ready, so the run
+        # takes about as long as the slowest of the two
+        from concurrent.futures import ThreadPoolExecutor
+
+        today = datetime.date.today()
+        teamIds = []
+        arrived = queue.Queue()
+
+        def collect():
+            try:
+                teamIds.extend(self._teamIds())
+                for item in self._streamSchedules(teamIds):
+                    arrived.put(item)
+            finally:
+                arrived.put(None)
+
+        with ThreadPoolExecutor(1) as executor:
+            collecting = executor.submit(collect)
+            records = self._powerMatrix()
+            schedules = {}
+            oppAwps = {}
+            done = False
+            while not done:
+                # everything that arrived while the last batch was worked
+                # out makes up the next batch
+                items = [arrived.get()]
+                while not arrived.empty():
+                    items.append(arrived.get())
+                waiting = {}
+                for item in items:
+                    if item is None:
+                        done = True
+                        break
+                    (teamId, (teamName, matchups)) = item
+                    schedules[teamId] = (teamName, matchups)
+                    waiting[teamName] = [opp for (endDate, opp) in matchups
+                                         if endDate < today]
+                if waiting:
+                    oppAwps.update(self._opponentAwps(records, waiting))
+            collecting.result()
+
+        # keep the schedules for everything else that needs them
+        self._snapshot.derived(
+            self._scheduleIndexKey(),
+            lambda: ScheduleIndex(dict(schedules[teamId]
+                                       for teamId in teamIds)))
+        return self._rankings(records, oppAwps)
+
+    @staticmethod
+    def _rankings(powerMatrix, oppAwps):
         standings = []
         for team in sorted(powerMatrix.keys()):
             wins = powerMatrix[team]['wins']
@@ -339,6 +816,10 @@ class PowerRankings:
             standingRow['powerRow'] = powerMatrix[team]['oppRecords']
             standings.append(standingRow)
 
+        return PowerRankings._rank(standings)
+
+    @staticmethod
+    def _rank(standings):
         rank = 1
         for row in sorted(standings, key=lambda x: x['awp'], reverse=True):
             row['rank'] = rank
@@ -348,9 +829,15 @@ class PowerRankings:
 
 
 class WeeklyRankings(PowerRankings):
-    """Compute weekly power rankings."""
+    """
+    Compute weekly power rankings.
 
-    def __init__(self, leagueId, seasonId, lowerBetterCategories, week):
+    Public methods, in addition to those of PowerRankings:
+        isComplete -- Whether the week's matchup period has ended
+    """
+
+    def __init__(self, leagueId, seasonId, lowerBetterCategories, week,
+                 **kwargs):
         """Create a WeeklyRankings instance.
 
            Override PowerRankings.__init__
@@ -360,47 +847,62 @@ class WeeklyRankings(PowerRankings):
            lowerBetterCategories -- a list of scoring category names where a
                                     lower score is better
            week -- the week (matchup period) to compute the rankings for
+
+           Keyword arguments are passed on to PowerRankings.__init__
         """
-        PowerRankings.__init__(self, leagueId, seasonId, lowerBetterCategories)
+        PowerRankings.__init__(self, leagueId, seasonId, lowerBetterCategories,
+                               **kwargs)
         self._week = week
 
-    def _scoreboardSoup(self):
-        r = self._session.get('http://games.espn.go.com/flb/scoreboard',
-                              params={'leagueId': self._leagueId,
-                                      'seasonId': self._seasonId,
-                                      'matchupPeriodId': self._week})
-        soup = BeautifulSoup(r.text, PowerRankings._BS_PARSER)
-        return soup.findAll(id='scoreboardMatchups')
+    def _matchupEndDate(self):
+        # every team plays in every matchup period, so the first team's
+        # schedule is enough to know when this one ends
+        teamIds = self._teamIds()
+        if not teamIds:
+            return None
+        (teamName, matchups) = self._teamMatchups(teamIds[0])
+        if not 0 < int(self._week) <= len(matchups):
+            return None
+        return matchups[int(self._week) - 1][0]
 
-    def _parseStats(self, statsSoup, categories):
-        return self._teamTotals(
-            statsSoup.findAll('td', id=re.compile('^total_(\d+)_*')),
-            categories)
+    def isComplete(self):
+        """Return True if the week's matchup period has ended, in which case
+           its rankings will not change any more."""
+        endDate = self._matchupEndDate()
+        return endDate is not None and datetime.date.today() > endDate
 
-    def _parseTeamName(self, statsSoup):
-        return str(statsSoup.find('td', 'teamName').find('a').contents[0]).strip()
+    @instrumented('scoreboard')
+    def _scoreboard(self):
+        endDate = None
+        if self._snapshot.cached():
+            endDate = self._matchupEndDate()
+        return self._source.scoreboard(self._week, immutableAfter=endDate)
 
     def _totals(self):
+        return self._matchupTotals(self._scoreboard())
+
+    def _categoryTotals(self):
+        categories = []
+        totals = {}
+        pairings = {}
+        for (categories, teams) in self._scoreboard():
+            ((t1Name, t1Stats), (t2Name, t2Stats)) = teams
+            totals[t1Name] = [float(stat) for stat in t1Stats]
+            totals[t2Name] = [float(stat) for stat in t2Stats]
+            pairings[t1Name] = t2Name
+            pairings[t2Name] = t1Name
+        return (list(categories), totals, pairings)
+
+    def _matchupTotals(self, matchups):
         pairings = {}
         totals = {}
-        scoreSoup = self._scoreboardSoup()
-        for score in scoreSoup:
-            matchups = score.findAll('tr', 'tableHead')
-            for m in matchups:
-                catRow = m.nextSibling
-                # first column is NAME and last is SCORE, so ignore them
-                categories = [str(x.contents[0]).strip()
-                              for x in catRow.findAll('th')[1:-1]]
-
-                team1Stats = catRow.nextSibling
-                team2Stats = team1Stats.nextSibling
-                t1Name = self._parseTeamName(team1Stats)
-                t2Name = self._parseTeamName(team2Stats)
-                totals[t1Name] = self._parseStats(team1Stats, categories)
-                totals[t2Name] = self._parseStats(team2Stats, categories)
-
-                pairings[t1Name] = t2Name
-                pairings[t2Name] = t1Name
+        for (categories, teams) in matchups:
+            ((t1Name, t1Stats), (t2Name, t2Stats)) = teams
+            totals[t1Name] = self._teamTotals(t1Stats, categories)
+            totals[t2Name] = self._teamTotals(t2Stats, categories)
+
+            pairings[t1Name] = t2Name
+            pairings[t2Name] = t1Name
         return (totals, pairings)
 
 
@@ -408,3 +910,254 @@ class SeasonRankings(PowerRankings):
     """Compute cumulative season power rankings to date."""
     def _totals(self):
         return self._cumulativeTotals()
+
+
+class SeasonHistory(PowerRankings):
+    """
+    Compute the weekly power rankings for a range of weeks in one pass.
+
+    All weeks share one session and one LeagueSnapshot, so a backfill logs
+    in once, fetches the owner info and every team schedule once, and then
+    fetches one scoreboard per week. Alongside each week's rankings, it
+    keeps a running cumulative record for every team: the sum of its weekly
+    power records through that week, and the cumulative AWP of the
+    opponents it has actually faced so far.
+    """
+
+    def __init__(self, leagueId, seasonId, lowerBetterCategories,
+                 startWeek, endWeek, **kwargs):
+        """Create a SeasonHistory instance.
+
+           Override PowerRankings.__init__
+           Required Arguments:
+           leagueId -- the ESPN league ID
+           seasonId -- the season ID (the year)
+           lowerBetterCategories -- a list of scoring category names where a
+                                    lower score is better
+           startWeek -- the first week (matchup period) to compute
+           endWeek -- the last week (matchup period) to compute, inclusive
+
+           Keyword arguments are passed on to PowerRankings.__init__
+        """
+        PowerRankings.__init__(self, leagueId, seasonId, lowerBetterCategories,
+                               **kwargs)
+        self._startWeek = int(startWeek)
+        self._endWeek = int(endWeek)
+
+    def weeklyRankings(self):
+        """Generate the rankings for each week in the range, in order.
+
+           Each item is a dict with the following key-value pairs:
+               'week' -- the week (matchup period)
+               'rankings' -- the week's rankings, as returned by
+                             WeeklyRankings.powerRankings
+               'cumulative' -- a dict of team name to a dict with the keys
+                               'wins', 'losses', 'ties', 'awp' and 'oppAwp',
+                               accumulated over the weeks from the start of
+                               the range through this one
+        """
+        tally = SeasonTally(self._leagueId, self._seasonId)
+        for week in range(self._startWeek, self._endWeek + 1):
+            weekly = self._weeklyRankings(week)
+            powerMatrix = weekly._powerMatrix()
+            rankings = weekly._rankings(powerMatrix,
+                                        weekly._strengthOfSchedule(
+                                            powerMatrix))
+            tally.fold(week, powerMatrix)
+            cumulative = {}
+            for row in tally.standings():
+                cumulative[row['team']] = {'wins': row['wins'],
+                                           'losses': row['losses'],
+                                           'ties': row['ties'],
+                                           'awp': row['awp'],
+                                           'oppAwp': row['oppAwp']}
+            yield {'week': week, 'rankings': rankings,
+                   'cumulative': cumulative}
+
+    def powerRankings(self):
+        """Compute and return the rankings for every week in the range.
+
+           Override PowerRankings.powerRankings
+           The result is a list of the dicts generated by weeklyRankings.
+        """
+        return list(self.weeklyRankings())
+
+
+class SeasonTally:
+    """
+    Season records accumulated one completed week at a time.
+
+    Instead of rescraping the standings and recomputing every opponent's
+    record from scratch, a tally keeps each team's running W/L/T, its
+    running record against every other team, and the opponents it has
+    faced. Folding in a week costs one pass over that week's power matrix,
+    and the tally can be saved to and loaded from a small JSON file.
+
+    Public methods:
+        fold -- Add a week's power matrix to the tally
+        weeks -- The weeks folded in so far
+        standings -- The season rankings implied by the tally
+        save -- Write the tally to a file
+        load -- Read a tally from a file (class method)
+
+    Public instance variables:
+        None
+    """
+
+    def __init__(self, leagueId, seasonId):
+        """Create an empty SeasonTally.
+
+           Required arguments:
+           leagueId -- the ESPN league ID
+           seasonId -- the season ID (the year)
+        """
+        self._leagueId = str(leagueId)
+        self._seasonId = str(seasonId)
+        self._weeks = []
+        self._records = {}
+        self._oppRecords = {}
+        self._opponents = {}
+
+    def weeks(self):
+        """Return the sorted list of weeks folded into the tally."""
+        return sorted(self._weeks)
+
+    def fold(self, week, powerMatrix):
+        """Add one week's power matrix to the tally.
+
+           Folding the same week twice has no effect.
+
+           Required arguments:
+           week -- the week (matchup period) of the power matrix
+           powerMatrix -- the week's records, as built by
+                          PowerRankings._powerMatrix
+        """
+        if int(week) in self._weeks:
+            return
+        self._weeks.append(int(week))
+        for (team, record) in powerMatrix.items():
+            tally = self._records.setdefault(team, [0, 0, 0])
+            tally[0] += record['wins']
+            tally[1] += record['losses']
+            tally[2] += record['ties']
+            oppTallies = self._oppRecords.setdefault(team, {})
+            for (opp, oppRecord) in record['oppRecords'].items():
+                oppTally = oppTallies.setdefault(opp, [0, 0, 0])
+                oppTally[0] += oppRecord['wins']
+                oppTally[1] += oppRecord['losses']
+                oppTally[2] += oppRecord['ties']
+            if record['opp'] is not None:
+                self._opponents.setdefault(team, []).append(record['opp'])
+
+    def standings(self):
+        """Return the season rankings implied by the tally.
+
+           The structure is the same as the one returned by
+           PowerRankings.powerRankings, with 'matchupOpp' always None.
+        """
+        standings = []
+        for team in sorted(self._records.keys()):
+            (wins, losses, ties) = self._records[team]
+            oppWins = oppLosses = oppTies = 0
+            for opponent in self._opponents.get(team, []):
+                oppWins += self._records[opponent][0]
+                oppLosses += self._records[opponent][1]
+                oppTies += self._records[opponent][2]
+            if oppWins + oppLosses + oppTies > 0:
+                oppAwp = PowerRankings._awp(oppWins, oppLosses, oppTies)
+            else:
+                oppAwp = 0.0
+            powerRow = {}
+            for (opp, (oppW, oppL, oppT)) in self._oppRecords[team].items():
+                powerRow[opp] = {'wins': oppW, 'losses': oppL, 'ties': oppT}
+            standings.append({'team': team, 'wins': wins, 'losses': losses,
+                              'ties': ties,
+                              'awp': PowerRankings._awp(wins, losses, ties),
+                              'oppAwp': oppAwp, 'matchupOpp': None,
+                              'powerRow': powerRow})
+        return PowerRankings._rank(standings)
+
+    def save(self, path):
+        """Write the tally to path as JSON, replacing it atomically."""
+        state = {'leagueId': self._leagueId, 'seasonId': self._seasonId,
+                 'weeks': self._weeks, 'records': self._records,
+                 'oppRecords': self._oppRecords,
+                 'opponents': self._opponents}
+        tmpPath = path + '.tmp'
+        with open(tmpPath, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmpPath, path)
+
+    @classmethod
+    def load(cls, path, leagueId, seasonId):
+        """Read a tally from path, or start a new one if it does not exist.
+
+           Raise ValueError if the file belongs to a different league or
+           season.
+
+           Required arguments:
+           path -- the state file
+           leagueId -- the ESPN league ID
+           seasonId -- the season ID (the year)
+        """
+        tally = cls(leagueId, seasonId)
+        if not os.path.exists(path):
+            return tally
+        with open(path, 'r') as f:
+            state = json.load(f)
+        if (state['leagueId'], state['seasonId']) != \
+                (tally._leagueId, tally._seasonId):
+            raise ValueError('%s holds league %s season %s, not league %s '
+                             'season %s' % (path, state['leagueId'],
+                                            state['seasonId'], tally._leagueId,
+                                            tally._seasonId))
+        tally._weeks = state['weeks']
+        tally._records = state['records']
+        tally._oppRecords = state['oppRecords']
+        tally._opponents = state['opponents']
+        return tally
+
+
+class IncrementalSeasonRankings(PowerRankings):
+    """
+    Compute season power rankings from a persisted SeasonTally.
+
+    Each run folds in only the matchup periods that have ended since the
+    last run, fetching one scoreboard per new week, and saves the tally
+    again. Season records here are the sums of the weekly power records,
+    rather than a comparison of season-long category totals as in
+    SeasonRankings.
+    """
+
+    def __init__(self, leagueId, seasonId, lowerBetterCategories, stateFile,
+                 **kwargs):
+        """Create an IncrementalSeasonRankings instance.
+
+           Override PowerRankings.__init__
+           Required Arguments:
+           leagueId -- the ESPN league ID
+           seasonId -- the season ID (the year)
+           lowerBetterCategories -- a list of scoring category names where a
+                                    lower score is better
+           stateFile -- the file the SeasonTally is kept in between runs
+
+           Keyword arguments are passed on to PowerRankings.__init__
+        """
+        PowerRankings.__init__(self, leagueId, seasonId, lowerBetterCategories,
+                               **kwargs)
+        self._stateFile = stateFile
+
+    def powerRankings(self):
+        """Fold in newly completed weeks and return the season rankings.
+
+           Override PowerRankings.powerRankings
+           The structure is the same as the one documented there.
+        """
+        tally = SeasonTally.load(self._stateFile, self._leagueId,
+                                 self._seasonId)
+        folded = set(tally.weeks())
+        for week in range(1, self.completedWeeks() + 1):
+            if week not in folded:
+                tally.fold(week, self._weeklyRankings(week)._powerMatrix())
+        tally.save(self._stateFile)
+        return tally.standings()
@@ -28,13 +28,21 @@ output the results as an HTML document.
 The default action is to compute rankings for current matchup period.
 """
 
-from power_rankings import WeeklyRankings, SeasonRankings
-from jinja2 import FileSystemLoader, Environment
+from power_rankings import WeeklyRankings, SeasonRankings, SeasonHistory, \
+    IncrementalSeasonRankings
+from http_cache import ResponseCache
+from instrumentation import Profiler
+from export import writeJsonLines, writeCsv, writeMatrix
 import argparse
+import contextlib
 import datetime
+import os
 import sys
 import subprocess
 
+# team schedules downloaded at the same time when the config does not say
+SCHEDULE_WORKERS = 4
+
 
 def readConfig(configFile):
     props = {}
@@ -47,8 +55,28 @@ def readConfig(configFile):
     return props
 
 
+def renderModel(teamAbbrMap, rankings):
+    """Index and format the rankings once for both tables of the page.
+
+       Return a dict with the keys:
+           'order' -- the rankings rows sorted by team abbreviation
+           'records' -- each team's formatted record, by team name
+           'awps' -- each team's formatted AWP, by team name
+    """
+    records = {}
+    awps = {}
+    for row in rankings:
+        records[row['team']] = '%d-%d-%d' % (row['wins'], row['losses'],
+                                             row['ties'])
+        awps[row['team']] = ('%.3f' % row['awp'])[1:]
+    return {'order': sorted(rankings, key=lambda x: teamAbbrMap[x['team']]),
+            'records': records, 'awps': awps}
+
+
 def rankingsForTemplate(leagueName, teamAbbrMap, rankings,
-                          seasonId, thisWeek):
+                        seasonId, thisWeek, model=None):
+    if model is None:
+        model = renderModel(teamAbbrMap, rankings)
     if thisWeek > 0:
         rankingsTitle = 'Week %s' % thisWeek
         dateStr = ''
@@ -58,64 +86,229 @@ def rankingsForTemplate(leagueName, teamAbbrMap, rankings,
 
     rankingsDisp = []
     for row in rankings:
-        awp = ('%.3f' % row['awp'])[1:]
         oppAwp = ('%.3f' % row['oppAwp'])[1:]
         rankingsDisp.append({'rank': row['rank'], 'team': row['team'],
                              'abbr': teamAbbrMap[row['team']],
-                             'record': '%d-%d-%d' % (row['wins'],
-                                                     row['losses'],
-                                                     row['ties']),
-                             'awp': awp, 'oawp': oppAwp})
+                             'record': model['records'][row['team']],
+                             'awp': model['awps'][row['team']],
+                             'oawp': oppAwp})
     return {'leagueName': leagueName, 'year': seasonId,
             'title': rankingsTitle, 'dateStr': dateStr,
             'rankings': rankingsDisp}
 
 
-def powerMatrixForTemplate(teamAbbrMap, rankings):
+def powerMatrixForTemplate(teamAbbrMap, rankings, model=None):
+    if model is None:
+        model = renderModel(teamAbbrMap, rankings)
     alphaTeams = []
     for team in sorted(teamAbbrMap, key=teamAbbrMap.get):
         alphaTeams.append({'fullName': team, 'abbr': teamAbbrMap[team]})
 
+    order = model['order']
     matrixDisp = []
-    for row in sorted(rankings, key=lambda x: teamAbbrMap[x['team']]):
-        rowDisp = {'team': row['team'], 'abbr': teamAbbrMap[row['team']],
-                   'record': '%d-%d-%d' %
-                   (row['wins'], row['losses'], row['ties']),
-                   'awp': ('%.3f' % row['awp'])[1:], 'matchups': []}
-        for opp in sorted(rankings, key=lambda x: teamAbbrMap[x['team']]):
-            if row['team'] == opp['team']:
-                css = 'nomatchup'
-                record = '&nbsp;'
+    for (i, row) in enumerate(order):
+        powerRow = row['powerRow']
+        matchups = []
+        for (j, opp) in enumerate(order):
+            if i == j:
+                matchups.append({'cssClass': 'nomatchup',
+                                 'record': '&nbsp;'})
+                continue
+            oppName = opp['team']
+            css = ''
+            if (row['matchupOpp'] == oppName):
+                css = 'matchup '
+            record = powerRow[oppName]
+            oppWins = record['wins']
+            oppLosses = record['losses']
+            if oppWins > oppLosses:
+                css += 'win'
+            elif oppWins < oppLosses:
+                css += 'loss'
             else:
-                oppName = opp['team']
-                css = ''
-                if (row['matchupOpp'] == opp['team']):
-                    css = 'matchup '
-                oppWins = row['powerRow'][oppName]['wins']
-                oppLosses = row['powerRow'][oppName]['losses']
-                oppTies = row['powerRow'][oppName]['ties']
-                if oppWins > oppLosses:
-                    css += 'win'
-                elif oppWins < oppLosses:
-                    css += 'loss'
-                else:
-                    css += 'tie'
-                record = '%d-%d-%d' % (oppWins, oppLosses, oppTies)
-
-            rowDisp['matchups'].append({'cssClass': css, 'record': record})
-
-        matrixDisp.append(rowDisp)
+                css += 'tie'
+            matchups.append({'cssClass': css,
+                             'record': '%d-%d-%d' % (oppWins, oppLosses,
+                                                     record['ties'])})
+
+        matrixDisp.append({'team': row['team'],
+                           'abbr': teamAbbrMap[row['team']],
+                           'record': model['records'][row['team']],
+                           'awp': model['awps'][row['team']],
+                           'matchups': matchups})
 
     return {'teams': alphaTeams, 'matrix': matrixDisp}
 
 
-def renderOutput(leagueName, teamAbbrMap, rankings,
-                 seasonId, thisWeek, template):
+def templateContext(leagueName, teamAbbrMap, rankings, seasonId, thisWeek):
+    """Return the variables the rankings.html template is rendered with."""
+    model = renderModel(teamAbbrMap, rankings)
     rankingsMap = rankingsForTemplate(leagueName, teamAbbrMap, rankings,
-                                      seasonId, thisWeek)
-    matrixMap = powerMatrixForTemplate(teamAbbrMap, rankings)
-    renderMap = dict(list(rankingsMap.items()) + list(matrixMap.items()))
-    print(template.render(renderMap))
+                                      seasonId, thisWeek, model)
+    matrixMap = powerMatrixForTemplate(teamAbbrMap, rankings, model)
+    return dict(list(rankingsMap.items()) + list(matrixMap.items()))
+
+
+def renderOutput(leagueName, teamAbbrMap, rankings,
+                 seasonId, thisWeek, template, outFile=None):
+    renderMap = templateContext(leagueName, teamAbbrMap, rankings, seasonId,
+                                thisWeek)
+    print(template.render(renderMap), file=outFile)
+
+
+# output format -> (file extension, whether the output is binary)
+OUTPUT_FORMATS = {'html': ('html', False), 'jsonl': ('jsonl', False),
+                  'csv': ('csv', False), 'matrix': ('fbpm', True)}
+
+
+def writeOutput(outputFormat, leagueName, teamAbbrMap, rankings,
+                seasonId, thisWeek, outFile):
+    """Write the rankings to outFile in one of OUTPUT_FORMATS.
+
+       'html' renders rankings.html, 'jsonl' and 'csv' write one record per
+       team, and 'matrix' writes the binary power matrix described in the
+       export module, for which outFile must be a binary stream.
+    """
+    if outputFormat == 'jsonl':
+        writeJsonLines(rankings, outFile)
+    elif outputFormat == 'csv':
+        writeCsv(rankings, outFile)
+    elif outputFormat == 'matrix':
+        writeMatrix(rankings, outFile)
+    else:
+        renderOutput(leagueName, teamAbbrMap, rankings, seasonId, thisWeek,
+                     loadTemplate(), outFile)
+
+
+def parseWeeks(weeks):
+    """Parse a week range such as '1-22' (or a single week) into a tuple."""
+    bounds = weeks.split('-')
+    try:
+        start = int(bounds[0])
+        end = int(bounds[-1])
+    except ValueError:
+        raise argparse.ArgumentTypeError('invalid week range: %s' % weeks)
+    if len(bounds) > 2 or start <= 0 or end < start:
+        raise argparse.ArgumentTypeError('invalid week range: %s' % weeks)
+    return (start, end)
+
+
+def currentWeek(properties):
+    """Return the most recent week (matchup period) for a league config."""
+    openingDay = datetime.date(int(properties['startYear']),
+                               int(properties['startMonth']),
+                               int(properties['startDate']))
+    openingWeek = openingDay.isocalendar()[1]
+    return datetime.date.today().isocalendar()[1] - openingWeek - 1
+
+
+def sessionOptions(properties, rate=None):
+    """Return the ESPNSession keyword arguments set by a league config.
+
+       Required arguments:
+       properties -- the configuration, as returned by readConfig
+
+       Keyword arguments:
+       rate -- requests per second to each host, overriding the config's
+               requestRate (default None)
+    """
+    if rate is None:
+        rate = float(properties.get('requestRate', 0))
+    return {'rate': rate, 'burst': int(properties.get('requestBurst', 1)),
+            'timeout': float(properties.get('requestTimeout', 30)),
+            'retries': int(properties.get('requestRetries', 3)),
+            'backoff': float(properties.get('retryBackoff', 0.5)),
+            'poolSize': max(int(properties.get('poolSize', 10)),
+                            int(properties.get('scheduleWorkers',
+                                               SCHEDULE_WORKERS)))}
+
+
+def createSession(properties, rate=None):
+    """Create the ESPNSession described by a league config, with the
+       options returned by sessionOptions."""
+    from http_session import ESPNSession
+
+    return ESPNSession(**sessionOptions(properties, rate))
+
+
+def rankingsOptions(properties, session=None, profiler=None):
+    """Return the PowerRankings keyword arguments set by a league config.
+
+       Without a session, a new one is created by createSession.
+    """
+    if session is None:
+        session = createSession(properties)
+    options = {'scheduleWorkers': int(properties.get('scheduleWorkers',
+                                                     SCHEDULE_WORKERS)),
+               'engine': properties.get('engine', 'python'),
+               'parser': properties.get('parser', 'soup'),
+               'source': properties.get('source', 'html'),
+               'session': session, 'profiler': profiler}
+    if properties.get('cacheDir'):
+        options['cache'] = ResponseCache(properties['cacheDir'],
+                                         int(properties.get('cacheMaxMB',
+                                                            50)) *
+                                         1024 * 1024)
+    return options
+
+
+def createRankings(properties, doSeason, thisWeek, startWeek=None,
+                   stateFile=None, session=None, profiler=None):
+    """Create the PowerRankings instance described by a league config.
+
+       Required arguments:
+       properties -- the configuration, as returned by readConfig
+       doSeason -- True for season rankings
+       thisWeek -- the week for weekly rankings, or the last week of a range
+
+       Keyword arguments:
+       startWeek -- the first week of a range of weekly rankings
+       stateFile -- with doSeason, the file for incremental season rankings
+       session -- the requests.Session to use (default None, ie, a new one
+                  from createSession)
+       profiler -- a Profiler to time the run with (default None)
+    """
+    leagueId = properties['leagueId']
+    seasonId = properties['seasonId']
+    lowerBetter = properties['lowerBetter'].split(',')
+    options = rankingsOptions(properties, session, profiler)
+    if doSeason and stateFile:
+        return IncrementalSeasonRankings(leagueId, seasonId, lowerBetter,
+                                         stateFile, **options)
+    elif doSeason:
+        return SeasonRankings(leagueId, seasonId, lowerBetter, **options)
+    elif startWeek is not None:
+        return SeasonHistory(leagueId, seasonId, lowerBetter,
+                             startWeek, thisWeek, **options)
+    return WeeklyRankings(leagueId, seasonId, lowerBetter, thisWeek,
+                          **options)
+
+
+_templates = {}
+
+
+def loadTemplate(templateDir='templates', name='rankings.html'):
+    """Load a Jinja2 template (by default rankings.html) from templateDir.
+
+       The Environment and the compiled template are kept for the life of
+       the process, so repeated renders (eg with --weeks, or in a batch
+       worker) compile the template only once. Jinja2 is imported here so
+       that runs which never render HTML do not pay for it.
+    """
+    key = (os.path.abspath(templateDir), name)
+    if key not in _templates:
+        from jinja2 import FileSystemLoader, Environment
+
+        htmlEnv = Environment(loader=FileSystemLoader(key[0]),
+                              trim_blocks=True, lstrip_blocks=True)
+        _templates[key] = htmlEnv.get_template(name)
+    return _templates[key]
+
+
+def _stage(profiler, name):
+    if profiler is None:
+        return contextlib.nullcontext()
+    return profiler.stage(name)
 
 
 def main(args):
@@ -124,40 +317,76 @@ def main(args):
     properties = readConfig(args.config)
 
     # Determine the rankings period
+    startWeek = None
     if args.season:
         doSeason = True
+    elif args.weeks:
+        (startWeek, thisWeek) = args.weeks
     else:
         thisWeek = args.week
         if thisWeek <= 0:
-            openingDay = datetime.date(int(properties['startYear']),
-                                       int(properties['startMonth']),
-                                       int(properties['startDate']))
-            openingWeek = openingDay.isocalendar()[1]
-            thisWeek = datetime.date.today().isocalendar()[1] - openingWeek - 1
+            thisWeek = currentWeek(properties)
 
-    leagueId = properties['leagueId']
     seasonId = properties['seasonId']
-    lowerBetter = properties['lowerBetter'].split(',')
-    if doSeason:
-        pr = SeasonRankings(leagueId, seasonId, lowerBetter)
-    else:
-        pr = WeeklyRankings(leagueId, seasonId, lowerBetter, thisWeek)
+    session = None
+    if args.record:
+        from replay import Captures, RecordingSession
+        session = RecordingSession(Captures(args.record),
+                                   **sessionOptions(properties))
+    elif args.replay:
+        from replay import Captures, ReplaySession
+        session = ReplaySession(Captures(args.replay))
+    profiler = None
+    if args.profile or args.cprofile:
+        profiler = Profiler(('powerMatrix', 'strengthOfSchedule',
+                             'renderOutput') if args.cprofile else ())
+    pr = createRankings(properties, doSeason, thisWeek, startWeek,
+                        args.stateFile, session, profiler)
 
     pr.loginESPN(properties['username'], properties['password'])
     teamAbbrMap = pr.teamAbbreviations()
-    rankings = pr.powerRankings()
 
-    htmlEnv = Environment(loader=FileSystemLoader('templates'),
-                          trim_blocks=True, lstrip_blocks=True)
-    template = htmlEnv.get_template('rankings.html')
-    renderOutput(properties['leagueName'], teamAbbrMap, rankings,
-                 seasonId, thisWeek, template)
+    store = None
+    if args.history:
+        from rankings_store import RankingsStore
+        store = RankingsStore(args.history)
+
+    (extension, binary) = OUTPUT_FORMATS[args.format]
+    if args.weeks:
+        # one file per week, written as each week is computed; the weeks
+        # are saved to the history together once they are all done
+        saved = []
+        for weekRankings in pr.weeklyRankings():
+            week = weekRankings['week']
+            outPath = os.path.join(args.outputDir,
+                                   'week%02d.%s' % (week, extension))
+            with open(outPath, 'wb' if binary else 'w') as outFile, \
+                    _stage(profiler, 'renderOutput'):
+                writeOutput(args.format, properties['leagueName'],
+                            teamAbbrMap, weekRankings['rankings'], seasonId,
+                            week, outFile)
+            saved.append((week, weekRankings['rankings']))
+        if store is not None:
+            store.saveWeeks(properties['leagueId'], seasonId, saved)
+    else:
+        rankings = pr.powerRankings()
+        with _stage(profiler, 'renderOutput'):
+            writeOutput(args.format, properties['leagueName'], teamAbbrMap,
+                        rankings, seasonId, thisWeek,
+                        sys.stdout.buffer if binary else sys.stdout)
+        if store is not None:
+            store.save(properties['leagueId'], seasonId, thisWeek, rankings)
+    if store is not None:
+        store.close()
 
     # Post a message if requested
     if args.postMessage:
         if doSeason:
             subject = 'Season Power Rankings'
             period = 'the season so far'
+        elif args.weeks:
+            subject = 'Weeks %d-%d Power Rankings' % (startWeek, thisWeek)
+            period = 'weeks %d-%d' % (startWeek, thisWeek)
         else:
             subject = 'Week %d Power Rankings' % thisWeek
             period = 'week %d' % thisWeek
@@ -173,6 +402,12 @@ def main(args):
             sys.stderr.write('fortune error')
         pr.postMessage(msg, subject)
 
+    if args.profile:
+        profiler.writeReport(args.profile,
+                             {'session': pr.sessionCounters()})
+    if args.cprofile:
+        profiler.writeCProfile(args.cprofile)
+
 if __name__ == '__main__':
     # Parse command line arguments
     parser = argparse.ArgumentParser(description=__doc__)
@@ -184,9 +419,39 @@ if __name__ == '__main__':
     matchupPeriodGroup.add_argument('-s', '--season', action='store_true',
                                     help='compute rankings for the season \
                                     so far')
+    matchupPeriodGroup.add_argument('--weeks', type=parseWeeks,
+                                    help='compute rankings for every week in \
+                                    WEEKS, eg 1-22, writing one page per week')
+    parser.add_argument('--state-file', dest='stateFile',
+                        help='with --season, keep season records in \
+                        STATEFILE and only fold in the weeks completed \
+                        since the last run')
+    parser.add_argument('-o', '--output-dir', dest='outputDir', default='.',
+                        help='directory for the pages written by --weeks')
+    parser.add_argument('--history', metavar='FILE',
+                        help='also save the rankings in this SQLite database \
+                        (see rankings_store.py)')
+    parser.add_argument('-f', '--format', default='html',
+                        choices=sorted(OUTPUT_FORMATS),
+                        help='output format: an HTML page, JSON Lines or CSV \
+                        with one record per team, or the binary power matrix')
+    replayGroup = parser.add_mutually_exclusive_group()
+    replayGroup.add_argument('--record', metavar='DIR',
+                             help='save every ESPN response in DIR')
+    replayGroup.add_argument('--replay', metavar='DIR',
+                             help='answer every request from the responses \
+                             saved in DIR by --record, without the network')
+    parser.add_argument('--profile', metavar='FILE',
+                        help='write a JSON report of the time, requests, \
+                        bytes and memory of each stage of the run to FILE')
+    parser.add_argument('--cprofile', metavar='FILE',
+                        help='write cProfile statistics of the compute \
+                        stages to FILE')
     parser.add_argument('-m', '--post-message', dest='postMessage',
                         action='store_true',
                         help='post to the league message board')
 
     args = parser.parse_args()
+    if args.stateFile and not args.season:
+        parser.error('--state-file needs -s/--season')
     main(args)
@@ -0,0 +1,307 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# The MIT License (MIT)
+#
+# Copyright (c) 2015 Michel Mansour
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""\
+Serve power rankings over HTTP from a long-running process.
+
+Each league is described by its own configuration file, in the same format
+as the one used by rankings_cli.py, and is named after that file. Logged-in
+sessions are kept warm between requests, and computed rankings are kept in
+memory: rankings for weeks that have ended never expire, and the rest
+expire after a time-to-live. Concurrent requests for the same rankings
+share a single computation.
+
+URLs:
+    /                           -- JSON list of the leagues served
+    /<league>/week/<week>       -- HTML rankings for a week
+    /<league>/season            -- HTML rankings for the season so far
+    /<league>/current           -- HTML rankings for the most recent week
+Add .json to any rankings URL to get the rankings as JSON instead.
+"""
+
+from rankings_cli import readConfig, currentWeek, createRankings, \
+    createSession, loadTemplate, renderOutput
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import io
+import json
+import os
+import threading
+import time
+
+
+class ResultCache:
+    """
+    A thread-safe, size-bounded LRU cache with per-entry expiry in which
+    concurrent lookups of the same missing key share one computation.
+
+    Public methods:
+        get -- Return the cached value for a key, computing it if needed
+    """
+
+    def __init__(self, maxEntries=256):
+        """Create a ResultCache.
+
+           Keyword arguments:
+           maxEntries -- the most entries to keep; the least recently used
+                         are evicted first (default 256)
+        """
+        self._maxEntries = maxEntries
+        self._entries = OrderedDict()
+        self._inFlight = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, compute):
+        """Return the value for key, calling compute() if it is missing.
+
+           compute returns a tuple (value, ttl), where ttl is the number of
+           seconds to keep the value, or None to keep it until evicted. If
+           another thread is already computing the key, wait for its result
+           instead. Exceptions raised by compute are raised in every waiting
+           thread and nothing is cached.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[1] is None or
+                                      entry[1] > time.monotonic()):
+                self._entries.move_to_end(key)
+                return entry[0]
+            flight = self._inFlight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inFlight[key] = {'done': threading.Event()}
+
+        if not leader:
+            flight['done'].wait()
+            if 'error' in flight:
+                raise flight['error']
+            return flight['value']
+
+        try:
+            (value, ttl) = compute()
+            flight['value'] = value
+        except Exception as e:
+            flight['error'] = e
+            raise
+        finally:
+            with self._lock:
+                del self._inFlight[key]
+                if 'value' in flight:
+                    expires = None if ttl is None else time.monotonic() + ttl
+                    self._entries[key] = (value, expires)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self._maxEntries:
+                        self._entries.popitem(last=False)
+            flight['done'].set()
+        return value
+
+
+class RankingsService:
+    """
+    Compute and cache rankings for a set of leagues.
+
+    Public methods:
+        leagues -- The names of the leagues served
+        rankings -- The rankings for a league and week, as a dict
+        html -- The rankings for a league and week, rendered as HTML
+    """
+
+    def __init__(self, configFiles, ttl=300, sessionTtl=3600,
+                 maxEntries=256):
+        """Create a RankingsService.
+
+           Required arguments:
+           configFiles -- the league configuration files
+
+           Keyword arguments:
+           ttl -- seconds to keep the rankings of a week that is still in
+                  progress, or of the season (default 300)
+           sessionTtl -- seconds before logging in to ESPN again (default
+                         3600)
+           maxEntries -- the most rankings to keep in memory (default 256)
+        """
+        self._configs = {}
+        for configFile in configFiles:
+            name = os.path.splitext(os.path.basename(configFile))[0]
+            self._configs[name] = readConfig(configFile)
+        self._ttl = ttl
+        self._sessionTtl = sessionTtl
+        # one cache entry per league: logging in to one league does not hold
+        # up the others, and concurrent requests share a single login
+        self._sessions = ResultCache(max(len(self._configs), 1))
+        self._results = ResultCache(maxEntries)
+        self._template = loadTemplate(os.path.join(os.path.dirname(
+            os.path.abspath(__file__)), 'templates'))
+
+    def leagues(self):
+        """Return the sorted list of league names."""
+        return sorted(self._configs)
+
+    def _session(self, league):
+        # one warm, logged-in session per league; the login is repeated
+        # once it is older than sessionTtl
+        return self._sessions.get(league, lambda: (self._login(league),
+                                                   self._sessionTtl))
+
+    def _login(self, league):
+        properties = self._configs[league]
+        session = createSession(properties)
+        pr = createRankings(properties, True, 0, session=session)
+        pr.loginESPN(properties['username'], properties['password'])
+        return session
+
+    def _compute(self, league, week):
+        properties = self._configs[league]
+        pr = createRankings(properties, week is None, week or 0,
+                            session=self._session(league))
+        result = {'league': league, 'leagueName': properties['leagueName'],
+                  'seasonId': properties['seasonId'], 'week': week or 0,
+                  'teamAbbreviations': pr.teamAbbreviations(),
+                  'rankings': pr.powerRankings()}
+        ttl = self._ttl
+        if week is not None and pr.isComplete():
+            ttl = None
+        return (result, ttl)
+
+    def rankings(self, league, week=None):
+        """Return the rankings for a league as a dict with the keys
+           'league', 'leagueName', 'seasonId', 'week' (0 for the season),
+           'teamAbbreviations' and 'rankings' (as returned by
+           PowerRankings.powerRankings).
+
+           Required arguments:
+           league -- the league name
+
+           Keyword arguments:
+           week -- the week, or None for the season (default None)
+
+           Raise KeyError for an unknown league.
+        """
+        properties = self._configs[league]
+        key = (league, properties['seasonId'], week)
+        return self._results.get(key, lambda: self._compute(league, week))
+
+    def html(self, league, week=None):
+        """Return the rankings for a league rendered with rankings.html."""
+        result = self.rankings(league, week)
+        out = io.StringIO()
+        renderOutput(result['leagueName'], result['teamAbbreviations'],
+                     result['rankings'], result['seasonId'], result['week'],
+                     self._template, out)
+        return out.getvalue()
+
+    def currentWeek(self, league):
+        """Return the most recent week of a league."""
+        return currentWeek(self._configs[league])
+
+
+def handlerClass(service):
+    """Return a request handler class that serves the given service."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, contentType, text):
+            body = text.encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', contentType)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path = self.path.split('?', 1)[0].strip('/')
+            asJson = path.endswith('.json')
+            if asJson:
+                path = path[:-len('.json')]
+            parts = path.split('/') if path else []
+            try:
+                if not parts:
+                    self._send(200, 'application/json',
+                               json.dumps(service.leagues()))
+                    return
+                league = parts[0]
+                if league not in service.leagues():
+                    raise LookupError('unknown league %s' % league)
+                if parts[1:] == ['season']:
+                    week = None
+                elif parts[1:] == ['current']:
+                    week = service.currentWeek(league)
+                elif len(parts) == 3 and parts[1] == 'week':
+                    week = int(parts[2])
+                else:
+                    raise LookupError('unknown page %s' % self.path)
+            except (LookupError, ValueError) as e:
+                self._send(404, 'text/plain', str(e))
+                return
+
+            try:
+                if asJson:
+                    self._send(200, 'application/json',
+                               json.dumps(service.rankings(league, week)))
+                else:
+                    self._send(200, 'text/html; charset=utf-8',
+                               service.html(league, week))
+            except Exception as e:
+                self._send(502, 'text/plain',
+                           'could not compute rankings: %s' % e)
+
+    return Handler
+
+
+def main(args):
+    service = RankingsService(args.configs, args.ttl, args.sessionTtl,
+                              args.maxEntries)
+    server = ThreadingHTTPServer((args.host, args.port),
+                                 handlerClass(service))
+    server.daemon_threads = True
+    print('Serving %s on http://%s:%d' % (', '.join(service.leagues()),
+                                         args.host, args.port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+
+if __name__ == '__main__':
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('configs', nargs='+',
+                        help='league configuration files')
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='address to listen on')
+    parser.add_argument('-p', '--port', type=int, default=8080,
+                        help='port to listen on')
+    parser.add_argument('--ttl', type=int, default=300,
+                        help='seconds to keep rankings that can still change')
+    parser.add_argument('--session-ttl', dest='sessionTtl', type=int,
+                        default=3600,
+                        help='seconds before logging in to ESPN again')
+    parser.add_argument('--max-entries', dest='maxEntries', type=int,
+                        default=256,
+                        help='most rankings to keep in memory')
+
+    args = parser.parse_args()
+    main(args)
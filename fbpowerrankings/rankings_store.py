@@ -0,0 +1,275 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# The MIT License (MIT)
+#
+# Copyright (c) 2015 Michel Mansour
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""\
+Keep computed power rankings in a local SQLite database, so they can be
+compared across weeks and seasons without asking ESPN again.
+
+Every saved run stores one standings row per team, and the team's record
+against every other team, keyed by league, season, week and team. Season
+rankings to date are stored as week 0.
+
+Commands:
+    trend <team> -- the team's AWP and rank for every stored week
+    best -- the best weekly AWPs ever
+    h2h <team> <opponent> -- the two teams' records against each other
+
+Classes provided:
+RankingsStore -- Save rankings and query their history
+"""
+
+import argparse
+import sqlite3
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS standings (
+    league TEXT NOT NULL,
+    season TEXT NOT NULL,
+    week INTEGER NOT NULL,
+    team TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    wins INTEGER NOT NULL,
+    losses INTEGER NOT NULL,
+    ties INTEGER NOT NULL,
+    awp REAL NOT NULL,
+    oppAwp REAL NOT NULL,
+    matchupOpp TEXT,
+    PRIMARY KEY (league, season, week, team)
+);
+CREATE INDEX IF NOT EXISTS standings_team
+    ON standings (league, team, season, week);
+CREATE INDEX IF NOT EXISTS standings_awp ON standings (awp);
+CREATE TABLE IF NOT EXISTS records (
+    league TEXT NOT NULL,
+    season TEXT NOT NULL,
+    week INTEGER NOT NULL,
+    team TEXT NOT NULL,
+    opp TEXT NOT NULL,
+    wins INTEGER NOT NULL,
+    losses INTEGER NOT NULL,
+    ties INTEGER NOT NULL,
+    PRIMARY KEY (league, season, week, team, opp)
+);
+CREATE INDEX IF NOT EXISTS records_pair
+    ON records (league, team, opp, season, week);
+'''
+
+
+class RankingsStore:
+    """
+    A SQLite database of power rankings.
+
+    Public methods:
+        save -- Store the rankings of one league, season and week
+        saveWeeks -- Store the rankings of several weeks at once
+        weeks -- The league, season and week of every stored run
+        awpTrend -- A team's AWP and rank, week by week
+        bestWeeks -- The best weekly AWPs ever
+        headToHead -- Two teams' records against each other, week by week
+        close -- Close the database
+
+    A RankingsStore is also a context manager that closes the database.
+
+    Public instance variables:
+        None
+    """
+
+    def __init__(self, path):
+        """Open the database at path, creating it if needed.
+
+           Required arguments:
+           path -- the database file, or ':memory:'
+        """
+        self._db = sqlite3.connect(path)
+        self._db.row_factory = sqlite3.Row
+        with self._db:
+            self._db.executescript(_SCHEMA)
+
+    def close(self):
+        """Close the database."""
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excInfo):
+        self.close()
+
+    def save(self, leagueId, seasonId, week, rankings):
+        """Store rankings, replacing any stored for the same week.
+
+           Everything is written in a single transaction, so a run is either
+           stored completely or not at all.
+
+           Required arguments:
+           leagueId -- the ESPN league ID
+           seasonId -- the season ID (the year)
+           week -- the week (matchup period), or 0 for season rankings
+           rankings -- the rankings, as returned by
+                       PowerRankings.powerRankings
+        """
+        self.saveWeeks(leagueId, seasonId, [(week, rankings)])
+
+    def saveWeeks(self, leagueId, seasonId, weeklyRankings):
+        """Store the rankings of several weeks in a single transaction,
+           replacing any stored for the same weeks.
+
+           Required arguments:
+           leagueId -- the ESPN league ID
+           seasonId -- the season ID (the year)
+           weeklyRankings -- (week, rankings) pairs, as for save
+        """
+        with self._db:
+            for (week, rankings) in weeklyRankings:
+                self._write((str(leagueId), str(seasonId), int(week)),
+                            rankings)
+
+    def _write(self, key, rankings):
+        standings = [key + (row['team'], row['rank'], row['wins'],
+                            row['losses'], row['ties'], row['awp'],
+                            row['oppAwp'], row['matchupOpp'])
+                     for row in rankings]
+        records = [key + (row['team'], opp, record['wins'],
+                          record['losses'], record['ties'])
+                   for row in rankings
+                   for (opp, record) in row['powerRow'].items()]
+        for table in ('standings', 'records'):
+            self._db.execute('DELETE FROM %s WHERE league = ? AND '
+                             'season = ? AND week = ?' % table, key)
+        self._db.executemany('INSERT INTO standings VALUES '
+                             '(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', standings)
+        self._db.executemany('INSERT INTO records VALUES '
+                             '(?, ?, ?, ?, ?, ?, ?, ?)', records)
+
+    def _query(self, sql, params):
+        return [dict(row) for row in self._db.execute(sql, params)]
+
+    def weeks(self, leagueId=None):
+        """Return a list of dicts with the keys 'league', 'season' and
+           'week', one for every stored run (of leagueId only, if given),
+           in order."""
+        sql = 'SELECT DISTINCT league, season, week FROM standings'
+        params = ()
+        if leagueId is not None:
+            sql += ' WHERE league = ?'
+            params = (str(leagueId),)
+        return self._query(sql + ' ORDER BY league, season, week', params)
+
+    def awpTrend(self, leagueId, team, seasonId=None):
+        """Return a team's weekly standings rows, as dicts with the keys
+           'season', 'week', 'rank', 'wins', 'losses', 'ties', 'awp' and
+           'oppAwp', in order. Season rankings (week 0) are left out.
+
+           Required arguments:
+           leagueId -- the ESPN league ID
+           team -- the team name
+
+           Keyword arguments:
+           seasonId -- only return this season (default None, ie, all)
+        """
+        sql = ('SELECT season, week, rank, wins, losses, ties, awp, oppAwp '
+               'FROM standings WHERE league = ? AND team = ? AND week > 0')
+        params = (str(leagueId), team)
+        if seasonId is not None:
+            sql += ' AND season = ?'
+            params += (str(seasonId),)
+        return self._query(sql + ' ORDER BY season, week', params)
+
+    def bestWeeks(self, leagueId=None, limit=10):
+        """Return the best weekly AWPs as standings row dicts with the keys
+           'league', 'season', 'week', 'team', 'rank', 'wins', 'losses',
+           'ties', 'awp', 'oppAwp' and 'matchupOpp', best first.
+
+           Keyword arguments:
+           leagueId -- only consider this league (default None, ie, all)
+           limit -- the number of rows to return (default 10)
+        """
+        sql = 'SELECT * FROM standings WHERE week > 0'
+        params = ()
+        if leagueId is not None:
+            sql += ' AND league = ?'
+            params = (str(leagueId),)
+        return self._query(sql + ' ORDER BY awp DESC, season, week, team '
+                           'LIMIT ?', params + (int(limit),))
+
+    def headToHead(self, leagueId, team, opp):
+        """Return team's weekly records against opp, as dicts with the keys
+           'season', 'week', 'wins', 'losses', 'ties' and 'matchup' (True if
+           they actually played each other that week), in order. Season
+           rankings (week 0) are left out."""
+        return [dict(row, matchup=bool(row['matchup'])) for row in
+                self._query('SELECT r.season, r.week, r.wins, r.losses, '
+                            'r.ties, s.matchupOpp IS r.opp AS matchup '
+                            'FROM records r JOIN standings s ON '
+                            's.league = r.league AND s.season = r.season AND '
+                            's.week = r.week AND s.team = r.team '
+                            'WHERE r.league = ? AND r.team = ? AND '
+                            'r.opp = ? AND r.week > 0 '
+                            'ORDER BY r.season, r.week',
+                            (str(leagueId), team, opp))]
+
+
+def main(args):
+    with RankingsStore(args.database) as store:
+        if args.command == 'trend':
+            (team,) = args.teams
+            print('%6s %4s %4s %10s %7s %7s' % ('season', 'week', 'rank',
+                                                'record', 'awp', 'oppAwp'))
+            for row in store.awpTrend(args.league, team, args.season):
+                print('%6s %4d %4d %10s %7.3f %7.3f' %
+                      (row['season'], row['week'], row['rank'],
+                       '%d-%d-%d' % (row['wins'], row['losses'], row['ties']),
+                       row['awp'], row['oppAwp']))
+        elif args.command == 'best':
+            for row in store.bestWeeks(args.league, args.limit):
+                print('%6s %4d  %-30s %7.3f' % (row['season'], row['week'],
+                                                row['team'], row['awp']))
+        else:
+            (team, opp) = args.teams
+            for row in store.headToHead(args.league, team, opp):
+                print('%6s %4d %10s%s' %
+                      (row['season'], row['week'],
+                       '%d-%d-%d' % (row['wins'], row['losses'], row['ties']),
+                       '  (matchup)' if row['matchup'] else ''))
+
+if __name__ == '__main__':
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('database', help='the rankings database')
+    parser.add_argument('command', choices=['trend', 'best', 'h2h'],
+                        help='the query to run')
+    parser.add_argument('teams', nargs='*', help='team names')
+    parser.add_argument('-l', '--league', help='ESPN league ID')
+    parser.add_argument('-s', '--season', help='only this season (trend)')
+    parser.add_argument('-n', '--limit', type=int, default=10,
+                        help='number of rows (best)')
+
+    args = parser.parse_intermixed_args()
+    expected = {'trend': 1, 'best': 0, 'h2h': 2}[args.command]
+    if len(args.teams) != expected or \
+            (args.command != 'best' and args.league is None):
+        parser.error('%s needs --league and %d team name(s)' %
+                     (args.command, expected))
+    main(args)
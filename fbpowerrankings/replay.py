@@ -0,0 +1,208 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2015 Michel Mansour
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""
+Record ESPN responses during a run and replay them later without a network.
+
+Classes provided:
+Captures -- A directory of recorded responses
+RecordingSession -- An ESPNSession that saves every response it gets
+ReplaySession -- An ESPNSession that answers from recorded responses
+"""
+
+try:
+    from .http_session import ESPNSession
+except ImportError:
+    from http_session import ESPNSession
+import hashlib
+import json
+import os
+import threading
+import urllib.parse
+import requests
+
+
+class Captures:
+    """
+    A directory of recorded HTTP responses.
+
+    Each response body is stored in its own file, and index.json maps the
+    request (method, URL and sorted query string) to that file. The values
+    of the SENSITIVE parameters (the login credentials) are replaced in the
+    query string, so a directory of captures can be shared safely.
+
+    Public methods:
+        key -- The lookup key for a request
+        query -- The sorted, redacted query string of a request
+        save -- Record a response body
+        load -- Return a recorded response body, or None
+        keys -- Every recorded request key
+
+    Public instance variables:
+        None
+    """
+    _INDEX = 'index.json'
+    SENSITIVE = ('username', 'password')
+    _REDACTED = 'REDACTED'
+
+    def __init__(self, directory):
+        """Create a Captures instance, reading any existing index.
+
+           Required arguments:
+           directory -- the directory holding the captures; it is created
+                        if it does not exist
+        """
+        self._directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        try:
+            with open(os.path.join(directory, Captures._INDEX), 'r') as f:
+                self._index = json.load(f)
+        except (OSError, ValueError):
+            self._index = {}
+
+    @staticmethod
+    def key(method, url, params=None):
+        """Return the key for a request, independent of parameter order."""
+        prepared = requests.Request(method.upper(), url, params=params).\
+            prepare()
+        parts = urllib.parse.urlsplit(prepared.url)
+        return '%s %s://%s%s?%s' % (method.upper(), parts.scheme,
+                                    parts.netloc, parts.path,
+                                    Captures.query(urllib.parse.parse_qsl(
+                                        parts.query, keep_blank_values=True)))
+
+    @staticmethod
+    def query(pairs):
+        """Return the query string of a list of (name, value) parameters,
+           sorted and with the values of the SENSITIVE parameters
+           replaced."""
+        return urllib.parse.urlencode(sorted(
+            (name, Captures._REDACTED if name in Captures.SENSITIVE
+             else value) for (name, value) in pairs))
+
+    def save(self, key, status, text):
+        """Record the status code and body of the response for key."""
+        fileName = hashlib.sha1(key.encode('utf-8')).hexdigest() + '.html'
+        with self._lock:
+            with open(os.path.join(self._directory, fileName), 'w',
+                      encoding='utf-8') as f:
+                f.write(text)
+            self._index[key] = {'file': fileName, 'status': status}
+            with open(os.path.join(self._directory, Captures._INDEX),
+                      'w') as f:
+                json.dump(self._index, f, indent=1, sort_keys=True)
+
+    def load(self, key):
+        """Return (status, text) recorded for key, or None."""
+        with self._lock:
+            entry = self._index.get(key)
+        if entry is None:
+            return None
+        with open(os.path.join(self._directory, entry['file']), 'r',
+                  encoding='utf-8') as f:
+            return (entry['status'], f.read())
+
+    def keys(self):
+        """Return the sorted list of recorded request keys."""
+        with self._lock:
+            return sorted(self._index)
+
+
+class RecordingSession(ESPNSession):
+    """
+    An ESPNSession that records every response in a Captures.
+
+    Requests are sent, rate limited and retried exactly as by ESPNSession;
+    the response a request finally gets is recorded. A request that fails
+    for good records nothing.
+    """
+
+    def __init__(self, captures, **kwargs):
+        """Create a RecordingSession.
+
+           Required arguments:
+           captures -- the Captures to record responses in
+
+           Keyword arguments are passed on to ESPNSession.__init__
+        """
+        ESPNSession.__init__(self, **kwargs)
+        self._captures = captures
+
+    def request(self, method, url, params=None, **kwargs):
+        r = super().request(method, url, params=params, **kwargs)
+        self._captures.save(Captures.key(method, url, params), r.status_code,
+                            r.text)
+        return r
+
+
+class _ReplayAdapter(requests.adapters.BaseAdapter):
+    # answers in place of the network, so that everything ESPNSession does
+    # around a request still happens
+
+    def __init__(self, captures):
+        requests.adapters.BaseAdapter.__init__(self)
+        self._captures = captures
+
+    def send(self, request, **kwargs):
+        key = Captures.key(request.method, request.url)
+        recorded = self._captures.load(key)
+        if recorded is None:
+            raise requests.ConnectionError('no capture for %s' % key,
+                                           request=request)
+        r = requests.Response()
+        (r.status_code, text) = recorded
+        r._content = text.encode('utf-8')
+        r.encoding = 'utf-8'
+        r.url = request.url
+        r.request = request
+        return r
+
+    def close(self):
+        pass
+
+
+class ReplaySession(ESPNSession):
+    """
+    An ESPNSession that answers every request from a Captures.
+
+    No request ever reaches the network, but timeouts, rate limits,
+    retries and errors are otherwise handled as by ESPNSession; a request
+    that was not recorded raises requests.ConnectionError.
+    """
+
+    def __init__(self, captures, retries=0, **kwargs):
+        """Create a ReplaySession.
+
+           Required arguments:
+           captures -- the Captures to answer requests from
+
+           Keyword arguments:
+           retries -- as for ESPNSession (default 0, since a request that
+                      was not recorded never will be)
+
+           Other keyword arguments are passed on to ESPNSession.__init__
+        """
+        ESPNSession.__init__(self, retries=retries, **kwargs)
+        adapter = _ReplayAdapter(captures)
+        self.mount('http://', adapter)
+        self.mount('https://', adapter)
@@ -0,0 +1,323 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# The MIT License (MIT)
+#
+# Copyright (c) 2015 Michel Mansour
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""\
+Simulate the rest of an ESPN head-to-head fantasy baseball season from the
+season-to-date power matrix, and report every team's playoff odds, expected
+final record and rank, and luck (its actual head-to-head record compared to
+the record its AWP would have earned against the whole league).
+
+Classes provided:
+SeasonSimulation -- Monte Carlo simulation of the remaining matchups
+"""
+
+try:
+    from .power_rankings import PowerRankings, SeasonRankings
+except ImportError:
+    from power_rankings import PowerRankings, SeasonRankings
+import argparse
+import bisect
+import datetime
+import importlib.util
+import math
+import random
+
+
+def _binomialCdf(categories, p):
+    """Return [P(X <= k) for k in range(categories)], X ~ B(categories, p)."""
+    cdf = []
+    total = 0.0
+    for k in range(categories):
+        total += math.comb(categories, k) * p ** k * \
+            (1 - p) ** (categories - k)
+        cdf.append(total)
+    return cdf
+
+
+def _pythonBatch(job):
+    """Simulate one batch of seasons one matchup at a time."""
+    (runs, seed, points, pairs, probabilities, categories,
+     playoffTeams) = job
+    rng = random.Random('%d/%d' % seed)
+    n = len(points)
+    wins, rankSums, playoffs = [0] * n, [0] * n, [0] * n
+    # the categories a team wins in a matchup follow a binomial
+    # distribution, so one random number per matchup picks them from its
+    # cumulative distribution instead of one per category
+    matchups = [(i, j, _binomialCdf(categories, p))
+                for ((i, j), p) in zip(pairs, probabilities)]
+    for _ in range(runs):
+        total = list(points)
+        for (i, j, cdf) in matchups:
+            won = bisect.bisect_right(cdf, rng.random())
+            wins[i] += won
+            wins[j] += categories - won
+            total[i] += won
+            total[j] += categories - won
+        # ties in the final standings are broken at random
+        order = sorted(range(n), key=lambda k: (-total[k], rng.random()))
+        for (rank, k) in enumerate(order, 1):
+            rankSums[k] += rank
+            if rank <= playoffTeams:
+                playoffs[k] += 1
+    return (wins, rankSums, playoffs)
+
+
+def _numpyBatch(job):
+    """Simulate one batch of seasons at once with NumPy arrays."""
+    import numpy
+
+    (runs, seed, points, pairs, probabilities, categories,
+     playoffTeams) = job
+    rng = numpy.random.default_rng(seed)
+    n = len(points)
+    pairs = numpy.array(pairs, dtype=int).reshape(-1, 2)
+    # one row per matchup, with a one in the column of its first (home)
+    # or second (away) team, to turn matchup results into team totals
+    home = numpy.zeros((len(pairs), n))
+    away = numpy.zeros((len(pairs), n))
+    home[numpy.arange(len(pairs)), pairs[:, 0]] = 1
+    away[numpy.arange(len(pairs)), pairs[:, 1]] = 1
+    won = rng.binomial(categories, probabilities,
+                       size=(runs, len(pairs))).astype(float)
+    wins = won @ home + (categories - won) @ away
+    # points only ever differ by multiples of a half, so the noise breaks
+    # ties at random without reordering anything else
+    total = numpy.asarray(points, dtype=float) + wins
+    order = numpy.argsort(-(total + rng.random((runs, n)) * 0.01), axis=1)
+    ranks = numpy.empty_like(order)
+    numpy.put_along_axis(ranks, order,
+                         numpy.broadcast_to(numpy.arange(1, n + 1),
+                                            (runs, n)), axis=1)
+    return (wins.sum(axis=0).tolist(), ranks.sum(axis=0).tolist(),
+            (ranks <= playoffTeams).sum(axis=0).tolist())
+
+
+class SeasonSimulation(SeasonRankings):
+    """
+    Simulate the remaining matchups of a season many times over.
+
+    Every remaining matchup is played out category by category: team i wins
+    each category against team j with probability p_ij, the share of the
+    categories that i wins against j on season-to-date totals (ties count
+    half), smoothed with one extra won and one extra lost category so that
+    no matchup is ever a foregone conclusion. Teams are ranked by head-to-
+    head points (category wins plus half the ties).
+
+    Public methods, in addition to those of PowerRankings:
+        remainingMatchups -- The matchups still to be played
+        headToHead -- Each team's actual category record to date
+        simulate -- Playoff odds, expected standings and luck
+        defaultEngine -- The engine simulate uses unless told otherwise
+    """
+
+    _BATCHES = {'python': _pythonBatch, 'numpy': _numpyBatch}
+    # enough seasons for odds to about half a percentage point, in a couple
+    # of seconds for a 20-team league whichever engine runs them
+    DEFAULT_RUNS = {'python': 20000, 'numpy': 100000}
+
+    @staticmethod
+    def defaultEngine():
+        """Return 'numpy' if NumPy is installed, otherwise 'python'."""
+        if importlib.util.find_spec('numpy') is not None:
+            return 'numpy'
+        return 'python'
+
+    def __init__(self, leagueId, seasonId, lowerBetterCategories,
+                 playoffTeams=4, **kwargs):
+        """Create a SeasonSimulation instance.
+
+           Override PowerRankings.__init__
+           Required Arguments:
+           leagueId -- the ESPN league ID
+           seasonId -- the season ID (the year)
+           lowerBetterCategories -- a list of scoring category names where a
+                                    lower score is better
+
+           Keyword arguments:
+           playoffTeams -- the number of teams that make the playoffs
+                           (default 4)
+
+           Other keyword arguments are passed on to PowerRankings.__init__.
+        """
+        PowerRankings.__init__(self, leagueId, seasonId, lowerBetterCategories,
+                               **kwargs)
+        self._playoffTeams = int(playoffTeams)
+
+    def _scheduledMatchups(self):
+        # (week, end date, team, opponent) for every scheduled matchup
+        index = self._scheduleIndex()
+        matchups = []
+        for teamName in index.teams():
+            for (week, (endDate, opponent)) in enumerate(
+                    index.matchups(teamName), 1):
+                matchups.append((week, endDate, teamName, opponent))
+        return matchups
+
+    def remainingMatchups(self):
+        """Return the matchups that have not ended yet, including the current
+           one, as a list of (week, team, opponent) tuples. Each matchup is
+           listed once."""
+        today = datetime.date.today()
+        remaining = set()
+        for (week, endDate, team, opponent) in self._scheduledMatchups():
+            if endDate >= today:
+                remaining.add((week,) + tuple(sorted((team, opponent))))
+        return sorted(remaining)
+
+    def headToHead(self):
+        """Return a dict of team name to its actual (wins, losses, ties)
+           in categories, summed over every completed matchup."""
+        today = datetime.date.today()
+        weeks = sorted(set(week for (week, endDate, team, opponent)
+                           in self._scheduledMatchups() if endDate < today))
+        records = {}
+        for week in weeks:
+            for row in self._weeklyRankings(week).powerMatrix().rows():
+                (w, l, t) = records.get(row.team, (0, 0, 0))
+                if row.opp is not None:
+                    (oppW, oppL, oppT) = row.against(row.opp)
+                    (w, l, t) = (w + oppW, l + oppL, t + oppT)
+                records[row.team] = (w, l, t)
+        return records
+
+    def simulate(self, runs=None, seed=0, workers=1, batchSize=10000,
+                 engine=None):
+        """Simulate the rest of the season and return the results.
+
+           The result is a list of dicts, one per team, ordered by expected
+           final rank, with the following key-value pairs:
+               'team' -- the team name
+               'wins', 'losses', 'ties' -- the actual category record to date
+               'awp' -- the season-to-date aggregate winning percentage
+               'luck' -- actual points to date less the points the team's
+                         AWP would have earned over the same categories
+               'expectedWins', 'expectedLosses' -- the mean final record
+               'expectedRank' -- the mean final rank
+               'playoffOdds' -- the share of simulations in which the team
+                                finishes in a playoff spot
+
+           Keyword arguments:
+           runs -- the number of seasons to simulate (default
+                   DEFAULT_RUNS for the engine: 100000 with numpy, 20000
+                   without)
+           seed -- the random seed; a given seed gives the same results for
+                   any number of workers (default 0)
+           workers -- simulate batches in this many processes (default 1)
+           batchSize -- the number of seasons per batch (default 10000)
+           engine -- 'numpy' simulates whole batches at once and is much
+                     faster, 'python' one season at a time (default
+                     defaultEngine(), ie numpy if it is installed)
+        """
+        if engine is None:
+            engine = SeasonSimulation.defaultEngine()
+        if runs is None:
+            runs = SeasonSimulation.DEFAULT_RUNS[engine]
+        matrix = self.powerMatrix()
+        teams = matrix.teams()
+        categories = sum(matrix.record(teams[0], teams[1]))
+        records = self.headToHead()
+        actual = [records.get(team, (0, 0, 0)) for team in teams]
+        points = [w + t / 2.0 for (w, l, t) in actual]
+
+        pairs, probabilities = [], []
+        remaining = [0] * len(teams)
+        for (week, team, opponent) in self.remainingMatchups():
+            (i, j) = (matrix.index(team), matrix.index(opponent))
+            (w, l, t) = matrix.record(team, opponent)
+            pairs.append((i, j))
+            probabilities.append((w + t / 2.0 + 1) / (categories + 2))
+            remaining[i] += categories
+            remaining[j] += categories
+
+        jobs = [(min(batchSize, runs - start), (seed, start // batchSize),
+                 points, pairs, probabilities, categories, self._playoffTeams)
+                for start in range(0, runs, batchSize)]
+        batch = SeasonSimulation._BATCHES[engine]
+        if workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(workers) as executor:
+                results = list(executor.map(batch, jobs))
+        else:
+            results = [batch(job) for job in jobs]
+
+        standings = []
+        for (k, team) in enumerate(teams):
+            (w, l, t) = actual[k]
+            row = matrix.row(team)
+            awp = PowerRankings._awp(row.wins, row.losses, row.ties)
+            simulatedWins = sum(result[0][k] for result in results) / runs
+            standings.append({
+                'team': team, 'wins': w, 'losses': l, 'ties': t, 'awp': awp,
+                'luck': points[k] - awp * (w + l + t),
+                'expectedWins': w + simulatedWins,
+                'expectedLosses': l + remaining[k] - simulatedWins,
+                'expectedRank': sum(result[1][k] for result in results) / runs,
+                'playoffOdds': sum(result[2][k] for result in results) / runs})
+        return sorted(standings, key=lambda x: x['expectedRank'])
+
+
+def main(args):
+    from rankings_cli import readConfig, rankingsOptions
+
+    properties = readConfig(args.config)
+    simulation = SeasonSimulation(properties['leagueId'],
+                                  properties['seasonId'],
+                                  properties['lowerBetter'].split(','),
+                                  properties.get('playoffTeams', 4),
+                                  **rankingsOptions(properties))
+    simulation.loginESPN(properties['username'], properties['password'])
+    print('%-30s %9s %7s %7s %9s %8s %8s' % ('team', 'record', 'awp', 'luck',
+                                              'exp. W-L', 'exp. rk',
+                                              'playoffs'))
+    for row in simulation.simulate(args.runs, args.seed, args.workers,
+                                   engine=args.engine):
+        print('%-30s %9s %7.3f %+7.1f %9s %8.2f %7.1f%%' %
+              (row['team'], '%d-%d-%d' % (row['wins'], row['losses'],
+                                          row['ties']),
+               row['awp'], row['luck'],
+               '%.0f-%.0f' % (row['expectedWins'], row['expectedLosses']),
+               row['expectedRank'], 100 * row['playoffOdds']))
+
+if __name__ == '__main__':
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('-c', '--config', default='pr.conf',
+                        help='league configuration file')
+    parser.add_argument('-n', '--runs', type=int,
+                        help='number of seasons to simulate (default: \
+                        100000 with numpy, 20000 without)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='random seed, for repeatable results')
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help='simulate batches in this many processes')
+    parser.add_argument('--engine', choices=sorted(SeasonSimulation._BATCHES),
+                        help='simulate whole batches with NumPy, or one \
+                        season at a time in Python (default: numpy if it \
+                        is installed)')
+
+    args = parser.parse_args()
+    main(args)
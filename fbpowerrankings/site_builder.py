@@ -0,0 +1,366 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# The MIT License (MIT)
+#
+# Copyright (c) 2015 Michel Mansour
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""\
+Build a static site of power rankings: a page for every completed week of
+every season, a page for each season as a whole, and an index linking them.
+
+Every page records a hash of the data it was rendered from (and of the
+template), so rebuilding only renders the pages whose data changed. The
+pages that do need rendering are rendered in parallel worker processes.
+Pages of weeks (and seasons) that have ended are marked final, and a
+rebuild keeps them without computing their rankings again.
+"""
+
+from rankings_cli import readConfig, rankingsOptions, templateContext, \
+    loadTemplate
+from power_rankings import SeasonRankings, SeasonHistory
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _renderPage(job):
+    # runs in a worker process, which compiles each template only once
+    (templateDir, templateName, context, path) = job
+    with open(path, 'w') as outFile:
+        print(loadTemplate(templateDir, templateName).render(context),
+              file=outFile)
+
+
+class SiteBuilder:
+    """
+    Render pages into a site directory, skipping pages whose data did not
+    change since the last build.
+
+    The hashes of the pages' data are kept in a manifest file in the site
+    directory, along with whether each page is final: rendered from the
+    rankings of a week or season that has ended, which cannot change any
+    more. A final page can be kept as it is, with the same template, without
+    its rankings.
+
+    Public methods:
+        addPage -- Add a rankings page to the site
+        isFinal -- Whether a page is final and can be kept
+        finalSeasonWeeks -- The weeks of a season whose pages are all final
+        keepPage -- Add a final page to the site without its rankings
+        build -- Render the changed pages, the index and the style sheet
+    """
+
+    MANIFEST = '.manifest.json'
+
+    def __init__(self, siteDir, leagueName, templateDir=None, workers=1):
+        """Create a SiteBuilder.
+
+           Required arguments:
+           siteDir -- the directory the site is written to
+           leagueName -- the league name shown on every page
+
+           Keyword arguments:
+           templateDir -- the directory holding rankings.html and index.html
+                          (default the templates directory next to this file)
+           workers -- the number of processes rendering pages (default 1)
+        """
+        self._siteDir = siteDir
+        self._leagueName = leagueName
+        self._templateDir = templateDir or os.path.join(_HERE, 'templates')
+        self._workers = workers
+        self._pages = []
+        self._manifest = None
+
+    @staticmethod
+    def pageName(seasonId, week):
+        """Return the file name of a week's page, or of a season's page if
+           week is 0."""
+        if week > 0:
+            return '%s-week%02d.html' % (seasonId, week)
+        return '%s-season.html' % seasonId
+
+    def addPage(self, teamAbbrMap, rankings, seasonId, week, final=False,
+                weeks=None):
+        """Add the page for a week's rankings, or a season's if week is 0.
+
+           Required arguments:
+           teamAbbrMap -- the team abbreviations, as returned by
+                          PowerRankings.teamAbbreviations
+           rankings -- the rankings, as returned by
+                       PowerRankings.powerRankings
+           seasonId -- the season ID (the year)
+           week -- the week (matchup period), or 0 for the season
+
+           Keyword arguments:
+           final -- True if the week or season has ended (default False)
+           weeks -- for a final season, its number of weeks (default None)
+        """
+        self._pages.append((str(seasonId), int(week), teamAbbrMap, rankings,
+                            final, weeks))
+
+    def _entry(self, seasonId, week):
+        if self._manifest is None:
+            self._manifest = self._loadManifest()
+        name = SiteBuilder.pageName(seasonId, week)
+        entry = self._manifest.get(name)
+        if not isinstance(entry, dict) or not entry.get('final') or \
+                entry.get('render') != self._renderKey() or \
+                not os.path.exists(os.path.join(self._siteDir, name)):
+            return None
+        return entry
+
+    def isFinal(self, seasonId, week):
+        """Return True if the site already has a final page for the week, or
+           for the season if week is 0, rendered with the same template."""
+        return self._entry(str(seasonId), int(week)) is not None
+
+    def finalSeasonWeeks(self, seasonId):
+        """Return the number of weeks of a season that has ended, if the
+           site already has final pages for the season and each of its
+           weeks, or None."""
+        entry = self._entry(str(seasonId), 0)
+        if entry is None or entry.get('weeks') is None:
+            return None
+        weeks = entry['weeks']
+        if not all(self.isFinal(seasonId, week)
+                   for week in range(1, weeks + 1)):
+            return None
+        return weeks
+
+    def keepPage(self, seasonId, week):
+        """Add a page that isFinal reports as final, keeping it as it is."""
+        if not self.isFinal(seasonId, week):
+            raise ValueError('no final page for %s week %d to keep' %
+                             (seasonId, week))
+        self._pages.append((str(seasonId), int(week), None, None, True,
+                            None))
+
+    def _templateHash(self, name):
+        with open(os.path.join(self._templateDir, name), 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    def _renderKey(self):
+        # what every rankings page depends on besides its own data
+        return SiteBuilder._hash(self._templateHash('rankings.html'),
+                                 self._leagueName)
+
+    @staticmethod
+    def _hash(*data):
+        return hashlib.sha256(json.dumps(data, sort_keys=True).encode(
+            'utf-8')).hexdigest()
+
+    def _loadManifest(self):
+        try:
+            with open(os.path.join(self._siteDir, SiteBuilder.MANIFEST)) as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return {}
+
+    def _copyStyle(self):
+        source = os.path.join(_HERE, 'style.css')
+        target = os.path.join(self._siteDir, 'style.css')
+        with open(source, 'rb') as f:
+            style = f.read()
+        if os.path.exists(target):
+            with open(target, 'rb') as f:
+                if f.read() == style:
+                    return False
+        shutil.copyfile(source, target)
+        return True
+
+    def _indexContext(self):
+        seasons = {}
+        for (seasonId, week, teamAbbrMap, rankings, final,
+             weeks) in self._pages:
+            title = 'Week %d' % week if week > 0 else 'Season'
+            seasons.setdefault(seasonId, []).append(
+                (week if week > 0 else float('inf'),
+                 {'file': SiteBuilder.pageName(seasonId, week),
+                  'title': title}))
+        return {'leagueName': self._leagueName,
+                'seasons': [{'year': seasonId,
+                             'pages': [page for (order, page) in
+                                       sorted(seasons[seasonId],
+                                              key=lambda x: x[0])]}
+                            for seasonId in sorted(seasons, reverse=True)]}
+
+    def build(self):
+        """Write the site, rendering only the pages whose data changed.
+
+           Return a dict with the keys 'rendered' and 'skipped' (lists of
+           page file names) and 'seconds'.
+        """
+        start = time.time()
+        os.makedirs(self._siteDir, exist_ok=True)
+        manifest = self._loadManifest()
+        newManifest = {}
+        rankingsTemplate = self._templateHash('rankings.html')
+        renderKey = self._renderKey()
+        jobs = []
+        skipped = []
+        for (seasonId, week, teamAbbrMap, rankings, final,
+             weeks) in self._pages:
+            name = SiteBuilder.pageName(seasonId, week)
+            if rankings is None:
+                # a kept final page
+                newManifest[name] = manifest[name]
+                skipped.append(name)
+                continue
+            digest = SiteBuilder._hash(rankingsTemplate, self._leagueName,
+                                       seasonId, week, teamAbbrMap, rankings)
+            newManifest[name] = {'digest': digest, 'final': final,
+                                 'render': renderKey, 'weeks': weeks}
+            entry = manifest.get(name)
+            if isinstance(entry, dict) and entry['digest'] == digest and \
+                    os.path.exists(os.path.join(self._siteDir, name)):
+                skipped.append(name)
+                continue
+            jobs.append((self._templateDir, 'rankings.html',
+                         templateContext(self._leagueName, teamAbbrMap,
+                                         rankings, seasonId, week),
+                         os.path.join(self._siteDir, name)))
+
+        index = self._indexContext()
+        digest = SiteBuilder._hash(self._templateHash('index.html'), index)
+        newManifest['index.html'] = {'digest': digest, 'final': False}
+        entry = manifest.get('index.html')
+        if isinstance(entry, dict) and entry['digest'] == digest and \
+                os.path.exists(os.path.join(self._siteDir, 'index.html')):
+            skipped.append('index.html')
+        else:
+            jobs.append((self._templateDir, 'index.html', index,
+                         os.path.join(self._siteDir, 'index.html')))
+
+        if self._workers > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(self._workers) as executor:
+                list(executor.map(_renderPage, jobs))
+        else:
+            for job in jobs:
+                _renderPage(job)
+        self._copyStyle()
+
+        # written last, so an interrupted build renders its pages again
+        with open(os.path.join(self._siteDir, SiteBuilder.MANIFEST),
+                  'w') as f:
+            json.dump(newManifest, f, indent=2, sort_keys=True)
+        return {'rendered': [os.path.basename(job[3]) for job in jobs],
+                'skipped': skipped, 'seconds': time.time() - start}
+
+
+def buildSite(properties, seasons, outputDir, workers=1, session=None):
+    """Compute the rankings of the given seasons and build their site.
+
+       The rankings of weeks and seasons that have ended are only computed
+       if the site has no final page for them yet, so rebuilding the site
+       of a past season takes no requests at all, and rebuilding the
+       current one only computes the season so far and the weeks that have
+       ended since the last build.
+
+       Required arguments:
+       properties -- the league configuration, as returned by readConfig
+       seasons -- the season IDs to build
+       outputDir -- the directory to build the site in
+
+       Keyword arguments:
+       workers -- the number of processes rendering pages (default 1)
+       session -- the HTTP session to use (default None, ie one created
+                  from the configuration)
+
+       Return the result of SiteBuilder.build, with 'seconds' covering the
+       whole build, and 'computed' (the number of pages whose rankings
+       were computed) added.
+    """
+    start = time.time()
+    leagueId = properties['leagueId']
+    lowerBetter = properties['lowerBetter'].split(',')
+    options = rankingsOptions(properties, session=session)
+    builder = SiteBuilder(outputDir, properties['leagueName'],
+                          workers=workers)
+    loggedIn = False
+    computed = 0
+    for seasonId in seasons:
+        weeks = builder.finalSeasonWeeks(seasonId)
+        if weeks is not None:
+            for week in range(weeks + 1):
+                builder.keepPage(seasonId, week)
+            continue
+        season = SeasonRankings(leagueId, seasonId, lowerBetter, **options)
+        if not loggedIn:
+            season.loginESPN(properties['username'], properties['password'])
+            loggedIn = True
+        teamAbbrMap = season.teamAbbreviations()
+        completed = season.completedWeeks()
+        over = completed == season.scheduledWeeks()
+        builder.addPage(teamAbbrMap, season.powerRankings(), seasonId, 0,
+                        final=over, weeks=completed if over else None)
+        computed += 1
+        missing = []
+        for week in range(1, completed + 1):
+            if builder.isFinal(seasonId, week):
+                builder.keepPage(seasonId, week)
+            else:
+                missing.append(week)
+        if missing:
+            # the session carries the login over to the history
+            history = SeasonHistory(leagueId, seasonId, lowerBetter,
+                                    missing[0], missing[-1], **options)
+            for weekRankings in history.weeklyRankings():
+                if weekRankings['week'] in missing:
+                    builder.addPage(teamAbbrMap, weekRankings['rankings'],
+                                    seasonId, weekRankings['week'],
+                                    final=True)
+                    computed += 1
+    result = builder.build()
+    result['computed'] = computed
+    result['seconds'] = time.time() - start
+    return result
+
+
+def main(args):
+    properties = readConfig(args.config)
+    seasons = args.seasons or [properties['seasonId']]
+    result = buildSite(properties, seasons, args.outputDir, args.workers)
+    print('computed %d pages, rendered %d, skipped %d unchanged, in %.2f '
+          'seconds' % (result['computed'], len(result['rendered']),
+                       len(result['skipped']), result['seconds']))
+
+if __name__ == '__main__':
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('-c', '--config', default='pr.conf',
+                        help='league configuration file')
+    parser.add_argument('-o', '--output-dir', dest='outputDir',
+                        default='site', help='directory to build the site in')
+    parser.add_argument('-s', '--seasons', type=lambda x: x.split(','),
+                        help='comma-separated seasons to build (default the \
+                        configured seasonId)')
+    parser.add_argument('-j', '--workers', type=int, default=4,
+                        help='number of processes rendering pages')
+
+    args = parser.parse_args()
+    main(args)
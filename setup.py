@@ -11,4 +11,5 @@ setup(name='fbpowerrankings',
                         'Jinja2==2.7.3',
                         'lxml==3.4.1',
                         'beautifulsoup4==4.3.2'],
+      extras_require={'numpy': ['numpy']},
       zip_safe=False)
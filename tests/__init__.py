@@ -0,0 +1,7 @@
+# The modules of fbpowerrankings import each other the way the scripts do,
+# so the tests run with the package directory on the path, like the scripts.
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'fbpowerrankings'))
@@ -0,0 +1,71 @@
+"""Shared fixtures: a synthetic league served by a local fake ESPN."""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import rankings_cli
+from fake_espn import SyntheticLeague, FakeESPNServer, LocalSession
+
+
+class LeagueTestCase(unittest.TestCase):
+    """
+    A test case with a synthetic league served for the whole class.
+
+    Subclasses may set TEAMS, CATEGORIES and WEEKS.
+    """
+
+    TEAMS = 10
+    CATEGORIES = 10
+    WEEKS = 22
+    LOWER_BETTER = ['ERA', 'WHIP']
+
+    @classmethod
+    def setUpClass(cls):
+        cls.league = SyntheticLeague(cls.TEAMS, cls.CATEGORIES, cls.WEEKS)
+        cls.server = FakeESPNServer(cls.league)
+        cls.server.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def session(self):
+        return LocalSession(self.server.url())
+
+    def rankings(self, cls, *args, **kwargs):
+        """Create a logged-in cls (a PowerRankings subclass) for the
+           league; extra arguments follow lowerBetterCategories."""
+        kwargs.setdefault('session', self.session())
+        pr = cls('1', self.league.seasonId(), self.LOWER_BETTER, *args,
+                 **kwargs)
+        pr.loginESPN('user', 'password')
+        return pr
+
+    def runCli(self, **options):
+        """Run rankings_cli.main against the league with the command line
+           options given (by their argparse dest) and return what it wrote
+           to standard output."""
+        args = {'season': False, 'weeks': None, 'week': 1, 'stateFile': None,
+                'outputDir': '.', 'history': None, 'format': 'jsonl',
+                'record': None, 'replay': None, 'profile': None,
+                'cprofile': None, 'postMessage': False}
+        args.update(options)
+        with tempfile.TemporaryDirectory() as configDir:
+            args['config'] = os.path.join(configDir, 'pr.conf')
+            with open(args['config'], 'w') as conf:
+                conf.write('leagueId=1\nseasonId=%s\nleagueName=Test\n'
+                           'lowerBetter=%s\nusername=user\n'
+                           'password=password\n' %
+                           (self.league.seasonId(),
+                            ','.join(self.LOWER_BETTER)))
+            out = io.StringIO()
+            with mock.patch.object(rankings_cli, 'createSession',
+                                   lambda properties: self.session()), \
+                    contextlib.redirect_stdout(out):
+                rankings_cli.main(argparse.Namespace(**args))
+        return out.getvalue()
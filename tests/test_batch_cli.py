@@ -0,0 +1,41 @@
+import argparse
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import batch_cli
+
+
+def crashLeague(configFile, doSeason, week, outputDir, rate):
+    # a worker process that dies, as if it ran out of memory
+    os._exit(1)
+
+
+class BatchTest(unittest.TestCase):
+
+    def test_worker_count(self):
+        self.assertEqual(batch_cli.workerCount('3'), 3)
+        for value in ('0', '-2', 'x'):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                batch_cli.workerCount(value)
+
+    def test_broken_pool_is_summarized(self):
+        with tempfile.TemporaryDirectory() as outputDir:
+            configs = [os.path.join(outputDir, 'league%d.conf' % i)
+                       for i in range(3)]
+            args = argparse.Namespace(configs=configs, outputDir=outputDir,
+                                      season=True, week=-1, workers=2,
+                                      rate=0)
+            with mock.patch.object(batch_cli, 'runLeague', crashLeague):
+                self.assertEqual(batch_cli.main(args), 1)
+            with open(os.path.join(outputDir, 'summary.json')) as f:
+                report = json.load(f)
+        self.assertEqual(report['failed'], configs)
+        for summary in report['leagues']:
+            self.assertIn('BrokenProcessPool', summary['error'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+
+from category_analysis import CategoryAnalysis
+from power_rankings import PowerRankings, WeeklyRankings, SeasonRankings
+from tests.support import LeagueTestCase
+
+
+class AnalysisParityTest(LeagueTestCase):
+    """The bitmask analysis matches rankings computed directly."""
+
+    TEAMS = 12
+
+    def directRankings(self, pr, categories):
+        # the rankings scored on some of the categories, one comparison at
+        # a time, as PowerRankings computes them
+        (allCategories, totals, pairings) = pr.categoryTotals()
+        keep = [c for (c, category) in enumerate(allCategories)
+                if category in categories]
+        adjusted = dict((team, pr._teamTotals([values[c] for c in keep],
+                                              [allCategories[c]
+                                               for c in keep]))
+                        for (team, values) in totals.items())
+        records = PowerRankings._pythonPowerMatrix(adjusted,
+                                                   pairings).records()
+        return PowerRankings._rankings(
+            records, PowerRankings._oppAwps(records, pr._allSchedules()))
+
+    def test_all_categories(self):
+        for (cls, args) in ((WeeklyRankings, (4,)), (SeasonRankings, ())):
+            with self.subTest(rankings=cls.__name__):
+                pr = self.rankings(cls, *args)
+                analysis = CategoryAnalysis.fromRankings(pr)
+                self.assertEqual(analysis.rankings(), pr.powerRankings())
+
+    def test_drop_one(self):
+        pr = self.rankings(SeasonRankings)
+        analysis = CategoryAnalysis.fromRankings(pr)
+        categories = analysis.categories()
+        for (dropped, rankings) in analysis.dropOneVariants().items():
+            self.assertEqual(rankings, self.directRankings(
+                pr, [c for c in categories if c != dropped]))
+
+    def test_flipped(self):
+        analysis = CategoryAnalysis.fromRankings(
+            self.rankings(SeasonRankings))
+        # scoring ERA the other way around is the same as a league where
+        # only WHIP is lower-is-better
+        direct = SeasonRankings('1', self.league.seasonId(), ['WHIP'],
+                                session=self.session())
+        direct.loginESPN('user', 'password')
+        self.assertEqual(analysis.rankings(flipped=['ERA']),
+                         direct.powerRankings())
+
+
+if __name__ == '__main__':
+    unittest.main()
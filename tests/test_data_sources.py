@@ -0,0 +1,71 @@
+import json
+import unittest
+
+from data_sources import DataSource, JsonSource
+from power_rankings import WeeklyRankings, SeasonRankings, SeasonHistory
+from tests.support import LeagueTestCase
+
+
+class SourceParityTest(LeagueTestCase):
+    """The JSON API gives the same rankings as the HTML pages."""
+
+    TEAMS = 12
+
+    def bothSources(self, cls, *args):
+        return [self.rankings(cls, *args, source=source, scheduleWorkers=4)
+                for source in ('html', 'json')]
+
+    def test_weekly(self):
+        for week in (1, 5, self.WEEKS):
+            (html, api) = self.bothSources(WeeklyRankings, week)
+            self.assertEqual(api.teamAbbreviations(),
+                             html.teamAbbreviations())
+            self.assertEqual(api.powerRankings(), html.powerRankings())
+
+    def test_season(self):
+        (html, api) = self.bothSources(SeasonRankings)
+        self.assertEqual(api.powerRankings(), html.powerRankings())
+        self.assertEqual(api.completedWeeks(), html.completedWeeks())
+        # the login and the two views
+        self.assertEqual(api.requestCount(), 1 + 2)
+
+    def test_playoffs_left_out(self):
+        # the JSON schedule goes on into a playoff round, which has no
+        # matchup period of its own
+        (html, api) = self.bothSources(WeeklyRankings, 1)
+        self.assertEqual(api.scheduledWeeks(), self.WEEKS)
+        for teamId in api._teamIds():
+            self.assertEqual(api._teamMatchups(teamId),
+                             html._teamMatchups(teamId))
+
+    def test_history(self):
+        (html, api) = self.bothSources(SeasonHistory, 1, 4)
+        self.assertEqual(list(api.weeklyRankings()),
+                         list(html.weeklyRankings()))
+
+
+class StatIdTest(unittest.TestCase):
+
+    def league(self, statIds):
+        return json.dumps({
+            'settings': {
+                'scoringSettings': {'scoringItems': [
+                    {'statId': statId} for statId in statIds]},
+                'scheduleSettings': {'matchupPeriods': []}},
+            'teams': []})
+
+    def test_known_ids(self):
+        league = JsonSource._readLeague(self.league([20, 5, 47, 41]))
+        self.assertEqual(league['categories'], ['R', 'HR', 'ERA', 'WHIP'])
+
+    def test_unknown_id(self):
+        with self.assertRaises(ValueError):
+            JsonSource._readLeague(self.league([20, 999]))
+
+    def test_abstract(self):
+        with self.assertRaises(TypeError):
+            DataSource(None, '1', '2020')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import csv
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from export import writeJsonLines, writeCsv, writeMatrix, readMatrix
+from power_rankings import WeeklyRankings, SeasonRankings
+from tests.support import LeagueTestCase
+
+
+class RoundTripTest(LeagueTestCase):
+    """Exported rankings read back to the rankings that were written."""
+
+    TEAMS = 12
+
+    def setUp(self):
+        self.weekly = self.rankings(WeeklyRankings, 3).powerRankings()
+        self.season = self.rankings(SeasonRankings).powerRankings()
+
+    def test_json_lines(self):
+        for rankings in (self.weekly, self.season):
+            out = io.StringIO()
+            writeJsonLines(rankings, out)
+            rows = [json.loads(line) for line in
+                    out.getvalue().splitlines()]
+            self.assertEqual(rows, rankings)
+
+    def test_csv(self):
+        out = io.StringIO()
+        writeCsv(self.weekly, out)
+        rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+        self.assertEqual(len(rows), self.TEAMS)
+        for (row, expected) in zip(rows, self.weekly):
+            self.assertEqual(row['team'], expected['team'])
+            for field in ('rank', 'wins', 'losses', 'ties'):
+                self.assertEqual(int(row[field]), expected[field])
+            for field in ('awp', 'oppAwp'):
+                self.assertEqual(float(row[field]), expected[field])
+            self.assertEqual(row['matchupOpp'], expected['matchupOpp'])
+
+    def test_matrix(self):
+        for rankings in (self.weekly, self.season):
+            with tempfile.TemporaryDirectory() as tmpDir:
+                path = os.path.join(tmpDir, 'matrix.bin')
+                with open(path, 'wb') as out:
+                    writeMatrix(rankings, out)
+                with readMatrix(path) as matrix:
+                    self.assertEqual(matrix.teams(),
+                                     sorted(row['team'] for row in rankings))
+                    for row in rankings:
+                        for (opp, record) in row['powerRow'].items():
+                            self.assertEqual(
+                                matrix.record(row['team'], opp),
+                                (record['wins'], record['losses'],
+                                 record['ties']))
+
+
+if __name__ == '__main__':
+    unittest.main()
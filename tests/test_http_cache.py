@@ -0,0 +1,81 @@
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+
+from http_cache import ResponseCache
+
+URL = 'http://games.espn.go.com/flb/scoreboard'
+
+
+class SharedCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.directory = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def bodies(self):
+        return [name for name in os.listdir(self.directory)
+                if name.endswith('.html')]
+
+    def diskBytes(self):
+        return sum(os.path.getsize(os.path.join(self.directory, name))
+                   for name in self.bodies())
+
+    def test_instances_share_entries(self):
+        first = ResponseCache(self.directory, maxBytes=10000)
+        second = ResponseCache(self.directory, maxBytes=10000)
+        first.store(URL, {'week': 1}, 'one', {})
+        second.store(URL, {'week': 2}, 'two', {})
+        first.store(URL, {'week': 3}, 'three', {})
+        third = ResponseCache(self.directory, maxBytes=10000)
+        for (week, text) in ((1, 'one'), (2, 'two'), (3, 'three')):
+            self.assertEqual(third.lookup(URL, {'week': week})['text'], text)
+        self.assertEqual(len(self.bodies()), 3)
+
+    def test_size_limit_covers_all_instances(self):
+        caches = [ResponseCache(self.directory, maxBytes=1000)
+                  for _ in range(3)]
+        for week in range(6):
+            caches[week % 3].store(URL, {'week': week}, 'x' * 300, {})
+        self.assertLessEqual(self.diskBytes(), 1000)
+        self.assertEqual(len(self.bodies()), 3)
+        # the most recently stored pages survive
+        self.assertIsNotNone(caches[0].lookup(URL, {'week': 5}))
+        self.assertIsNone(caches[0].lookup(URL, {'week': 0}))
+
+    def test_orphaned_bodies_are_swept(self):
+        cache = ResponseCache(self.directory)
+        cache.store(URL, {'week': 1}, 'one', {})
+        cache.close()
+        for name in ('0' * 40 + '.html', 'abc.html.tmp'):
+            with open(os.path.join(self.directory, name), 'w') as f:
+                f.write('orphan')
+        cache = ResponseCache(self.directory)
+        self.assertEqual(sorted(os.listdir(self.directory)),
+                         sorted([ResponseCache._key(URL, {'week': 1}) +
+                                 '.html', 'index.sqlite']))
+        self.assertEqual(cache.lookup(URL, {'week': 1})['text'], 'one')
+
+    def test_hit_updates_only_its_entry(self):
+        cache = ResponseCache(self.directory)
+        cache.store(URL, {'week': 1}, 'one', {})
+        cache.store(URL, {'week': 2}, 'two', {})
+        db = sqlite3.connect(os.path.join(self.directory, 'index.sqlite'))
+        before = dict(db.execute('SELECT key, accessed FROM entries'))
+        time.sleep(0.01)
+        cache.lookup(URL, {'week': 1})
+        after = dict(db.execute('SELECT key, accessed FROM entries'))
+        key1 = ResponseCache._key(URL, {'week': 1})
+        key2 = ResponseCache._key(URL, {'week': 2})
+        self.assertGreater(after[key1], before[key1])
+        self.assertEqual(after[key2], before[key2])
+        db.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import time
+import unittest
+
+import requests
+
+from http_session import ESPNSession, TokenBucket
+from tests.support import LeagueTestCase
+
+
+class ESPNSessionTest(LeagueTestCase):
+    """Requests are rate limited, retried and given up on as documented."""
+
+    def setUp(self):
+        self.url = self.server.url() + '/flb/ownerinfo'
+
+    def espnSession(self, **options):
+        options.setdefault('backoff', 0.01)
+        return ESPNSession(**options)
+
+    def served(self, session, method='GET'):
+        before = self.server.requestCount()
+        try:
+            return session.request(method, self.url)
+        finally:
+            self.sent = self.server.requestCount() - before
+
+    def test_server_errors_are_retried(self):
+        session = self.espnSession(retries=3)
+        self.server.fail(503, 502)
+        r = self.served(session)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(self.sent, 3)
+        counters = session.counters()
+        self.assertEqual(counters['serverErrors'], 2)
+        self.assertEqual(counters['retries'], 2)
+        self.assertEqual(counters['failures'], 0)
+
+    def test_exhausted_retries_raise(self):
+        session = self.espnSession(retries=2)
+        self.server.fail(500, 500, 500)
+        with self.assertRaises(requests.HTTPError) as raised:
+            self.served(session)
+        self.assertEqual(raised.exception.response.status_code, 500)
+        self.assertEqual(self.sent, 3)
+        self.assertEqual(session.counters()['failures'], 1)
+
+    def test_backoff_grows(self):
+        session = self.espnSession(backoff=10, maxBackoff=60)
+        for attempt in range(4):
+            for _ in range(50):
+                self.assertLessEqual(session._delay(attempt),
+                                     10 * 2 ** attempt)
+        self.assertLessEqual(session._delay(10), 60)
+
+    def test_retry_after_is_honoured(self):
+        session = self.espnSession(retries=1)
+        self.server.fail(429, retryAfter=1)
+        start = time.monotonic()
+        r = self.served(session)
+        self.assertGreaterEqual(time.monotonic() - start, 1)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(self.sent, 2)
+        self.assertEqual(session.counters()['throttled'], 1)
+
+    def test_post_is_only_retried_when_throttled(self):
+        session = self.espnSession(retries=3)
+        self.server.fail(503)
+        with self.assertRaises(requests.HTTPError):
+            self.served(session, 'POST')
+        self.assertEqual(self.sent, 1)
+        self.server.fail(429)
+        r = self.served(session, 'POST')
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(self.sent, 2)
+
+    def test_rate_limit(self):
+        session = self.espnSession(rate=20)
+        start = time.monotonic()
+        for _ in range(5):
+            self.served(session)
+        self.assertGreaterEqual(time.monotonic() - start, 0.19)
+        self.assertGreater(session.counters()['rateLimitSeconds'], 0.15)
+
+
+class TokenBucketTest(unittest.TestCase):
+
+    def test_burst_then_rate(self):
+        bucket = TokenBucket(20, burst=3)
+        waits = [bucket.acquire() for _ in range(5)]
+        self.assertEqual(waits[:3], [0, 0, 0])
+        self.assertGreater(waits[3], 0)
+        # each later token comes 1/20 s after the one before it
+        self.assertAlmostEqual(waits[4], 0.05, delta=0.02)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
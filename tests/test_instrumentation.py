@@ -0,0 +1,116 @@
+import json
+import os
+import pstats
+import tempfile
+import unittest
+
+from instrumentation import Profiler, instrumented
+from power_rankings import WeeklyRankings
+from tests.support import LeagueTestCase
+
+
+class Worker:
+
+    def __init__(self, profiler):
+        self._profiler = profiler
+
+    @instrumented('outer')
+    def outer(self, requests):
+        for _ in range(requests):
+            self._profiler.recordRequest(100)
+        return self.inner()
+
+    @instrumented('inner')
+    def inner(self):
+        if self._profiler is not None:
+            self._profiler.recordRequest(10)
+        return 'done'
+
+
+class ProfilerTest(unittest.TestCase):
+
+    def test_nested_stages(self):
+        profiler = Profiler()
+        worker = Worker(profiler)
+        self.assertEqual(worker.outer(2), 'done')
+        self.assertEqual(worker.inner(), 'done')
+        report = profiler.report()
+        self.assertEqual((report['requests'], report['bytes']), (4, 220))
+        outer = report['stages']['outer']
+        inner = report['stages']['inner']
+        self.assertEqual((outer['calls'], outer['requests'], outer['bytes']),
+                         (1, 3, 210))
+        self.assertEqual((inner['calls'], inner['requests'], inner['bytes']),
+                         (2, 2, 20))
+        self.assertGreaterEqual(outer['seconds'], 0)
+
+    def test_no_profiler(self):
+        self.assertEqual(Worker(None).inner(), 'done')
+
+    def test_json_report(self):
+        profiler = Profiler()
+        Worker(profiler).outer(1)
+        with tempfile.TemporaryDirectory() as tmpDir:
+            path = os.path.join(tmpDir, 'report.json')
+            profiler.writeReport(path, {'session': {'retries': 0}})
+            with open(path) as f:
+                report = json.load(f)
+        self.assertEqual(report['session'], {'retries': 0})
+        self.assertEqual(sorted(report['stages']), ['inner', 'outer'])
+        self.assertEqual(report['requests'], 2)
+
+
+class ProfiledRunTest(LeagueTestCase):
+    """A profiled run accounts for every request and stage."""
+
+    def test_weekly_run(self):
+        profiler = Profiler(('powerMatrix', 'strengthOfSchedule'))
+        before = self.server.requestCount()
+        pr = self.rankings(WeeklyRankings, 3, profiler=profiler,
+                           scheduleWorkers=4)
+        pr.powerRankings()
+        report = profiler.report()
+        stages = report['stages']
+        self.assertEqual(set(stages),
+                         set(['loginESPN', 'teamIds', 'fetchSchedule',
+                              'teamSchedule', 'scoreboard', 'powerMatrix',
+                              'strengthOfSchedule']))
+        self.assertEqual(report['requests'],
+                         self.server.requestCount() - before)
+        # the pages are each fetched in one stage
+        self.assertEqual(sum(stages[name]['requests'] for name in
+                             ('loginESPN', 'teamIds', 'fetchSchedule',
+                              'scoreboard')), report['requests'])
+        self.assertEqual(stages['fetchSchedule']['calls'], self.TEAMS)
+        self.assertEqual(stages['fetchSchedule']['requests'], self.TEAMS)
+        self.assertEqual(stages['teamSchedule']['requests'], 0)
+        self.assertEqual(stages['powerMatrix']['requests'],
+                         stages['scoreboard']['requests'])
+
+        with tempfile.TemporaryDirectory() as tmpDir:
+            path = os.path.join(tmpDir, 'run.prof')
+            profiler.writeCProfile(path)
+            functions = set(name for (_, _, name) in
+                            pstats.Stats(path).stats)
+        for function in ('_powerMatrix', '_pythonPowerMatrix',
+                         '_opponentAwps', '_awp'):
+            self.assertIn(function, functions)
+        # the schedules are fetched and parsed on other threads
+        self.assertNotIn('_fetchSchedule', functions)
+
+
+class CProfileTest(LeagueTestCase):
+    """--cprofile covers the compute stages of a run."""
+
+    def test_power_matrix_is_profiled(self):
+        with tempfile.TemporaryDirectory() as tmpDir:
+            path = os.path.join(tmpDir, 'run.prof')
+            self.runCli(week=3, cprofile=path)
+            functions = set(name for (_, _, name) in
+                            pstats.Stats(path).stats)
+        self.assertIn('_pythonPowerMatrix', functions)
+        self.assertIn('_opponentAwps', functions)
+
+
+if __name__ == '__main__':
+    unittest.main()
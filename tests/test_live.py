@@ -0,0 +1,32 @@
+import unittest
+
+from live import LiveRankings
+from power_rankings import WeeklyRankings
+from tests.support import LeagueTestCase
+
+
+class LiveParityTest(LeagueTestCase):
+    """Rankings updated in place match a fresh run on the same scoreboard."""
+
+    WEEK = 2
+
+    def checkLive(self, **options):
+        live = self.rankings(LiveRankings, self.WEEK, **options)
+        names = self.league.teamNames()
+        self.assertEqual(live.poll(), sorted(names))
+        self.assertEqual(live.poll(), [])
+        for (team, category, amount) in ((3, 1, 5), (3, 4, 2), (6, 0, 40)):
+            self.league.score(self.WEEK, team, category, amount)
+            self.assertEqual(live.poll(), [names[team]])
+            fresh = self.rankings(WeeklyRankings, self.WEEK, **options)
+            self.assertEqual(live.powerRankings(), fresh.powerRankings())
+
+    def test_html_python(self):
+        self.checkLive()
+
+    def test_json_numpy(self):
+        self.checkLive(source='json', engine='numpy')
+
+
+if __name__ == '__main__':
+    unittest.main()
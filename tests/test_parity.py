@@ -0,0 +1,45 @@
+import itertools
+import unittest
+
+from power_rankings import WeeklyRankings, SeasonRankings
+from tests.support import LeagueTestCase
+
+
+class EngineParityTest(LeagueTestCase):
+    """The numpy power matrix engine gives the same rankings as python."""
+
+    TEAMS = 12
+
+    def test_engines(self):
+        for (cls, args) in ((WeeklyRankings, (1,)), (WeeklyRankings, (7,)),
+                            (SeasonRankings, ())):
+            with self.subTest(rankings=cls.__name__, args=args):
+                (python, numpy) = [
+                    self.rankings(cls, *args, engine=engine).powerRankings()
+                    for engine in ('python', 'numpy')]
+                self.assertEqual(numpy, python)
+
+
+class CombinationParityTest(LeagueTestCase):
+    """Every parser, source and engine gives the same rankings."""
+
+    TEAMS = 8
+
+    def test_combinations(self):
+        for (cls, args) in ((WeeklyRankings, (3,)), (SeasonRankings, ())):
+            expected = None
+            for (parser, source, engine) in itertools.product(
+                    ('soup', 'lxml'), ('html', 'json'), ('python', 'numpy')):
+                with self.subTest(rankings=cls.__name__, parser=parser,
+                                  source=source, engine=engine):
+                    pr = self.rankings(cls, *args, parser=parser,
+                                       source=source, engine=engine,
+                                       scheduleWorkers=2)
+                    result = (pr.teamAbbreviations(), pr.powerRankings())
+                    if expected is None:
+                        expected = result
+                    self.assertEqual(result, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
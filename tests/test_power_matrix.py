@@ -0,0 +1,95 @@
+import random
+import unittest
+
+from power_rankings import PowerRankings
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def randomLeague(teams, categories, seed=0):
+    # small totals, so that many categories end up tied
+    rand = random.Random(seed)
+    names = ['Team %02d' % i for i in range(teams)]
+    totals = dict((name, [float(rand.randint(0, 3))
+                          for c in range(categories)]) for name in names)
+    pairings = {}
+    for i in range(0, teams - 1, 2):
+        pairings[names[i]] = names[i + 1]
+        pairings[names[i + 1]] = names[i]
+    return (totals, pairings)
+
+
+def dictMatrix(totals, pairings):
+    # the dict-of-dicts that PowerMatrix replaced
+    records = {}
+    for (team, stats) in totals.items():
+        record = {'wins': 0, 'losses': 0, 'ties': 0,
+                  'opp': pairings.get(team), 'oppRecords': {}}
+        for (opp, oppStats) in totals.items():
+            if opp == team:
+                continue
+            wins = sum(1 for (a, b) in zip(stats, oppStats) if a > b)
+            losses = sum(1 for (a, b) in zip(stats, oppStats) if a < b)
+            ties = len(stats) - wins - losses
+            record['oppRecords'][opp] = {'wins': wins, 'losses': losses,
+                                         'ties': ties}
+            record['wins'] += wins
+            record['losses'] += losses
+            record['ties'] += ties
+        records[team] = record
+    return records
+
+
+SIZES = ((2, 1), (10, 10), (30, 7))
+
+
+class EngineTest(unittest.TestCase):
+    """Both engines build the same power matrix."""
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed')
+    def test_engines_agree(self):
+        for (teams, categories) in SIZES:
+            (totals, pairings) = randomLeague(teams, categories)
+            # season rankings have no pairings
+            for pairs in (pairings, {}):
+                self.assertEqual(
+                    PowerRankings._numpyPowerMatrix(totals, pairs).records(),
+                    PowerRankings._pythonPowerMatrix(totals,
+                                                     pairs).records())
+
+
+class PowerMatrixTest(unittest.TestCase):
+    """The packed matrix holds the records of the dict matrix."""
+
+    def test_records(self):
+        for (teams, categories) in SIZES:
+            (totals, pairings) = randomLeague(teams, categories, seed=1)
+            matrix = PowerRankings._pythonPowerMatrix(totals, pairings)
+            self.assertEqual(matrix.records(), dictMatrix(totals, pairings))
+
+    def test_rows(self):
+        (totals, pairings) = randomLeague(10, 10, seed=2)
+        matrix = PowerRankings._pythonPowerMatrix(totals, pairings)
+        expected = dictMatrix(totals, pairings)
+        self.assertEqual(len(matrix), 10)
+        self.assertEqual(sorted(matrix.teams()), sorted(totals))
+        for (i, row) in enumerate(matrix.rows()):
+            self.assertEqual(matrix.index(row.team), i)
+            record = expected[row.team]
+            self.assertEqual((row.wins, row.losses, row.ties, row.opp),
+                             (record['wins'], record['losses'],
+                              record['ties'], record['opp']))
+            self.assertEqual(row.powerRow(), record['oppRecords'])
+            for (opp, oppRecord) in record['oppRecords'].items():
+                self.assertEqual(row.against(opp),
+                                 (oppRecord['wins'], oppRecord['losses'],
+                                  oppRecord['ties']))
+                self.assertEqual(matrix.row(row.team).against(opp),
+                                 matrix.record(row.team, opp))
+
+
+if __name__ == '__main__':
+    unittest.main()
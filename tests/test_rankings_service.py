@@ -0,0 +1,68 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from rankings_service import RankingsService
+
+
+class SlowLoginService(RankingsService):
+    """A RankingsService whose logins take a while and are counted."""
+
+    def __init__(self, configFiles, slowLeague, **kwargs):
+        RankingsService.__init__(self, configFiles, **kwargs)
+        self.slowLeague = slowLeague
+        self.release = threading.Event()
+        self.logins = []
+
+    def _login(self, league):
+        self.logins.append(league)
+        if league == self.slowLeague:
+            self.release.wait(10)
+        return 'session for %s' % league
+
+
+class SessionTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        configFiles = []
+        for league in ('fast', 'slow'):
+            configFile = os.path.join(self._tmp.name, league + '.conf')
+            with open(configFile, 'w') as f:
+                f.write('leagueId=1\nseasonId=2020\n')
+            configFiles.append(configFile)
+        self.service = SlowLoginService(configFiles, 'slow')
+
+    def tearDown(self):
+        self.service.release.set()
+        self._tmp.cleanup()
+
+    def test_leagues_log_in_independently(self):
+        with ThreadPoolExecutor(2) as executor:
+            slow = executor.submit(self.service._session, 'slow')
+            while 'slow' not in self.service.logins:
+                time.sleep(0.01)
+            # the slow league's login does not hold up the other league
+            fast = executor.submit(self.service._session, 'fast')
+            self.assertEqual(fast.result(timeout=5), 'session for fast')
+            self.assertFalse(slow.done())
+            self.service.release.set()
+            self.assertEqual(slow.result(timeout=5), 'session for slow')
+
+    def test_concurrent_requests_share_a_login(self):
+        with ThreadPoolExecutor(8) as executor:
+            futures = [executor.submit(self.service._session, 'slow')
+                       for _ in range(8)]
+            while 'slow' not in self.service.logins:
+                time.sleep(0.01)
+            self.service.release.set()
+            sessions = set(future.result(timeout=5) for future in futures)
+        self.assertEqual(sessions, {'session for slow'})
+        self.assertEqual(self.service.logins, ['slow'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+import rankings_store
+from power_rankings import WeeklyRankings
+from rankings_store import RankingsStore
+from tests.support import LeagueTestCase
+
+WEEKS = (1, 2, 3)
+
+
+class RankingsStoreTest(LeagueTestCase):
+    """Saved rankings are what the queries give back."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.weekly = {}
+
+    def setUp(self):
+        for week in WEEKS:
+            if week not in self.weekly:
+                self.weekly[week] = self.rankings(WeeklyRankings,
+                                                  week).powerRankings()
+        self.store = RankingsStore(':memory:')
+        for week in WEEKS:
+            self.store.save('1', self.league.seasonId(), week,
+                            self.weekly[week])
+        self.team = self.weekly[1][0]['team']
+        self.opp = self.weekly[1][-1]['team']
+
+    def tearDown(self):
+        self.store.close()
+
+    def row(self, week, team):
+        return [row for row in self.weekly[week] if row['team'] == team][0]
+
+    def test_weeks(self):
+        self.assertEqual([row['week'] for row in self.store.weeks('1')],
+                         list(WEEKS))
+        self.assertEqual(self.store.weeks('2'), [])
+
+    def test_awp_trend(self):
+        trend = self.store.awpTrend('1', self.team)
+        self.assertEqual([row['week'] for row in trend], list(WEEKS))
+        for row in trend:
+            expected = self.row(row['week'], self.team)
+            for field in ('rank', 'wins', 'losses', 'ties', 'awp', 'oppAwp'):
+                self.assertEqual(row[field], expected[field])
+        self.assertEqual(self.store.awpTrend('1', self.team, 1900), [])
+
+    def test_best_weeks(self):
+        best = self.store.bestWeeks('1', limit=5)
+        expected = sorted((row['awp'] for week in WEEKS
+                           for row in self.weekly[week]), reverse=True)
+        self.assertEqual([row['awp'] for row in best], expected[:5])
+        for row in best:
+            self.assertEqual(row['rank'],
+                             self.row(row['week'], row['team'])['rank'])
+
+    def test_head_to_head(self):
+        h2h = self.store.headToHead('1', self.team, self.opp)
+        self.assertEqual([row['week'] for row in h2h], list(WEEKS))
+        for row in h2h:
+            expected = self.row(row['week'], self.team)
+            record = expected['powerRow'][self.opp]
+            self.assertEqual((row['wins'], row['losses'], row['ties']),
+                             (record['wins'], record['losses'],
+                              record['ties']))
+            self.assertEqual(row['matchup'],
+                             expected['matchupOpp'] == self.opp)
+
+    def test_resave_replaces_week(self):
+        self.store.save('1', self.league.seasonId(), 1, self.weekly[2])
+        trend = self.store.awpTrend('1', self.team)
+        self.assertEqual(len(trend), len(WEEKS))
+        self.assertEqual(trend[0]['awp'], self.row(2, self.team)['awp'])
+        self.assertEqual(len(self.store.bestWeeks('1', limit=1000)),
+                         len(WEEKS) * self.TEAMS)
+
+    def query(self, command, *teams, **options):
+        args = {'league': '1', 'season': None, 'limit': 10}
+        args.update(options)
+        with tempfile.TemporaryDirectory() as tmpDir:
+            path = os.path.join(tmpDir, 'history.db')
+            with RankingsStore(path) as store:
+                for week in WEEKS:
+                    store.save('1', self.league.seasonId(), week,
+                               self.weekly[week])
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                rankings_store.main(argparse.Namespace(
+                    database=path, command=command, teams=list(teams),
+                    **args))
+        return out.getvalue().splitlines()
+
+    def test_cli(self):
+        trend = self.query('trend', self.team)
+        self.assertEqual(len(trend), 1 + len(WEEKS))
+        self.assertIn('%.3f' % self.row(3, self.team)['awp'], trend[-1])
+        best = self.query('best', limit=4)
+        self.assertEqual(len(best), 4)
+        self.assertIn(self.store.bestWeeks('1', 1)[0]['team'], best[0])
+        h2h = self.query('h2h', self.team, self.opp)
+        self.assertEqual(len(h2h), len(WEEKS))
+
+    def test_weeks_run_saved_together(self):
+        with tempfile.TemporaryDirectory() as tmpDir:
+            path = os.path.join(tmpDir, 'history.db')
+            self.runCli(weeks=(1, 3), history=path, outputDir=tmpDir)
+            with RankingsStore(path) as store:
+                self.assertEqual([row['week'] for row in store.weeks()],
+                                 list(WEEKS))
+                self.assertEqual(store.awpTrend('1', self.team),
+                                 self.store.awpTrend('1', self.team))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import datetime
+import io
+import os
+import types
+import unittest
+from unittest import mock
+
+import rankings_cli
+from fake_espn import SyntheticLeague, FakeESPNServer
+from power_rankings import WeeklyRankings, SeasonRankings
+from tests.support import LeagueTestCase
+
+GOLDEN = os.path.join(os.path.dirname(__file__), 'golden')
+TEMPLATES = os.path.join(os.path.dirname(rankings_cli.__file__), 'templates')
+
+
+class GoldenPageTest(LeagueTestCase):
+    """
+    Rendered pages match those of the original renderer.
+
+    The pages in tests/golden were rendered, from the same league, by
+    rankingsForTemplate, powerMatrixForTemplate and renderOutput as they
+    were before renderModel and templateContext were introduced.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        # a fixed season, since the year is on the page
+        cls.league = SyntheticLeague(cls.TEAMS, cls.CATEGORIES, cls.WEEKS,
+                                     2015)
+        cls.server = FakeESPNServer(cls.league)
+        cls.server.start()
+
+    def checkPage(self, name, pr, week):
+        out = io.StringIO()
+        # the season page is dated
+        today = types.SimpleNamespace(
+            today=lambda: datetime.date(2015, 10, 1))
+        with mock.patch.object(rankings_cli, 'datetime',
+                               types.SimpleNamespace(date=today)):
+            rankings_cli.renderOutput('Test League', pr.teamAbbreviations(),
+                                      pr.powerRankings(), '2015', week,
+                                      rankings_cli.loadTemplate(TEMPLATES),
+                                      out)
+        with open(os.path.join(GOLDEN, name)) as f:
+            self.assertEqual(out.getvalue(), f.read())
+
+    def test_weekly_page(self):
+        self.checkPage('week03.html', self.rankings(WeeklyRankings, 3), 3)
+
+    def test_season_page(self):
+        self.checkPage('season.html', self.rankings(SeasonRankings), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import tempfile
+import urllib.parse
+
+import requests
+
+from fake_espn import CaptureLeague, FakeESPNServer, LocalSession
+from power_rankings import WeeklyRankings
+from replay import Captures, RecordingSession, ReplaySession
+from tests.support import LeagueTestCase
+
+URL = 'http://games.espn.go.com/flb/ownerinfo'
+
+
+class LocalRecordingSession(RecordingSession, LocalSession):
+    """Record the responses of the local fake ESPN."""
+
+    def __init__(self, captures, baseUrl, **kwargs):
+        RecordingSession.__init__(self, captures, **kwargs)
+        # as LocalSession.__init__ would
+        self._base = urllib.parse.urlsplit(baseUrl)
+
+
+class ReplayTest(LeagueTestCase):
+
+    def setUp(self):
+        self._tmpDir = tempfile.TemporaryDirectory()
+        self.captures = Captures(self._tmpDir.name)
+        pr = self.rankings(WeeklyRankings, 3, session=LocalRecordingSession(
+            self.captures, self.server.url()))
+        self.recorded = (pr.teamAbbreviations(), pr.powerRankings())
+
+    def tearDown(self):
+        self._tmpDir.cleanup()
+
+    def test_credentials_not_recorded(self):
+        for name in os.listdir(self._tmpDir.name):
+            with open(os.path.join(self._tmpDir.name, name)) as f:
+                self.assertNotIn('password=password', f.read(), name)
+        logins = [key for key in self.captures.keys()
+                  if key.startswith('POST')]
+        self.assertEqual(len(logins), 1)
+        self.assertIn('password=REDACTED', logins[0])
+        self.assertIn('username=REDACTED', logins[0])
+
+    def test_replay_parity(self):
+        # the login matches whatever the credentials
+        pr = WeeklyRankings('1', self.league.seasonId(), self.LOWER_BETTER,
+                            3, session=ReplaySession(self.captures))
+        pr.loginESPN('someone', 'else')
+        self.assertEqual((pr.teamAbbreviations(), pr.powerRankings()),
+                         self.recorded)
+
+    def test_served_captures(self):
+        with FakeESPNServer(CaptureLeague(self.captures)) as server:
+            pr = WeeklyRankings('1', self.league.seasonId(),
+                                self.LOWER_BETTER, 3,
+                                session=LocalSession(server.url()))
+            pr.loginESPN('user', 'password')
+            self.assertEqual((pr.teamAbbreviations(), pr.powerRankings()),
+                             self.recorded)
+            self.assertEqual(server.requestCount(), pr.requestCount())
+
+    def test_recording_retries(self):
+        session = LocalRecordingSession(self.captures, self.server.url(),
+                                        backoff=0.01)
+        self.server.fail(503)
+        self.assertEqual(session.get(URL).status_code, 200)
+        self.assertEqual(session.counters()['retries'], 1)
+        self.assertEqual(self.captures.load(Captures.key('GET', URL))[0],
+                         200)
+
+    def test_replayed_errors_raise(self):
+        session = ReplaySession(self.captures)
+        self.captures.save(Captures.key('GET', URL, {'x': '1'}), 503, '')
+        with self.assertRaises(requests.HTTPError):
+            session.get(URL, params={'x': '1'})
+        with self.assertRaises(requests.ConnectionError):
+            session.get(URL, params={'x': '2'})
+        counters = session.counters()
+        self.assertEqual((counters['serverErrors'],
+                          counters['networkErrors'], counters['failures']),
+                         (1, 1, 2))
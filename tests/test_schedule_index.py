@@ -0,0 +1,70 @@
+import datetime
+import unittest
+
+from power_rankings import PowerRankings, ScheduleIndex, SeasonRankings
+from tests.support import LeagueTestCase
+
+
+class ScheduleIndexTest(unittest.TestCase):
+    """Matchups before a date are found at the period boundaries."""
+
+    def setUp(self):
+        openingDay = datetime.date(2020, 4, 6)
+        self.ends = [openingDay + datetime.timedelta(days=7 * w + 6)
+                     for w in range(26)]
+        self.index = ScheduleIndex({
+            'A': [(end, 'B' if w % 2 else 'C')
+                  for (w, end) in enumerate(self.ends)]})
+
+    def test_boundaries(self):
+        day = datetime.timedelta(days=1)
+        self.assertEqual(self.index.playedBefore('A', self.ends[0] - 7 * day),
+                         0)
+        for (w, end) in enumerate(self.ends):
+            # a matchup that ends on the date has not been played before it
+            self.assertEqual(self.index.playedBefore('A', end), w)
+            self.assertEqual(self.index.playedBefore('A', end + day), w + 1)
+        self.assertEqual(self.index.playedBefore('A', self.ends[-1] +
+                                                 365 * day), 26)
+
+    def test_opponents(self):
+        self.assertEqual(self.index.opponentsBefore('A', self.ends[3]),
+                         ['C', 'B', 'C'])
+
+
+class OpponentAwpTest(LeagueTestCase):
+    """Opponent AWP counts every opponent of a finished 26-week season."""
+
+    WEEKS = 26
+
+    def linearScan(self, rankings):
+        # the whole season, one matchup at a time
+        names = self.league.teamNames()
+        records = dict((row['team'], row) for row in rankings)
+        oppAwps = {}
+        for team in range(self.TEAMS):
+            wins = losses = ties = 0
+            played = 0
+            for pairings in self.league._pairings:
+                for (home, away) in pairings:
+                    if team in (home, away):
+                        opp = records[names[away if team == home else home]]
+                        wins += opp['wins']
+                        losses += opp['losses']
+                        ties += opp['ties']
+                        played += 1
+            self.assertEqual(played, self.WEEKS)
+            oppAwps[names[team]] = PowerRankings._awp(wins, losses, ties)
+        return oppAwps
+
+    def test_season(self):
+        pr = self.rankings(SeasonRankings, scheduleWorkers=4)
+        # the first run streams the schedules, the second uses the index
+        for rankings in (pr.powerRankings(), pr.powerRankings()):
+            expected = self.linearScan(rankings)
+            for row in rankings:
+                self.assertAlmostEqual(row['oppAwp'], expected[row['team']])
+
+
+if __name__ == '__main__':
+    unittest.main()
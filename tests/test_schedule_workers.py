@@ -0,0 +1,106 @@
+import datetime
+import threading
+import time
+import unittest
+import urllib.parse
+
+import requests
+
+from power_rankings import WeeklyRankings
+
+TEAMS = 8
+WEEKS = 6
+SEASON = '2015'
+
+
+class SchedulePages(requests.adapters.BaseAdapter):
+    """
+    Answer ESPN's schedule pages for a round-robin league, each after a
+    delay, in place of the network.
+    """
+
+    def __init__(self, latency):
+        requests.adapters.BaseAdapter.__init__(self)
+        self._latency = latency
+        self._lock = threading.Lock()
+        self.requests = 0
+        self._names = ['Team %d' % i for i in range(TEAMS)]
+        openingDay = datetime.date(int(SEASON), 4, 6)
+        self._periods = [(openingDay + datetime.timedelta(days=7 * w),
+                          openingDay + datetime.timedelta(days=7 * w + 6))
+                         for w in range(WEEKS)]
+
+    def _opponent(self, week, team):
+        # the circle method: team 0 stays put and the others rotate
+        others = list(range(1, TEAMS))
+        shift = week % (TEAMS - 1)
+        order = [0] + others[shift:] + others[:shift]
+        return order[TEAMS - 1 - order.index(team)]
+
+    def _page(self, teamId):
+        options = '<option value="-1">All</option>' + ''.join(
+            '<option value="%d">%s</option>' % (i + 1, name)
+            for (i, name) in enumerate(self._names))
+        page = ['<html><body><h1>Schedule</h1>']
+        if teamId is not None:
+            team = int(teamId) - 1
+            page.append('<h1>%s Schedule </h1>' % self._names[team])
+        page.append('<div class="bodyCopy"><select>%s</select></div>' %
+                    options)
+        if teamId is not None:
+            page.append('<table><tr><td>Schedule</td></tr>'
+                        '<tr><td>Regular Season</td></tr>'
+                        '<tr><td>PERIOD</td><td>OPPONENT</td></tr>')
+            for (w, (start, end)) in enumerate(self._periods):
+                page.append('<tr><td>Matchup %d (%s %d - %d)</td>'
+                            '<td>Away</td><td><a href="#">%s</a></td>'
+                            '<td>Owner</td></tr>' %
+                            (w + 1, start.strftime('%b'), start.day,
+                             end.day, self._names[self._opponent(w, team)]))
+            page.append('</table>')
+        page.append('</body></html>')
+        return ''.join(page)
+
+    def send(self, request, **kwargs):
+        with self._lock:
+            self.requests += 1
+        time.sleep(self._latency)
+        query = dict(urllib.parse.parse_qsl(
+            urllib.parse.urlsplit(request.url).query))
+        r = requests.Response()
+        r.status_code = 200
+        r._content = self._page(query.get('teamId')).encode('utf-8')
+        r.encoding = 'utf-8'
+        r.url = request.url
+        r.request = request
+        return r
+
+    def close(self):
+        pass
+
+
+class ScheduleWorkersTest(unittest.TestCase):
+    """Schedules fetched in parallel are those fetched one at a time."""
+
+    def schedules(self, workers):
+        pr = WeeklyRankings('1', SEASON, [], 1, scheduleWorkers=workers)
+        pages = SchedulePages(0.05)
+        pr._session.mount('http://', pages)
+        start = time.monotonic()
+        schedules = pr._allSchedules()
+        return (schedules, pages.requests, time.monotonic() - start)
+
+    def test_workers(self):
+        (serial, serialRequests, serialSeconds) = self.schedules(1)
+        (parallel, parallelRequests, parallelSeconds) = self.schedules(4)
+        self.assertEqual(len(serial), TEAMS)
+        self.assertTrue(all(serial.values()))
+        self.assertEqual(parallel, serial)
+        # the team IDs, then every team's schedule once
+        self.assertEqual(serialRequests, 1 + TEAMS)
+        self.assertEqual(parallelRequests, 1 + TEAMS)
+        self.assertLess(parallelSeconds, serialSeconds * 0.6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+
+from power_rankings import PowerRankings, WeeklyRankings, SeasonHistory
+from tests.support import LeagueTestCase
+
+WEEKS = 4
+
+
+class SeasonHistoryTest(LeagueTestCase):
+    """A history run matches the weeks run one at a time."""
+
+    def test_weeks_and_cumulative(self):
+        before = self.server.requestCount()
+        history = self.rankings(SeasonHistory, 1, WEEKS,
+                                scheduleWorkers=4).powerRankings()
+        # one login, the team IDs and every schedule once, and then one
+        # scoreboard per week
+        self.assertEqual(self.server.requestCount() - before,
+                         1 + 1 + self.TEAMS + WEEKS)
+        self.assertEqual([item['week'] for item in history],
+                         list(range(1, WEEKS + 1)))
+
+        totals = dict((team, [0, 0, 0]) for team in self.league.teamNames())
+        faced = dict((team, []) for team in self.league.teamNames())
+        for item in history:
+            weekly = self.rankings(WeeklyRankings,
+                                   item['week']).powerRankings()
+            self.assertEqual(item['rankings'], weekly)
+            for row in weekly:
+                total = totals[row['team']]
+                total[0] += row['wins']
+                total[1] += row['losses']
+                total[2] += row['ties']
+                faced[row['team']].append(row['matchupOpp'])
+            for (team, cumulative) in item['cumulative'].items():
+                (wins, losses, ties) = totals[team]
+                self.assertEqual((cumulative['wins'], cumulative['losses'],
+                                  cumulative['ties']), (wins, losses, ties))
+                self.assertAlmostEqual(cumulative['awp'],
+                                       PowerRankings._awp(wins, losses, ties))
+                opp = [sum(totals[o][i] for o in faced[team])
+                       for i in range(3)]
+                self.assertAlmostEqual(cumulative['oppAwp'],
+                                       PowerRankings._awp(*opp))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import datetime
+import os
+import subprocess
+import sys
+import tempfile
+import types
+import unittest
+from unittest import mock
+
+import power_rankings
+from power_rankings import IncrementalSeasonRankings, SeasonHistory
+from tests.support import LeagueTestCase
+
+
+class IncrementalSeasonTest(LeagueTestCase):
+    """A second run from the same state file only fetches the new weeks."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.stateFile = os.path.join(self._tmp.name, 'season.json')
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def weekEnded(self, week):
+        # the day after the week's matchup period ends
+        openingDay = datetime.date(int(self.league.seasonId()), 4, 6)
+        return openingDay + datetime.timedelta(days=7 * week)
+
+    def seasonRun(self, week, stateFile=None):
+        today = types.SimpleNamespace(today=lambda: self.weekEnded(week))
+        with mock.patch.object(power_rankings, 'datetime',
+                               types.SimpleNamespace(date=today)):
+            before = self.server.requestCount()
+            pr = self.rankings(IncrementalSeasonRankings,
+                               stateFile or self.stateFile)
+            rankings = pr.powerRankings()
+        return (rankings, self.server.requestCount() - before)
+
+    def test_second_run_fetches_new_weeks(self):
+        (rankings, requests) = self.seasonRun(self.WEEKS - 3)
+        self.assertEqual(requests, 1 + 1 + 1 + self.WEEKS - 3)
+        # the last weeks are played after the first run
+        for team in range(self.TEAMS):
+            self.league.score(self.WEEKS, team, 0, team)
+        (rankings, requests) = self.seasonRun(self.WEEKS)
+        # the login, the team IDs, the first team's schedule and the
+        # scoreboards of the three new weeks, where a fresh run fetches
+        # every week's scoreboard
+        self.assertEqual(requests, 1 + 1 + 1 + 3)
+        fresh = self.seasonRun(self.WEEKS, os.path.join(self._tmp.name,
+                                                  'fresh.json'))
+        self.assertEqual(fresh[1], 1 + 1 + 1 + self.WEEKS)
+        self.assertEqual(rankings, fresh[0])
+
+        history = self.rankings(SeasonHistory, 1, self.WEEKS)
+        cumulative = history.powerRankings()[-1]['cumulative']
+        for row in rankings:
+            expected = cumulative[row['team']]
+            for field in ('wins', 'losses', 'ties'):
+                self.assertEqual(row[field], expected[field])
+            self.assertAlmostEqual(row['awp'], expected['awp'])
+            self.assertAlmostEqual(row['oppAwp'], expected['oppAwp'])
+
+
+class StateFileOptionTest(unittest.TestCase):
+
+    def test_state_file_needs_season(self):
+        script = os.path.join(os.path.dirname(power_rankings.__file__),
+                              'rankings_cli.py')
+        result = subprocess.run([sys.executable, script, '-w', '3',
+                                 '--state-file', 'season.json'],
+                                capture_output=True, text=True)
+        self.assertEqual(result.returncode, 2)
+        self.assertIn('--state-file', result.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import datetime
+import unittest
+
+from fake_espn import SyntheticLeague, FakeESPNServer
+from simulation import SeasonSimulation, _binomialCdf
+from tests.support import LeagueTestCase
+
+
+class BinomialTest(unittest.TestCase):
+
+    def test_cdf(self):
+        for p in (0.1, 0.5, 0.83):
+            cdf = _binomialCdf(10, p)
+            self.assertEqual(len(cdf), 10)
+            self.assertAlmostEqual(cdf[0], (1 - p) ** 10)
+            self.assertAlmostEqual(cdf[-1], 1 - p ** 10)
+            self.assertEqual(cdf, sorted(cdf))
+
+
+class EngineTest(LeagueTestCase):
+    """Both engines simulate the same odds."""
+
+    TEAMS = 8
+
+    @classmethod
+    def setUpClass(cls):
+        # next season, so that every matchup is still to be played
+        cls.league = SyntheticLeague(cls.TEAMS, cls.CATEGORIES, cls.WEEKS,
+                                     datetime.date.today().year + 1)
+        cls.server = FakeESPNServer(cls.league)
+        cls.server.start()
+
+    def test_engines_agree(self):
+        simulation = self.rankings(SeasonSimulation, scheduleWorkers=4)
+        results = {}
+        for engine in ('python', 'numpy'):
+            results[engine] = dict(
+                (row['team'], row)
+                for row in simulation.simulate(20000, engine=engine))
+        for (team, row) in results['python'].items():
+            other = results['numpy'][team]
+            # 20000 runs put the odds within about a percentage point
+            self.assertLess(abs(row['playoffOdds'] - other['playoffOdds']),
+                            0.03)
+            self.assertLess(abs(row['expectedRank'] - other['expectedRank']),
+                            0.1)
+        self.assertAlmostEqual(
+            sum(row['playoffOdds'] for row in results['python'].values()),
+            4)
+
+    def test_default_engine(self):
+        simulation = self.rankings(SeasonSimulation)
+        engine = SeasonSimulation.defaultEngine()
+        self.assertEqual(simulation.simulate(2000),
+                         simulation.simulate(2000, engine=engine))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import datetime
+import os
+import tempfile
+import unittest
+
+from fake_espn import SyntheticLeague, FakeESPNServer, LocalSession
+from site_builder import SiteBuilder, buildSite
+
+
+class RebuildTest(unittest.TestCase):
+    """A rebuild does not compute the rankings of weeks that have ended."""
+
+    WEEKS = 6
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.siteDir = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def build(self, server, seasonId):
+        properties = {'leagueId': '1', 'seasonId': str(seasonId),
+                      'leagueName': 'Test League', 'lowerBetter': 'ERA,WHIP',
+                      'username': 'user', 'password': 'password'}
+        before = server.requestCount()
+        result = buildSite(properties, [str(seasonId)], self.siteDir,
+                           session=LocalSession(server.url()))
+        return (result, server.requestCount() - before)
+
+    def test_past_season(self):
+        league = SyntheticLeague(8, 10, self.WEEKS)
+        with FakeESPNServer(league) as server:
+            (first, requests) = self.build(server, league.seasonId())
+            self.assertEqual(first['computed'], 1 + self.WEEKS)
+            self.assertGreater(requests, 0)
+            (second, requests) = self.build(server, league.seasonId())
+        self.assertEqual(requests, 0)
+        self.assertEqual(second['computed'], 0)
+        self.assertEqual(second['rendered'], [])
+        self.assertEqual(len(second['skipped']), 1 + self.WEEKS + 1)
+
+    def test_current_season(self):
+        # a synthetic season opens on April 6th; make it last until a few
+        # weeks from now
+        seasonId = datetime.date.today().year
+        daysPlayed = (datetime.date.today() -
+                      datetime.date(seasonId, 4, 6)).days
+        if daysPlayed < 0:
+            self.skipTest('no synthetic season is under way today')
+        completed = daysPlayed // 7
+        league = SyntheticLeague(8, 10, completed + 3, seasonId)
+        with FakeESPNServer(league) as server:
+            (first, requests) = self.build(server, seasonId)
+            self.assertEqual(first['computed'], 1 + completed)
+            (second, requests) = self.build(server, seasonId)
+        # only the season so far is computed again
+        self.assertEqual(second['computed'], 1)
+        for week in range(1, completed + 1):
+            self.assertIn(SiteBuilder.pageName(seasonId, week),
+                          second['skipped'])
+
+    def test_template_change(self):
+        league = SyntheticLeague(8, 10, self.WEEKS)
+        with FakeESPNServer(league) as server:
+            self.build(server, league.seasonId())
+            builder = SiteBuilder(self.siteDir, 'Another Name')
+            self.assertIsNone(builder.finalSeasonWeeks(league.seasonId()))
+            self.assertFalse(builder.isFinal(league.seasonId(), 1))
+            builder = SiteBuilder(self.siteDir, 'Test League')
+            self.assertEqual(builder.finalSeasonWeeks(league.seasonId()),
+                             self.WEEKS)
+            os.remove(os.path.join(self.siteDir, SiteBuilder.pageName(
+                league.seasonId(), 2)))
+            (result, requests) = self.build(server, league.seasonId())
+        # the season and the missing week
+        self.assertEqual(result['computed'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
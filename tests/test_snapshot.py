@@ -0,0 +1,34 @@
+import tempfile
+
+from http_cache import ResponseCache
+from power_rankings import WeeklyRankings
+from tests.support import LeagueTestCase
+
+
+class PageOnceTest(LeagueTestCase):
+    """Every page of a run is downloaded once, however it is fetched."""
+
+    def expectedRequests(self):
+        # the team IDs, every team's schedule and the scoreboard
+        return 1 + self.TEAMS + 1
+
+    def checkRun(self, **options):
+        before = self.server.requestCount()
+        pr = WeeklyRankings('1', self.league.seasonId(), self.LOWER_BETTER,
+                            2, session=self.session(), **options)
+        pr.powerRankings()
+        self.assertEqual(pr.requestCount(), self.expectedRequests())
+        self.assertEqual(self.server.requestCount() - before,
+                         self.expectedRequests())
+
+    def test_no_cache(self):
+        for workers in (1, 4):
+            self.checkRun(scheduleWorkers=workers)
+
+    def test_cold_cache(self):
+        # with a cache, the scoreboard needs the first team's schedule
+        # while the schedules are streaming in
+        for workers in (1, 4):
+            with tempfile.TemporaryDirectory() as cacheDir:
+                self.checkRun(scheduleWorkers=workers,
+                              cache=ResponseCache(cacheDir, 10 ** 7))
@@ -0,0 +1,26 @@
+import unittest
+
+import fbpowerrankings
+from benchmarks import STARTUP_BUDGET, STARTUP_MODULES, importTime
+
+
+class StartupTest(unittest.TestCase):
+    """Starting the script, or importing the package, stays cheap."""
+
+    def test_import_budget(self):
+        for (module, cwd) in STARTUP_MODULES:
+            with self.subTest(module=module):
+                (millis, heavy) = importTime(module, cwd=cwd)
+                self.assertLessEqual(millis, STARTUP_BUDGET)
+                self.assertEqual(heavy, [])
+
+    def test_package_names_resolve(self):
+        for name in fbpowerrankings.__all__:
+            self.assertIn(name, dir(fbpowerrankings))
+            self.assertEqual(getattr(fbpowerrankings, name).__name__, name)
+        with self.assertRaises(AttributeError):
+            fbpowerrankings.NoSuchName
+
+
+if __name__ == '__main__':
+    unittest.main()